@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк добавления чанков в AudioBuffer.
+
+Имитирует длинную диктовку (16 kHz, моно, чанки по 1024 фрейма) и печатает
+среднюю стоимость добавления одного чанка по минутам записи. Для PCMStore
+она должна оставаться постоянной; для старой конкатенации bytes — растёт
+линейно с длиной записи.
+
+Запуск:
+  python benchmarks/audio_buffer_append.py --minutes 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from client.audio_buffer import PCMStore  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1024
+CHUNK = b'\x01\x00' * CHUNK_FRAMES
+CHUNKS_PER_MINUTE = SAMPLE_RATE * 60 // CHUNK_FRAMES
+
+
+def bench_store(minutes: int) -> list:
+    """Среднее время добавления чанка (мкс) для каждой минуты записи."""
+    store = PCMStore()
+    result = []
+    for _ in range(minutes):
+        t0 = time.perf_counter()
+        for _ in range(CHUNKS_PER_MINUTE):
+            store.append(CHUNK)
+        result.append((time.perf_counter() - t0) / CHUNKS_PER_MINUTE * 1e6)
+    return result
+
+
+def bench_bytes(minutes: int) -> list:
+    """То же для конкатенации bytes (поведение до PCMStore)."""
+    frames = b""
+    result = []
+    for _ in range(minutes):
+        t0 = time.perf_counter()
+        for _ in range(CHUNKS_PER_MINUTE):
+            frames += CHUNK
+        result.append((time.perf_counter() - t0) / CHUNKS_PER_MINUTE * 1e6)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioBuffer append benchmark")
+    parser.add_argument('--minutes', type=int, default=5, help='Длина записи в минутах')
+    parser.add_argument('--no-legacy', action='store_true', help='Не измерять конкатенацию bytes')
+    args = parser.parse_args()
+
+    store = bench_store(args.minutes)
+    legacy = None if args.no_legacy else bench_bytes(args.minutes)
+
+    print(f"{'minute':>6}  {'PCMStore, us':>13}  {'bytes +=, us':>13}")
+    for i, value in enumerate(store):
+        old = f"{legacy[i]:13.2f}" if legacy else f"{'-':>13}"
+        print(f"{i + 1:>6}  {value:13.2f}  {old}")
+
+    growth = store[-1] / store[0] if store[0] else 0.0
+    print(f"\nPCMStore last/first minute ratio: {growth:.2f}")
+
+
+if __name__ == '__main__':
+    main()
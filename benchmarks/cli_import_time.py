@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Бюджет времени запуска `micpy trigger`.
+
+Триггер запускается на каждое нажатие хоткея, поэтому его путь должен
+обходиться стандартной библиотекой. Скрипт запускает `micpy trigger`
+против локального сокета, сравнивает лучшее время с голым интерпретатором
+и проверяет, что тяжёлые модули (numpy, pyaudio, requests, редактор,
+демон) не загружаются. Код возврата 1 — бюджет превышен или загружено
+лишнее.
+
+Запуск:
+  python benchmarks/cli_import_time.py --budget-ms 30
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+TRIGGER = (
+    "import sys; from client.cli import main; "
+    "sys.argv = ['micpy', 'trigger', '--socket-path', sys.argv[1]]; main()"
+)
+LIST_MODULES = TRIGGER + "; print('\\n'.join(sys.modules), file=sys.stderr)"
+
+# Допустимая надбавка ко времени запуска голого интерпретатора, мс
+DEFAULT_BUDGET_MS = 30.0
+
+# Что не должно попадать в путь триггера
+FORBIDDEN = (
+    'numpy', 'pyaudio', 'requests', 'aiohttp', 'prompt_toolkit', 'pyperclip',
+    'client.minimal_editor', 'client.voice_daemon', 'client.audio_buffer',
+    'client.parakeet_client',
+)
+
+
+def serve(path: str) -> socket.socket:
+    """Сокет, принимающий триггеры, как это делает демон."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(16)
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                conn.recv(1024)
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server
+
+
+def best_time(args: list, runs: int) -> float:
+    """Лучшее время запуска процесса, мс."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best = float('inf')
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(args, env=env, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="micpy trigger startup budget")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Allowed overhead over a bare interpreter (default: %(default)g)')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per measurement')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trigger.sock')
+        server = serve(path)
+        try:
+            loaded = subprocess.run(
+                [sys.executable, '-c', LIST_MODULES, path],
+                env=dict(os.environ, PYTHONPATH=ROOT), check=True,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            ).stderr.split()
+            bare = best_time([sys.executable, '-c', 'pass'], args.runs)
+            trigger = best_time([sys.executable, '-c', TRIGGER, path], args.runs)
+        finally:
+            server.close()
+
+    heavy = sorted(
+        name for name in loaded
+        if any(name == module or name.startswith(module + '.') for module in FORBIDDEN)
+    )
+    overhead = trigger - bare
+    print(f"bare interpreter: {bare:.1f} ms")
+    print(
+        f"micpy trigger:    {trigger:.1f} ms "
+        f"(+{overhead:.1f} ms, budget {args.budget_ms:.0f} ms)"
+    )
+    ok = True
+    if heavy:
+        print(f"FAIL: trigger path imports {', '.join(heavy)}")
+        ok = False
+    if overhead > args.budget_ms:
+        print("FAIL: over budget")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,12 @@ Clients package for MicPy
 Содержит клиенты для STT системы:
 - minimal_editor: Минималистичный терминальный редактор
 - voice_daemon: Фоновый демон голосового ввода
+- control: Клиент протокола управления демоном (только stdlib)
 - parakeet_client: HTTP клиент к Parakeet API
 - audio_buffer: Модуль захвата аудио
+
+Пакет ничего не импортирует при загрузке: `micpy trigger` должен стартовать
+без numpy, pyaudio и requests.
 """
 
 __all__ = []
@@ -7,17 +7,20 @@
 
 import io
 import os
-import math
+import time
+import logging
 import struct
 import shutil
-import tempfile
 import wave
 import atexit
-import signal
 import contextlib
-import subprocess
 import platform
-from typing import Optional
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from client.playback import PlaybackEngine, suppress_alsa_warnings
 
 try:
     import pyaudio
@@ -28,6 +31,246 @@ except ImportError as e:
         "On macOS: brew install portaudio && pip install pyaudio"
     ) from None
 
+logger = logging.getLogger('AudioBuffer')
+
+
+class PCMStore:
+    """
+    Растущее хранилище PCM-данных записи.
+
+    Основано на bytearray: добавление чанка — амортизированное O(1), вместо
+    конкатенации неизменяемых bytes, которая копировала всю запись на каждом
+    чанке. Чтение идёт через memoryview, без промежуточных копий.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._lock = threading.Lock()
+
+    def append(self, data: bytes) -> None:
+        """Добавить чанк PCM в конец записи."""
+        with self._lock:
+            self._data += data
+
+    def clear(self) -> None:
+        """Очистить хранилище."""
+        with self._lock:
+            self._data = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @contextlib.contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """
+        memoryview на записанные данные без копирования.
+
+        Пока view жив, добавление блокируется: bytearray с экспортированным
+        буфером нельзя расширять.
+        """
+        with self._lock:
+            mv = memoryview(self._data)
+            try:
+                yield mv
+            finally:
+                mv.release()
+
+    def tobytes(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Копия диапазона записи в виде bytes."""
+        with self.view() as mv:
+            return mv[start:end].tobytes()
+
+
+class PreRollRing:
+    """
+    Кольцевой буфер последних N миллисекунд входного аудио.
+
+    Заполняется из callback PortAudio, пока запись не идёт, и отдаёт своё
+    содержимое в начало новой записи — так не теряются слова, сказанные
+    одновременно с нажатием хоткея. Память выделяется один раз: это
+    bytearray фиксированного размера, а не список чанков.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: Ёмкость в байтах (кратна размеру фрейма)
+        """
+        self._buf = bytearray(capacity)
+        self._capacity = capacity
+        self._pos = 0
+        self._filled = 0
+
+    def write(self, data: bytes) -> None:
+        """Дописать данные, затирая самые старые."""
+        mv = memoryview(data)
+        n = len(mv)
+        cap = self._capacity
+        if n >= cap:
+            self._buf[:] = mv[n - cap:]
+            self._pos = 0
+            self._filled = cap
+            return
+
+        end = self._pos + n
+        if end <= cap:
+            self._buf[self._pos:end] = mv
+        else:
+            first = cap - self._pos
+            self._buf[self._pos:] = mv[:first]
+            self._buf[:n - first] = mv[first:]
+        self._pos = end % cap
+        self._filled = min(cap, self._filled + n)
+
+    def snapshot(self) -> bytes:
+        """Содержимое буфера в хронологическом порядке."""
+        if self._filled < self._capacity:
+            return bytes(self._buf[:self._filled])
+        return bytes(self._buf[self._pos:]) + bytes(self._buf[:self._pos])
+
+    def clear(self) -> None:
+        """Сбросить содержимое (память остаётся выделенной)."""
+        self._pos = 0
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+
+class VoiceActivityDetector:
+    """
+    Энергетический детектор речи по кадрам int16 PCM.
+
+    Все вычисления векторизованы в NumPy: запись режется на кадры
+    reshape'ом, RMS и доля пересечений нуля (ZCR) считаются по всем кадрам
+    разом. Порог энергии адаптивный — от уровня шума записи (нижний
+    перцентиль RMS), но не ниже min_rms и не выше половины уровня громкой
+    части записи. Тихие кадры с высоким ZCR
+    (шипящие согласные) тоже считаются речью, если их энергия не совсем
+    на уровне шума.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        min_rms: float = 300.0,
+        noise_ratio: float = 3.0,
+        zcr_threshold: float = 0.25,
+        pad_ms: int = 200
+    ):
+        """
+        Args:
+            sample_rate: Частота дискретизации (моно, 16-bit)
+            frame_ms: Длина кадра анализа
+            min_rms: Нижняя граница порога энергии (int16)
+            noise_ratio: Во сколько раз речь громче уровня шума
+            zcr_threshold: ZCR, выше которого тихий кадр считается шипящим
+            pad_ms: Сколько тишины оставлять вокруг речи
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.min_rms = min_rms
+        self.noise_ratio = noise_ratio
+        self.zcr_threshold = zcr_threshold
+        self.pad_frames = max(0, pad_ms // frame_ms)
+
+    def _frames(self, pcm) -> np.ndarray:
+        """PCM -> матрица кадров (n_frames, frame_len); неполный хвост отбрасывается."""
+        samples = np.frombuffer(pcm, dtype='<i2')
+        n = len(samples) // self.frame_len
+        return samples[:n * self.frame_len].reshape(n, self.frame_len)
+
+    def frame_rms(self, pcm) -> np.ndarray:
+        """RMS каждого полного кадра."""
+        frames = self._frames(pcm).astype(np.float32)
+        if not len(frames):
+            return np.zeros(0, dtype=np.float32)
+        return np.sqrt(np.mean(frames * frames, axis=1))
+
+    def speech_mask(self, pcm) -> np.ndarray:
+        """
+        Маска речевых кадров с «расширением» на pad_ms вокруг речи.
+
+        Returns:
+            bool-массив длиной в число полных кадров
+        """
+        frames = self._frames(pcm)
+        if not len(frames):
+            return np.zeros(0, dtype=bool)
+
+        f = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(f * f, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+
+        # Нижний перцентиль — уровень шума, если в записи есть паузы. В плотно
+        # обрезанной фразе пауз нет и он равен уровню речи, поэтому порог не
+        # выше половины громкой части записи (90-й перцентиль)
+        noise_floor = float(np.percentile(rms, 10))
+        loud = float(np.percentile(rms, 90))
+        threshold = max(self.min_rms, min(noise_floor * self.noise_ratio, loud / 2))
+        speech = (rms > threshold) | ((rms > threshold / 2) & (zcr > self.zcr_threshold))
+
+        if self.pad_frames and speech.any():
+            kernel = np.ones(2 * self.pad_frames + 1, dtype=np.int32)
+            speech = np.convolve(speech.astype(np.int32), kernel, mode='same') > 0
+        return speech
+
+    def trim(self, pcm, max_pause_ms: int = 0) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Обрезать тишину по краям и, опционально, сжать длинные паузы.
+
+        Args:
+            pcm: Моно int16 PCM
+            max_pause_ms: Паузы длиннее этого сжимаются до него (0 — не сжимать)
+
+        Returns:
+            (PCM без тишины, статистика: speech — есть ли речь, silent —
+            ни один кадр не громче min_rms (явная тишина), original_bytes,
+            trimmed_bytes, ratio — доля удалённого)
+        """
+        frames = self._frames(pcm)
+        mask = self.speech_mask(pcm)
+        original = len(pcm)
+
+        if not mask.any():
+            return b"", {
+                "speech": False,
+                "silent": not (self.frame_rms(pcm) > self.min_rms).any(),
+                "original_bytes": original,
+                "trimmed_bytes": 0,
+                "ratio": 1.0 if original else 0.0,
+            }
+
+        idx = np.flatnonzero(mask)
+        keep = np.zeros(len(mask), dtype=bool)
+        keep[idx[0]:idx[-1] + 1] = True
+
+        max_pause = max_pause_ms // self.frame_ms
+        if max_pause:
+            # Границы пауз внутри речи: серии False в маске
+            silent = (~mask[idx[0]:idx[-1] + 1]).astype(np.int8)
+            edges = np.diff(np.concatenate(([0], silent, [0])))
+            starts = np.flatnonzero(edges == 1) + idx[0]
+            ends = np.flatnonzero(edges == -1) + idx[0]
+            for start, end in zip(starts, ends):
+                if end - start > max_pause:
+                    # Оставляем половину допустимой паузы с каждой стороны
+                    head = start + max_pause // 2
+                    tail = end - (max_pause - max_pause // 2)
+                    keep[head:tail] = False
+
+        trimmed = frames[keep].tobytes()
+        return trimmed, {
+            "speech": True,
+            "silent": False,
+            "original_bytes": original,
+            "trimmed_bytes": len(trimmed),
+            "ratio": 1 - len(trimmed) / original if original else 0.0,
+        }
+
 
 class AudioBuffer:
     """
@@ -36,7 +279,15 @@ class AudioBuffer:
     Поддерживает кроссплатформенный захват (Linux/macOS) и сохранение в WAV.
     """
 
-    def __init__(self, sample_rate: int = 16000, channels: int = 1, chunk_size: int = 1024):
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        chunk_size: int = 1024,
+        use_callback: bool = True,
+        hot_mic: bool = False,
+        preroll_ms: int = 0
+    ):
         """
         Инициализация аудио буфера.
 
@@ -44,67 +295,135 @@ class AudioBuffer:
             sample_rate: Частота дискретизации (по умолчанию 16000 Hz)
             channels: Количество каналов (по умолчанию 1 - моно)
             chunk_size: Размер чанка для чтения (по умолчанию 1024)
+            use_callback: Захват через stream_callback из потока PortAudio.
+                False — старый блокирующий режим, данные читает read_chunk()
+            hot_mic: Держать PyAudio и входной поток открытыми между записями.
+                Поток работает постоянно, а вне записи данные отбрасываются —
+                старт записи сводится к переключению флага. Требует callback-режима
+            preroll_ms: Сколько миллисекунд звука до старта записи добавлять
+                в её начало. Работает только на постоянном потоке, поэтому
+                включает hot_mic
         """
         self.sample_rate = sample_rate
         self.channels = channels
         self.chunk_size = chunk_size
         self.sample_width = 2  # 16-bit PCM
+        self.preroll_ms = max(0, preroll_ms)
+        self.hot_mic = hot_mic or self.preroll_ms > 0
+        self.use_callback = use_callback or self.hot_mic
+        # Сколько раз PortAudio сообщил о переполнении входного буфера
+        self.overflow_count = 0
 
-        self.frames: bytes = b""
+        self.frames = PCMStore()
         self.is_recording = False
         self._pyaudio_instance: Optional[pyaudio.PyAudio] = None
         self._audio_stream = None
         self._start_time: float = 0
 
-    @contextlib.contextmanager
-    def _suppress_alsa_warnings(self):
-        """Подавление ALSA warnings на Linux."""
-        try:
-            with open(os.devnull, 'w') as devnull:
-                old_stderr = os.dup(2)
-                os.dup2(devnull.fileno(), 2)
-                try:
-                    yield
-                finally:
-                    os.dup2(old_stderr, 2)
-                    os.close(old_stderr)
-        except Exception:
-            # Если не удалось перенаправить stderr, просто продолжаем
-            yield
+        # Синхронизация с callback PortAudio: флаг записи переключается
+        # под блокировкой, чтобы граница записи не разрезала чанк
+        self._state_lock = threading.Lock()
+        # Сигнал потребителям живой записи (iter_live_pcm): новые данные
+        # или конец записи
+        self._data_ready = threading.Condition(self._state_lock)
+        self._stopping = False
+        self._drained = threading.Event()
+        self._start_perf: float = 0
+        # Задержка от start_recording() до первого записанного сэмпла, в секундах
+        self.first_sample_latency: Optional[float] = None
+
+        self._preroll: Optional[PreRollRing] = None
+        if self.preroll_ms:
+            frame_bytes = self.channels * self.sample_width
+            n_frames = self.sample_rate * self.preroll_ms // 1000
+            self._preroll = PreRollRing(n_frames * frame_bytes)
+
+    def _open_stream(self):
+        """Создание PyAudio и открытие входного потока."""
+        self._pyaudio_instance = pyaudio.PyAudio()
+        self._audio_stream = self._pyaudio_instance.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._stream_callback if self.use_callback else None
+        )
 
     def _init_audio(self) -> bool:
         """
         Инициализация PyAudio и аудио потока.
 
+        В callback-режиме поток начинает захват сразу после открытия.
+
         Returns:
             True если инициализация успешна, иначе False
         """
         try:
             if platform.system() == 'Darwin':  # macOS
-                self._pyaudio_instance = pyaudio.PyAudio()
-                self._audio_stream = self._pyaudio_instance.open(
-                    format=pyaudio.paInt16,
-                    channels=self.channels,
-                    rate=self.sample_rate,
-                    input=True,
-                    frames_per_buffer=self.chunk_size
-                )
+                self._open_stream()
             else:  # Linux и другие
-                with self._suppress_alsa_warnings():
-                    self._pyaudio_instance = pyaudio.PyAudio()
-                    self._audio_stream = self._pyaudio_instance.open(
-                        format=pyaudio.paInt16,
-                        channels=self.channels,
-                        rate=self.sample_rate,
-                        input=True,
-                        frames_per_buffer=self.chunk_size
-                    )
+                with suppress_alsa_warnings():
+                    self._open_stream()
             return True
         except Exception as e:
             print(f"Ошибка инициализации аудио: {e}")
             self._cleanup_audio()
             return False
 
+    def _stream_callback(self, in_data, frame_count, time_info, status_flags):
+        """
+        Приём аудио из потока PortAudio (callback-режим).
+
+        Вызывается на каждый заполненный буфер, поэтому никакого опроса
+        и сна на стороне приложения не нужно. Здесь нельзя блокироваться
+        надолго — только дописать данные в хранилище.
+        """
+        with self._state_lock:
+            if not self.is_recording:
+                if self._preroll is not None and in_data:
+                    self._preroll.write(in_data)
+            elif in_data:
+                if status_flags & pyaudio.paInputOverflow:
+                    self.overflow_count += 1
+                if self.first_sample_latency is None:
+                    self.first_sample_latency = time.perf_counter() - self._start_perf
+                self.frames.append(in_data)
+                if self._stopping:
+                    # Hot mic: буфер, пришедший после запроса остановки,
+                    # содержит хвост фразы — берём его и закрываем запись
+                    self.is_recording = False
+                    self._drained.set()
+                self._data_ready.notify_all()
+        return None, pyaudio.paContinue
+
+    def open(self) -> bool:
+        """
+        Открыть постоянный входной поток (режим hot mic).
+
+        Вызывается один раз при старте приложения: опрос ALSA/PipeWire
+        занимает сотни миллисекунд, и делать его на каждый хоткей — значит
+        обрезать первые слова. Для обычного режима ничего не делает.
+
+        Returns:
+            True если поток открыт
+        """
+        if not self.hot_mic:
+            return False
+        if self._audio_stream is not None:
+            return True
+
+        t0 = time.perf_counter()
+        if not self._init_audio():
+            return False
+        logger.info(f"Hot mic stream opened in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return True
+
+    def close(self):
+        """Закрыть постоянный поток и освободить PyAudio."""
+        self._finish_recording()
+        self._cleanup_audio()
+
     def _cleanup_audio(self):
         """Очистка ресурсов аудио."""
         try:
@@ -117,7 +436,7 @@ class AudioBuffer:
                     self._pyaudio_instance.terminate()
                     self._pyaudio_instance = None
             else:  # Linux
-                with self._suppress_alsa_warnings():
+                with suppress_alsa_warnings():
                     if self._audio_stream:
                         self._audio_stream.stop_stream()
                         self._audio_stream.close()
@@ -139,28 +458,56 @@ class AudioBuffer:
         if self.is_recording:
             return True
 
-        if not self._init_audio():
-            return False
-
-        import time
-        self.frames = b""
+        # Новое хранилище, а не очистка старого: предыдущая запись может ещё
+        # отправляться (демон распознаёт её в фоне), её данные должны уцелеть
+        self.frames = PCMStore()
+        self.overflow_count = 0
+        self.first_sample_latency = None
+        self._stopping = False
+        self._drained.clear()
         self._start_time = time.time()
+        self._start_perf = time.perf_counter()
+
+        if self.hot_mic and self._audio_stream is not None:
+            # Поток уже работает — просто начинаем сохранять данные,
+            # предварив их звуком из pre-roll буфера
+            with self._state_lock:
+                if self._preroll is not None:
+                    self.frames.append(self._preroll.snapshot())
+                    self._preroll.clear()
+                self.is_recording = True
+            return True
+
+        # Флаг ставится до открытия потока: в callback-режиме первые
+        # данные приходят сразу после open()
         self.is_recording = True
+
+        opened = self.open() if self.hot_mic else self._init_audio()
+        if not opened:
+            self._finish_recording()
+            return False
+
+        elapsed_ms = (time.perf_counter() - self._start_perf) * 1000
+        logger.info(f"Audio stream opened in {elapsed_ms:.0f} ms")
         return True
 
     def read_chunk(self) -> Optional[bytes]:
         """
-        Чтение чанка аудио данных.
+        Чтение чанка аудио данных (только блокирующий режим).
+
+        В callback-режиме данные приходят сами, метод ничего не делает.
 
         Returns:
             Байты аудио или None если не записываем
         """
-        if not self.is_recording or not self._audio_stream:
+        if self.use_callback or not self.is_recording or not self._audio_stream:
             return None
 
         try:
             data = self._audio_stream.read(self.chunk_size, exception_on_overflow=False)
-            self.frames += data
+            with self._data_ready:
+                self.frames.append(data)
+                self._data_ready.notify_all()
             return data
         except Exception as e:
             print(f"Ошибка чтения аудио: {e}")
@@ -176,18 +523,102 @@ class AudioBuffer:
         if not self.is_recording:
             return b""
 
-        self.is_recording = False
-        self._cleanup_audio()
+        if self.hot_mic and self._audio_stream is not None:
+            # Поток остаётся открытым: ждём ещё один буфер с хвостом фразы
+            with self._state_lock:
+                self._stopping = True
+            if not self._drained.wait(timeout=2 * self.chunk_size / self.sample_rate + 0.05):
+                self._finish_recording()
+            # Хвост этой записи не должен попасть в pre-roll следующей
+            with self._state_lock:
+                if self._preroll is not None:
+                    self._preroll.clear()
+        else:
+            # stop_stream() дожидается последнего callback — хвост записи
+            # попадает в буфер, и только потом снимаем флаг
+            self._cleanup_audio()
+            self._finish_recording()
+
+        if self.first_sample_latency is not None:
+            mode = 'hot mic' if self.hot_mic else 'cold'
+            logger.info(
+                f"Start-to-first-sample latency: {self.first_sample_latency * 1000:.0f} ms ({mode})"
+            )
 
         # Конвертируем в WAV формат
-        return self._create_wav_bytes(self.frames)
+        return self.get_wav_bytes()
+
+    @property
+    def first_sample_at(self) -> Optional[float]:
+        """Момент (time.perf_counter) первого записанного буфера текущей записи."""
+        if self.first_sample_latency is None:
+            return None
+        return self._start_perf + self.first_sample_latency
+
+    def _finish_recording(self):
+        """Снять флаг записи и разбудить потребителей живой записи."""
+        with self._data_ready:
+            self.is_recording = False
+            self._data_ready.notify_all()
+
+    def iter_live_pcm(self, start: int = 0) -> Iterator[bytes]:
+        """
+        Генератор PCM-данных текущей записи по мере их поступления.
+
+        Блокируется на условной переменной до прихода нового буфера —
+        без опроса и сна. Завершается, когда запись остановлена и все
+        данные отданы. Привязан к хранилищу записи, в которой создан:
+        началась следующая запись — отдаёт остаток своей и завершается.
+
+        Args:
+            start: Смещение в байтах, с которого начинать
+
+        Yields:
+            Новые куски PCM
+        """
+        frames = self.frames
+        offset = start
+        while True:
+            with self._data_ready:
+                while self.is_recording and self.frames is frames and len(frames) <= offset:
+                    self._data_ready.wait()
+                recording = self.is_recording and self.frames is frames
+                end = len(frames)
+            if end > offset:
+                yield frames.tobytes(offset, end)
+                offset = end
+            elif not recording:
+                return
+
+    def wav_stream_header(self) -> bytes:
+        """
+        Заголовок WAV для потоковой передачи.
 
-    def _create_wav_bytes(self, audio_data: bytes) -> bytes:
+        Итоговая длина неизвестна, поэтому размеры RIFF и data выставлены
+        в 0xFFFFFFFF — так пишут потоковые WAV ffmpeg и sox, и декодеры
+        читают данные до конца потока.
+        """
+        block_align = self.channels * self.sample_width
+        return b''.join([
+            b'RIFF', struct.pack('<I', 0xFFFFFFFF), b'WAVE',
+            b'fmt ', struct.pack(
+                '<IHHIIHH', 16, 1, self.channels, self.sample_rate,
+                self.sample_rate * block_align, block_align, self.sample_width * 8
+            ),
+            b'data', struct.pack('<I', 0xFFFFFFFF),
+        ])
+
+    def iter_live_wav(self) -> Iterator[bytes]:
+        """Живая запись в виде потокового WAV: заголовок, затем PCM."""
+        yield self.wav_stream_header()
+        yield from self.iter_live_pcm()
+
+    def create_wav_bytes(self, audio_data: bytes) -> bytes:
         """
         Создание WAV байтов из сырых аудио данных.
 
         Args:
-            audio_data: Сырые аудио данные (PCM)
+            audio_data: Сырые аудио данные (PCM), любой bytes-like объект
 
         Returns:
             WAV байты
@@ -225,7 +656,6 @@ class AudioBuffer:
         if not self.is_recording:
             return 0.0
 
-        import time
         return time.time() - self._start_time
 
     def save_to_wav(self, filepath: str) -> bool:
@@ -242,9 +672,11 @@ class AudioBuffer:
             return False
 
         try:
-            wav_data = self._create_wav_bytes(self.frames)
-            with open(filepath, 'wb') as f:
-                f.write(wav_data)
+            with self.frames.view() as pcm, wave.open(filepath, 'wb') as wav_file:
+                wav_file.setnchannels(self.channels)
+                wav_file.setsampwidth(self.sample_width)
+                wav_file.setframerate(self.sample_rate)
+                wav_file.writeframes(pcm)
             return True
         except Exception as e:
             print(f"Ошибка сохранения файла: {e}")
@@ -252,7 +684,7 @@ class AudioBuffer:
 
     def clear(self):
         """Очистка буфера."""
-        self.frames = b""
+        self.frames.clear()
         self._start_time = 0
 
     def get_wav_bytes(self) -> bytes:
@@ -262,16 +694,29 @@ class AudioBuffer:
         Returns:
             WAV байты текущего буфера
         """
-        return self._create_wav_bytes(self.frames)
+        with self.frames.view() as pcm:
+            return self.create_wav_bytes(pcm)
+
 
+# Бипы: частота, Гц, и штатная длительность, с
+BEEP_TONES = {
+    'start': (600, 0.08),
+    'end': (1200, 0.12),
+}
+BEEP_SAMPLE_RATE = 16000
 
-_SOUND_CACHE: dict = {}
-_KEEPALIVE_PROC = None
+# Задержка бипа окончания — даёт PipeWire освободить ресурсы записи
+END_BEEP_DELAY = 0.15
+
+_SOUND_SETTINGS: Optional[dict] = None
+_SOUNDS: Dict[str, bytes] = {}
+_PLAYBACK: Optional[PlaybackEngine] = None
+_PLAYBACK_TRIED = False
 
 
 def _sound_settings() -> dict:
     """
-    Настройки звуковых уведомлений из окружения.
+    Настройки звуковых уведомлений из окружения (читаются один раз).
 
     Нужны для обхода «спящего» аудиовыхода без правки системных конфигов:
     PipeWire паркует нод после 5 с тишины, а устройство (обычно HDMI на
@@ -283,6 +728,10 @@ def _sound_settings() -> dict:
     MICPY_SOUND_DURATION_MS  длительность бипа (0 — штатная: 80/120 мс)
     MICPY_SOUND_VOLUME       амплитуда 0.0–1.0 (по умолчанию 0.3)
     """
+    global _SOUND_SETTINGS
+    if _SOUND_SETTINGS is not None:
+        return _SOUND_SETTINGS
+
     def _num(name, default, cast):
         try:
             v = cast(os.environ.get(name, '').strip())
@@ -291,12 +740,13 @@ def _sound_settings() -> dict:
         return v if v >= 0 else default
 
     truthy = ('1', 'true', 'yes', 'on')
-    return {
+    _SOUND_SETTINGS = {
         'keepalive': os.environ.get('MICPY_SOUND_KEEPALIVE', '').strip().lower() in truthy,
         'warmup_ms': _num('MICPY_SOUND_WARMUP_MS', 0, int),
         'duration_ms': _num('MICPY_SOUND_DURATION_MS', 0, int),
         'volume': min(1.0, _num('MICPY_SOUND_VOLUME', 0.3, float)),
     }
+    return _SOUND_SETTINGS
 
 
 def _clean_env() -> dict:
@@ -309,228 +759,120 @@ def _clean_env() -> dict:
     }
 
 
-def _get_beep_wav(sound_type: str) -> str:
-    """Возвращает путь к WAV-файлу с beep-звуком (генерирует при первом вызове)."""
-    cfg = _sound_settings()
-    key = (sound_type, cfg['warmup_ms'], cfg['duration_ms'], cfg['volume'])
-    if key in _SOUND_CACHE:
-        return _SOUND_CACHE[key]
-
-    params = {
-        'start': {'freq': 600, 'duration': 0.08},
-        'end': {'freq': 1200, 'duration': 0.12},
-    }
-    p = params.get(sound_type, params['end'])
-
-    duration = cfg['duration_ms'] / 1000 if cfg['duration_ms'] else p['duration']
-    amp = cfg['volume']
-    warmup = cfg['warmup_ms'] / 1000
-
-    # Имя файла зависит от параметров — иначе в /tmp останется старый кеш
-    tag = f"_w{cfg['warmup_ms']}_d{int(duration * 1000)}_v{int(amp * 100)}"
-    if key[1:] == (0, 0, 0.3):
-        tag = ''
-    path = os.path.join(tempfile.gettempdir(), f'micpy_{sound_type}{tag}.wav')
-
-    if not os.path.exists(path):
-        sr = 16000
-        n = int(sr * duration)
-        with wave.open(path, 'w') as f:
-            f.setnchannels(1)
-            f.setsampwidth(2)
-            f.setframerate(sr)
-            fade_n = max(1, min(200, n // 4))
-            frames = bytearray(b'\x00\x00' * int(sr * warmup))
-            for i in range(n):
-                fade = min(1.0, i / fade_n, (n - i) / fade_n)
-                v = int(32767 * amp * fade * math.sin(2 * math.pi * p['freq'] * i / sr))
-                frames += struct.pack('<h', v)
-            f.writeframes(frames)
-
-    _SOUND_CACHE[key] = path
-    return path
-
-
-def _play_wav_pyaudio(wav_path: str) -> bool:
-    """Проиграть WAV через PyAudio output stream (fallback для систем без pw-play)."""
-    try:
-        if platform.system() != 'Darwin':
-            cm = _suppress_alsa_warnings_ctx()
-        else:
-            cm = contextlib.nullcontext()
-
-        with cm:
-            wf = wave.open(wav_path, 'rb')
-            pa = pyaudio.PyAudio()
-            try:
-                stream = pa.open(
-                    format=pa.get_format_from_width(wf.getsampwidth()),
-                    channels=wf.getnchannels(),
-                    rate=wf.getframerate(),
-                    output=True
-                )
-                stream.start_stream()
-                data = wf.readframes(wf.getnframes())
-                stream.write(data)
-
-                import time as _time
-                audio_ms = len(data) / (wf.getframerate() * wf.getsampwidth() * wf.getnchannels()) * 1000
-                _time.sleep(audio_ms / 1000 + 0.05)
-
-                stream.stop_stream()
-                stream.close()
-            finally:
-                pa.terminate()
-                wf.close()
-
-        return True
-    except Exception:
-        return False
-
-
-@contextlib.contextmanager
-def _suppress_alsa_warnings_ctx():
-    """Подавление ALSA warnings."""
-    try:
-        with open(os.devnull, 'w') as devnull:
-            old_stderr = os.dup(2)
-            os.dup2(devnull.fileno(), 2)
-            try:
-                yield
-            finally:
-                os.dup2(old_stderr, 2)
-                os.close(old_stderr)
-    except Exception:
-        yield
-
-
-def play_sound(sound_type: str = 'start'):
+def synthesize_tone(
+    freq: float,
+    duration: float,
+    volume: float,
+    warmup: float = 0.0,
+    sample_rate: int = BEEP_SAMPLE_RATE
+) -> bytes:
     """
-    Воспроизведение звука-уведомления.
-
-    Использует оторванный subprocess с чистым окружением и задержкой —
-    чтобы дать PipeWire время освободить ресурсы записи.
+    Синусоида с плавными краями в PCM 16-bit моно.
 
     Args:
-        sound_type: 'start' для начала записи, 'end' для окончания
-    """
-    import logging
-    logger = logging.getLogger('PlaySound')
+        freq: Частота, Гц
+        duration: Длительность тона, с
+        volume: Амплитуда 0.0–1.0
+        warmup: Тишина перед тоном, с
+        sample_rate: Частота дискретизации
 
-    wav_path = _get_beep_wav(sound_type)
+    Returns:
+        PCM little-endian int16
+    """
+    n = int(sample_rate * duration)
+    fade_n = max(1, min(200, n // 4))
+    i = np.arange(n, dtype=np.float64)
+    fade = np.minimum(1.0, np.minimum(i, n - i) / fade_n)
+    # astype отбрасывает дробную часть к нулю — как int() в прежней версии
+    tone = (32767 * volume * fade * np.sin(2 * np.pi * freq * i / sample_rate)).astype('<i2')
+    silence = b'\x00\x00' * int(sample_rate * warmup)
+    return silence + tone.tobytes()
 
-    clean_env = _clean_env()
 
-    pw_play = shutil.which('pw-play')
-    if pw_play:
-        delay = '0.15' if sound_type == 'end' else '0'
-        try:
-            proc = subprocess.Popen(
-                ['bash', '-c', f'sleep {delay} && exec {pw_play} "{wav_path}"'],
-                env=clean_env,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True
-            )
-            logger.info(f"pw-play pid={proc.pid}, sound={sound_type}")
-            return
-        except Exception as e:
-            logger.warning(f"pw-play failed: {e}")
+def prepare_sounds():
+    """
+    Подготовить звуковые уведомления при старте демона или редактора.
 
-    if _play_wav_pyaudio(wav_path):
-        logger.info(f"played via pyaudio fallback, sound={sound_type}")
+    Настройки читаются и тоны синтезируются один раз — play_sound потом
+    не трогает ни окружение, ни файловую систему. Повторный вызов ничего
+    не делает.
+    """
+    if _SOUNDS:
         return
 
-    try:
-        print('\a', end='', flush=True)
-    except Exception:
-        pass
-
+    cfg = _sound_settings()
+    for sound_type, (freq, default_duration) in BEEP_TONES.items():
+        duration = cfg['duration_ms'] / 1000 if cfg['duration_ms'] else default_duration
+        _SOUNDS[sound_type] = synthesize_tone(
+            freq, duration, cfg['volume'], cfg['warmup_ms'] / 1000
+        )
 
-def _get_silence_wav(seconds: int = 10) -> str:
-    """
-    WAV с тишиной — «носитель» для keepalive-потока.
 
-    Длительность заодно задаёт период, с которым keepalive проверяет,
-    жив ли ещё родительский процесс.
-    """
-    path = os.path.join(tempfile.gettempdir(), f'micpy_silence_{seconds}s.wav')
-    if not os.path.exists(path):
-        sr = 8000
-        with wave.open(path, 'w') as f:
-            f.setnchannels(1)
-            f.setsampwidth(2)
-            f.setframerate(sr)
-            f.writeframes(b'\x00\x00' * (sr * seconds))
-    return path
-
-
-def start_keepalive() -> bool:
+def start_playback() -> bool:
     """
-    Не даёт аудиовыходу заснуть: непрерывно проигрывает тишину.
-
-    Обход проблемы, когда PipeWire паркует нод после 5 с тишины, а устройство
-    (обычно HDMI) съедает короткий бип на пробуждении. Делает то же, что
-    системная настройка session.suspend-timeout-seconds=0, но из приложения
-    и без правки конфигов WirePlumber.
+    Открыть постоянный поток вывода для звуковых уведомлений.
 
-    Включается через MICPY_SOUND_KEEPALIVE=1. Без неё — no-op.
+    pw-play с чистым окружением (SOUND_DEBUGGING.md, Эксперимент 7) или
+    PyAudio. С MICPY_SOUND_KEEPALIVE=1 в поток непрерывно пишется тишина —
+    аудиовыход не засыпает и не съедает короткий бип на пробуждении (то же,
+    что системная session.suspend-timeout-seconds=0, но из приложения).
 
     Returns:
-        True если keepalive запущен
+        True если вывод открыт
     """
-    global _KEEPALIVE_PROC
-    import logging
-    logger = logging.getLogger('PlaySound')
+    global _PLAYBACK, _PLAYBACK_TRIED
+    if _PLAYBACK is not None:
+        return True
 
-    if not _sound_settings()['keepalive']:
+    _PLAYBACK_TRIED = True
+    prepare_sounds()
+    engine = PlaybackEngine(
+        BEEP_SAMPLE_RATE,
+        keepalive=_sound_settings()['keepalive'],
+        pw_play=shutil.which('pw-play'),
+        env=_clean_env()
+    )
+    if not engine.start():
+        logger.warning("No audio output for notification sounds")
         return False
+    _PLAYBACK = engine
+    atexit.register(stop_playback)
+    return True
 
-    if _KEEPALIVE_PROC and _KEEPALIVE_PROC.poll() is None:
-        return True
 
-    pw_play = shutil.which('pw-play')
-    if not pw_play:
-        logger.warning("keepalive: pw-play not found, skipping")
-        return False
+def stop_playback():
+    """Закрыть поток вывода (вместе с pw-play)."""
+    global _PLAYBACK
+    engine, _PLAYBACK = _PLAYBACK, None
+    if engine is not None:
+        engine.stop()
 
-    silence = _get_silence_wav()
-    # Сторож по PID родителя: цикл завершится сам, даже если демон убит
-    # сигналом и штатный stop_keepalive() не успел отработать (SIGTERM от
-    # systemd, SIGKILL). Иначе keepalive остаётся сиротой и держит устройство.
-    watchdog = f'while kill -0 {os.getpid()} 2>/dev/null; do'
-    try:
-        # Отдельная сессия — чтобы убить всю группу разом. Из cgroup systemd
-        # процесс при этом не выходит, поэтому сиротой не останется.
-        _KEEPALIVE_PROC = subprocess.Popen(
-            ['bash', '-c', f'{watchdog} {pw_play} "{silence}" || sleep 1; done'],
-            env=_clean_env(),
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            start_new_session=True
-        )
-    except Exception as e:
-        logger.warning(f"keepalive failed: {e}")
-        return False
 
-    atexit.register(stop_keepalive)
-    logger.info(f"keepalive started, pid={_KEEPALIVE_PROC.pid}")
-    return True
+def play_sound(sound_type: str = 'start'):
+    """
+    Воспроизведение звука-уведомления.
 
+    Бип подмешивается в постоянный поток вывода: без запуска процессов и
+    без ожидания. Бип окончания звучит с задержкой END_BEEP_DELAY.
+
+    Args:
+        sound_type: 'start' для начала записи, 'end' для окончания
+    """
+    if _PLAYBACK is None:
+        # Вывод не открыт при старте — одна попытка, не на каждом бипе
+        if _PLAYBACK_TRIED or not start_playback():
+            _bell()
+            return
+
+    pcm = _SOUNDS.get(sound_type) or _SOUNDS['end']
+    delay = END_BEEP_DELAY if sound_type == 'end' else 0.0
+    if not _PLAYBACK.play(pcm, delay):
+        _bell()
 
-def stop_keepalive():
-    """Останавливает keepalive-поток (вместе с дочерним pw-play)."""
-    global _KEEPALIVE_PROC
-    proc, _KEEPALIVE_PROC = _KEEPALIVE_PROC, None
-    if not proc or proc.poll() is not None:
-        return
 
+def _bell():
+    """Последний запасной вариант — терминальный звонок."""
     try:
-        # Убиваем всю группу: сам bash-цикл и запущенный им pw-play
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-        proc.wait(timeout=2)
+        print('\a', end='', flush=True)
     except Exception:
-        try:
-            proc.kill()
-        except Exception:
-            pass
+        pass
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Кодеки для загрузки аудио в API.
+
+Сырой 16-bit PCM WAV — это 32 КБ на секунду звука; по VPN до общего
+GPU-сервера загрузка занимает больше времени, чем распознавание. Модуль
+кодирует PCM из AudioBuffer в более компактные форматы:
+
+- wav   — 16-bit PCM, без сжатия (всегда доступен)
+- mulaw — WAV с G.711 μ-law, 8 бит на сэмпл (×2, кодируется NumPy)
+- flac  — без потерь, ~×1.7 (pysoundfile или ffmpeg)
+- opus  — Ogg/Opus 24 кбит/с, ~×10 (ffmpeg или opusenc)
+
+и выбирает кодек в режиме auto по измеренной пропускной способности канала
+и длине записи.
+"""
+
+import io
+import logging
+import shutil
+import struct
+import subprocess
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('AudioCodecs')
+
+CODECS = ('wav', 'mulaw', 'flac', 'opus')
+CODEC_CHOICES = CODECS + ('auto',)
+
+# Имя файла и MIME для multipart-загрузки
+_CODEC_FORMATS = {
+    'wav': ('audio.wav', 'audio/wav'),
+    'mulaw': ('audio.wav', 'audio/wav'),
+    'flac': ('audio.flac', 'audio/flac'),
+    'opus': ('audio.ogg', 'audio/ogg'),
+}
+
+# Типичный размер относительно 16-bit PCM и оценка стоимости кодирования
+# (секунды на секунду аудио + фиксированная часть, например запуск процесса)
+_CODEC_SIZE_RATIO = {'wav': 1.0, 'mulaw': 0.5, 'flac': 0.6, 'opus': 0.1}
+_CODEC_COST = {
+    'wav': (0.0, 0.0),
+    'mulaw': (0.0005, 0.0),
+    'flac': (0.002, 0.0),
+    'opus': (0.01, 0.05),
+}
+
+OPUS_BITRATE = '24k'
+
+_FFMPEG = None
+_AVAILABLE: Optional[List[str]] = None
+
+
+def _ffmpeg() -> Optional[str]:
+    global _FFMPEG
+    if _FFMPEG is None:
+        _FFMPEG = shutil.which('ffmpeg') or ''
+    return _FFMPEG or None
+
+
+def _soundfile():
+    try:
+        import soundfile
+        return soundfile
+    except (ImportError, OSError):
+        return None
+
+
+def available_codecs() -> List[str]:
+    """Кодеки, которые можно использовать в этой системе (проверяется один раз)."""
+    global _AVAILABLE
+    if _AVAILABLE is None:
+        codecs = ['wav', 'mulaw']
+        if _soundfile() is not None or _ffmpeg():
+            codecs.append('flac')
+        if _ffmpeg() or shutil.which('opusenc'):
+            codecs.append('opus')
+        _AVAILABLE = codecs
+    return list(_AVAILABLE)
+
+
+def wav_to_pcm(wav_bytes: bytes) -> Tuple[bytes, int, int]:
+    """
+    Извлечь PCM из WAV.
+
+    Returns:
+        (pcm, sample_rate, channels)
+    """
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV is supported")
+        return (
+            wav_file.readframes(wav_file.getnframes()),
+            wav_file.getframerate(),
+            wav_file.getnchannels(),
+        )
+
+
+def wav_duration(wav_bytes: bytes) -> Optional[float]:
+    """Длина WAV в секундах по заголовку (None, если это не WAV)."""
+    try:
+        with wave.open(io.BytesIO(wav_bytes), 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def _encode_wav(pcm: bytes, sample_rate: int, channels: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _mulaw_compress(pcm: bytes) -> bytes:
+    """G.711 μ-law (как в эталонной реализации CCITT), векторно по всем сэмплам."""
+    x = np.frombuffer(pcm, dtype='<i2').astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(x), 8159) + 33
+    segment = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    mantissa = (magnitude >> (segment + 1)) & 0x0F
+    code = np.where(segment >= 8, 0x7F, (segment << 4) | mantissa)
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+def _encode_mulaw(pcm: bytes, sample_rate: int, channels: int) -> bytes:
+    """WAV с WAVE_FORMAT_MULAW (7): fmt с cbSize и обязательный для не-PCM fact."""
+    data = _mulaw_compress(pcm)
+    fmt = struct.pack('<HHIIHHH', 7, channels, sample_rate, sample_rate * channels,
+                      channels, 8, 0)
+    fact = struct.pack('<I', len(data) // channels)
+    body = b''.join([
+        b'WAVE',
+        b'fmt ', struct.pack('<I', len(fmt)), fmt,
+        b'fact', struct.pack('<I', len(fact)), fact,
+        b'data', struct.pack('<I', len(data)), data,
+        b'\x00' if len(data) % 2 else b'',
+    ])
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def _run_encoder(cmd: List[str], wav_bytes: bytes) -> bytes:
+    result = subprocess.run(cmd, input=wav_bytes, capture_output=True, timeout=30)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"{cmd[0]} failed: {result.stderr.decode(errors='replace')[-200:]}")
+    return result.stdout
+
+
+def _encode_flac(pcm: bytes, sample_rate: int, channels: int) -> bytes:
+    soundfile = _soundfile()
+    if soundfile is not None:
+        samples = np.frombuffer(pcm, dtype='<i2').reshape(-1, channels)
+        buffer = io.BytesIO()
+        soundfile.write(buffer, samples, sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue()
+    return _run_encoder(
+        [_ffmpeg(), '-loglevel', 'error', '-i', 'pipe:0', '-f', 'flac', 'pipe:1'],
+        _encode_wav(pcm, sample_rate, channels)
+    )
+
+
+def _encode_opus(pcm: bytes, sample_rate: int, channels: int) -> bytes:
+    wav_bytes = _encode_wav(pcm, sample_rate, channels)
+    if _ffmpeg():
+        return _run_encoder(
+            [_ffmpeg(), '-loglevel', 'error', '-i', 'pipe:0', '-c:a', 'libopus',
+             '-b:a', OPUS_BITRATE, '-application', 'voip', '-f', 'ogg', 'pipe:1'],
+            wav_bytes
+        )
+    return _run_encoder(
+        ['opusenc', '--quiet', '--speech', '--bitrate', OPUS_BITRATE.rstrip('k'), '-', '-'],
+        wav_bytes
+    )
+
+
+_ENCODERS = {
+    'wav': _encode_wav,
+    'mulaw': _encode_mulaw,
+    'flac': _encode_flac,
+    'opus': _encode_opus,
+}
+
+
+def encode_pcm(
+    pcm: bytes,
+    sample_rate: int,
+    channels: int,
+    codec: str
+) -> Tuple[bytes, str, str]:
+    """
+    Закодировать 16-bit PCM.
+
+    Returns:
+        (байты файла, имя файла, MIME-тип)
+    """
+    data = _ENCODERS[codec](pcm, sample_rate, channels)
+    filename, mime = _CODEC_FORMATS[codec]
+    return data, filename, mime
+
+
+def choose_codec(
+    audio_seconds: float,
+    throughput: Optional[float],
+    candidates: List[str],
+    bytes_per_second: int = 32000
+) -> str:
+    """
+    Выбрать кодек с минимальным ожидаемым временем «кодирование + загрузка».
+
+    Args:
+        audio_seconds: Длина записи
+        throughput: Оценка пропускной способности канала, байт/с
+            (None — ещё не измерена, тогда WAV)
+        candidates: Допустимые кодеки в порядке предпочтения (при равенстве
+            выигрывает стоящий раньше)
+        bytes_per_second: Размер PCM в секунду
+
+    Returns:
+        Имя кодека
+    """
+    if not throughput:
+        return 'wav'
+
+    raw = audio_seconds * bytes_per_second
+    best, best_cost = 'wav', raw / throughput
+    for codec in candidates:
+        per_second, fixed = _CODEC_COST[codec]
+        cost = fixed + per_second * audio_seconds + raw * _CODEC_SIZE_RATIO[codec] / throughput
+        if cost < best_cost:
+            best, best_cost = codec, cost
+    return best
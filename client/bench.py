@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки «остановка → текст» (micpy bench).
+
+Гоняет настоящий VoiceInputDaemon на заранее записанном аудио: микрофон
+подменяется проигрыванием PCM, вывод текста — по выбору (по умолчанию
+никуда не печатается). Для каждой длины фразы делается N прогонов, по
+каждому этапу считаются p50/p95/p99. Результат — JSON, чтобы сравнивать
+релизы между собой.
+
+Этапы (prepare, upload и inference — по отметкам трассы фразы):
+- stop      — остановка записи: от триггера до готового WAV (включает encode)
+- encode    — упаковка PCM в WAV
+- prepare   — от готового WAV до первого запроса: VAD, сжатие, очередь пула
+- upload    — загрузка тела первого запроса
+- inference — от загруженного тела до последнего ответа: распознавание, повторы
+- deliver   — от ответа до передачи текста в вывод
+- output    — вывод текста (_output_text)
+- total     — от триггера остановки до выведенного текста
+
+При потоковой и сегментированной загрузке первый запрос уходит до остановки:
+prepare отрицателен, а upload у потоковой загрузки не отмечается.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from client import voice_daemon
+from client.audio_buffer import AudioBuffer
+from client.output_backends import FakeBackend, TextOutput
+from client.voice_daemon import VoiceInputDaemon
+
+logger = logging.getLogger('Bench')
+
+DEFAULT_LENGTHS = (2.0, 5.0, 15.0)
+DEFAULT_RUNS = 10
+STAGES = ('stop', 'encode', 'prepare', 'upload', 'inference', 'deliver', 'output', 'total')
+PERCENTILES = (50, 95, 99)
+
+
+def load_pcm(path: str, sample_rate: int = 16000) -> bytes:
+    """
+    PCM из WAV-файла (16-bit, моно, sample_rate).
+
+    Raises:
+        ValueError: если формат не подходит
+    """
+    with wave.open(path, 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1:
+            raise ValueError(f"{path}: need 16-bit mono WAV")
+        if wav_file.getframerate() != sample_rate:
+            raise ValueError(f"{path}: need {sample_rate} Hz, got {wav_file.getframerate()} Hz")
+        return wav_file.readframes(wav_file.getnframes())
+
+
+def synth_speech(seconds: float, sample_rate: int = 16000) -> bytes:
+    """
+    Речеподобный сигнал: гармонические «слоги» с паузами между фразами.
+
+    Проходит VAD, но настоящий сервер распознает в нём пустой текст —
+    для осмысленных замеров вывода нужна настоящая запись (--audio).
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    # Фраза 2.5 с, пауза 0.7 с
+    phrases = (t % 3.2) < 2.5
+    signal = voice * syllables * phrases
+    signal = signal / max(1e-9, np.abs(signal).max()) * 8000
+    return signal.astype('<i2').tobytes()
+
+
+def fit_pcm(pcm: bytes, seconds: float, sample_rate: int = 16000) -> bytes:
+    """Обрезать или зациклить PCM до нужной длины."""
+    need = int(seconds * sample_rate) * 2
+    if not pcm:
+        return bytes(need)
+    repeats = -(-need // len(pcm))
+    return (pcm * repeats)[:need]
+
+
+class ReplayAudioBuffer(AudioBuffer):
+    """
+    AudioBuffer, который вместо микрофона проигрывает заданный PCM.
+
+    «Микрофон» — поток, который, как PortAudio, раз в chunk_size сэмплов
+    вызывает _stream_callback: с данными записи, пока они есть, дальше с
+    тишиной. Поэтому hot mic, потоковая и сегментированная загрузка
+    работают как обычно. Без realtime весь PCM попадает в запись сразу
+    при старте.
+    """
+
+    def __init__(self, *args, realtime: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.realtime = realtime
+        self.encode_time = 0.0
+        self.stopped_at = 0.0
+        self._source = b''
+        self._pending = b''
+        self._pending_lock = threading.Lock()
+        self._mic: Optional[threading.Thread] = None
+        self._mic_stop = threading.Event()
+
+    def load(self, pcm: bytes):
+        """Задать аудио для следующих записей."""
+        self._source = pcm
+
+    @property
+    def _chunk_bytes(self) -> int:
+        return self.chunk_size * self.channels * self.sample_width
+
+    def _open_stream(self):
+        self._audio_stream = self
+        self._mic_stop.clear()
+        self._mic = threading.Thread(target=self._run_mic, name='replay-mic', daemon=True)
+        self._mic.start()
+
+    def _run_mic(self):
+        interval = self.chunk_size / self.sample_rate
+        next_at = time.perf_counter()
+        while True:
+            next_at += interval
+            if self._mic_stop.wait(max(0.0, next_at - time.perf_counter())):
+                return
+            with self._pending_lock:
+                chunk = self._pending[:self._chunk_bytes]
+                self._pending = self._pending[len(chunk):]
+            self._feed(chunk.ljust(self._chunk_bytes, b'\x00'))
+
+    def _feed(self, data: bytes):
+        self._stream_callback(data, len(data) // (self.channels * self.sample_width), None, 0)
+
+    def start_recording(self) -> bool:
+        source = self._source if self.realtime else b''
+        if self._audio_stream is not None:
+            # Hot mic: поток уже идёт, данные записи — только после старта
+            ok = super().start_recording()
+            with self._pending_lock:
+                self._pending = source
+        else:
+            with self._pending_lock:
+                self._pending = source
+            ok = super().start_recording()
+        if ok and not self.realtime:
+            for i in range(0, len(self._source), self._chunk_bytes):
+                self._feed(self._source[i:i + self._chunk_bytes])
+        return ok
+
+    def _cleanup_audio(self):
+        self._mic_stop.set()
+        if self._mic is not None:
+            self._mic.join()
+        self._mic = None
+        self._audio_stream = None
+
+    def stop_recording(self) -> bytes:
+        wav_bytes = super().stop_recording()
+        self.stopped_at = time.perf_counter()
+        return wav_bytes
+
+    def get_wav_bytes(self) -> bytes:
+        started = time.perf_counter()
+        wav_bytes = super().get_wav_bytes()
+        self.encode_time = time.perf_counter() - started
+        return wav_bytes
+
+
+class BenchDaemon(VoiceInputDaemon):
+    """VoiceInputDaemon на проигрываемом аудио с отметками времени этапов."""
+
+    def __init__(self, *args, output: str = 'none', realtime: bool = False, **kwargs):
+        """
+        Args:
+            output: none — текст не выводится; clipboard/injection — как у демона
+            realtime: Подавать аудио в реальном времени (нужно для stream/segmented)
+        """
+        if output == 'none':
+            # Файловый вывод ничего не открывает до первой записи, а в
+            # отличие от auto не запускает владельца буфера обмена
+            kwargs.update(output_mode='file', output_file=Path(os.devnull))
+        else:
+            kwargs['output_mode'] = output
+        super().__init__(*args, **kwargs)
+        if output == 'none':
+            # Текст остаётся в памяти — вывод не влияет на замер
+            self.output.close()
+            self.output = TextOutput([FakeBackend()], self.metrics)
+        self.audio_buffer = ReplayAudioBuffer(
+            sample_rate=16000,
+            channels=1,
+            hot_mic=self.audio_buffer.hot_mic,
+            preroll_ms=self.audio_buffer.preroll_ms,
+            realtime=realtime
+        )
+        self.marks: Dict[str, float] = {}
+        self.trace_marks: Dict[str, float] = {}
+
+    def _observe_trace(self, trace):
+        if trace is not None:
+            self.trace_marks = dict(trace.marks)
+        super()._observe_trace(trace)
+
+    def _output_text(self, text: str) -> bool:
+        self.marks['text'] = time.perf_counter()
+        ok = super()._output_text(text)
+        self.marks['output'] = time.perf_counter()
+        return ok
+
+    def measure(self, seconds: float) -> Optional[Dict[str, float]]:
+        """
+        Одна запись: старт, seconds аудио, остановка и распознавание.
+
+        Returns:
+            Длительности этапов в мс или None, если текста нет. Этапа нет,
+            если трасса его не отметила (upload при потоковой загрузке)
+        """
+        self.marks = {}
+        self.trace_marks = {}
+        self.toggle_recording()
+        if self.audio_buffer.realtime:
+            time.sleep(seconds)
+        self.marks['trigger'] = time.perf_counter()
+        self.toggle_recording(wait=True)
+
+        marks = self.marks
+        if 'output' not in marks:
+            return None
+        stopped = self.audio_buffer.stopped_at
+        ms = 1000.0
+        sample = {
+            'stop': (stopped - marks['trigger']) * ms,
+            'encode': self.audio_buffer.encode_time * ms,
+        }
+        # Отметки трассы и бенчмарка — по одним часам (time.perf_counter)
+        points = dict(self.trace_marks, stopped=stopped, text=marks['text'])
+        for stage, start, end in (
+            ('prepare', 'stopped', 'request_sent'),
+            ('upload', 'request_sent', 'upload_done'),
+            ('inference', 'upload_done', 'response_received'),
+            ('deliver', 'response_received', 'text'),
+        ):
+            if start in points and end in points:
+                sample[stage] = (points[end] - points[start]) * ms
+        sample['output'] = (marks['output'] - marks['text']) * ms
+        sample['total'] = (marks['output'] - marks['trigger']) * ms
+        return sample
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99, среднее, минимум и максимум по каждому этапу, мс."""
+    summary = {}
+    for stage in STAGES:
+        values = np.array([s[stage] for s in samples if stage in s])
+        if not len(values):
+            continue
+        stats = {f'p{p}': float(np.percentile(values, p)) for p in PERCENTILES}
+        stats.update(mean=float(values.mean()), min=float(values.min()), max=float(values.max()))
+        summary[stage] = {k: round(v, 3) for k, v in stats.items()}
+    return summary
+
+
+@contextlib.contextmanager
+def _quiet(sounds: bool, verbose: bool):
+    """Без бипов и без INFO-логов демона на время прогона, логи — в stderr."""
+    play_sound = voice_daemon.play_sound
+    root = logging.getLogger()
+    level = root.level
+    if not sounds:
+        voice_daemon.play_sound = lambda *_args, **_kwargs: None
+    if not verbose:
+        root.setLevel(logging.WARNING)
+    # Демон логирует в stdout, а там JSON-результат
+    redirected = [
+        h for h in root.handlers
+        if isinstance(h, logging.StreamHandler) and h.stream is sys.stdout
+    ]
+    for handler in redirected:
+        handler.setStream(sys.stderr)
+    try:
+        yield
+    finally:
+        voice_daemon.play_sound = play_sound
+        root.setLevel(level)
+        for handler in redirected:
+            handler.setStream(sys.stdout)
+
+
+def run_bench(
+    api_url: str,
+    model: str,
+    lengths: Sequence[float] = DEFAULT_LENGTHS,
+    runs: int = DEFAULT_RUNS,
+    warmup: int = 1,
+    audio: Optional[str] = None,
+    realtime: bool = False,
+    output: str = 'none',
+    sounds: bool = False,
+    verbose: bool = False,
+    **daemon_kwargs
+) -> Dict[str, Any]:
+    """
+    Прогнать бенчмарк.
+
+    Args:
+        api_url: URL API (можно несколько через запятую)
+        model: Модель
+        lengths: Длины фраз, секунды
+        runs: Замеров на каждую длину
+        warmup: Прогревочных прогонов на длину (не учитываются)
+        audio: WAV-файл 16 кГц моно (None — синтетический сигнал)
+        realtime: Подавать аудио в реальном времени
+        output: none/clipboard/injection
+        sounds: Проигрывать бипы
+        verbose: Не приглушать логи демона
+        **daemon_kwargs: Прочие параметры VoiceInputDaemon (upload_mode, codec, ...)
+
+    Returns:
+        Результаты для json.dumps
+    """
+    source = load_pcm(audio) if audio else None
+    # Повторы одной и той же записи не должны попадать в кэш
+    daemon_kwargs['cache'] = 'off'
+
+    with _quiet(sounds, verbose):
+        daemon = BenchDaemon(
+            api_url=api_url,
+            model=model,
+            output=output,
+            realtime=realtime,
+            **daemon_kwargs
+        )
+        if daemon.hot_mic:
+            daemon.audio_buffer.open()
+        results = {}
+        try:
+            for seconds in lengths:
+                pcm = fit_pcm(source, seconds) if source else synth_speech(seconds)
+                daemon.audio_buffer.load(pcm)
+                samples = []
+                failures = 0
+                for i in range(warmup + runs):
+                    sample = daemon.measure(seconds)
+                    if i < warmup:
+                        continue
+                    if sample is None:
+                        failures += 1
+                    else:
+                        samples.append(sample)
+                results[f'{seconds:g}'] = {
+                    'audio_seconds': seconds,
+                    'runs': runs,
+                    'failures': failures,
+                    'stages_ms': summarize(samples),
+                }
+        finally:
+            daemon.close()
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': {
+            'api_url': api_url,
+            'model': model,
+            'audio': audio or 'synthetic',
+            'runs': runs,
+            'warmup': warmup,
+            'realtime': realtime,
+            'output': output,
+            'upload_mode': daemon.upload_mode,
+            'codec': daemon.api_client.codec,
+            'hot_mic': daemon.hot_mic,
+            'vad': daemon.vad is not None,
+        },
+        'results': results,
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Краткая таблица p50/p95/p99 для человека."""
+    out = io.StringIO()
+    for length, result in report['results'].items():
+        out.write(f"{length}s audio: {result['runs']} runs, {result['failures']} failed\n")
+        for stage, stats in result['stages_ms'].items():
+            out.write(
+                f"  {stage:<10} p50 {stats['p50']:9.1f}  p95 {stats['p95']:9.1f}  "
+                f"p99 {stats['p99']:9.1f} ms\n"
+            )
+    return out.getvalue()
+
+
+def main(args) -> int:
+    """Точка входа для micpy bench (args — из cli.create_parser)."""
+    try:
+        lengths = [float(x) for x in args.lengths.split(',') if x.strip()]
+    except ValueError:
+        print(f"Invalid --lengths: {args.lengths}", file=sys.stderr)
+        return 2
+
+    report = run_bench(
+        api_url=args.api_url,
+        model=args.model,
+        lengths=lengths,
+        runs=args.runs,
+        warmup=args.warmup,
+        audio=args.audio,
+        realtime=args.realtime,
+        output=args.output,
+        sounds=args.sounds,
+        verbose=args.verbose,
+        upload_mode=args.upload_mode,
+        codec=args.codec,
+        hot_mic=args.hot_mic,
+        vad=args.vad,
+        hedge=args.hedge,
+    )
+
+    print(format_table(report), file=sys.stderr, end='')
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Results written to {args.json}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
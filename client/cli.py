@@ -5,18 +5,15 @@ CLI интерфейс для MicPy
 Модуль предоставляет точки входа для командной строки:
 - micpy: основной CLI интерфейс
 - mic-stream: алиас
+
+Клиентские модули импортируются внутри точек входа: `micpy trigger`
+запускается на каждое нажатие хоткея и не должен загружать редактор,
+аудио и HTTP-клиент (см. benchmarks/cli_import_time.py).
 """
 
 import argparse
 import sys
 import os
-from pathlib import Path
-
-# Импортируем функции из клиентских модулей
-try:
-    from client.minimal_editor import main as minimal_editor_main
-except ImportError:
-    minimal_editor_main = None
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -32,6 +29,9 @@ def create_parser() -> argparse.ArgumentParser:
   micpy --test                   # Тестовый режим
   micpy daemon                   # Запустить фоновый сервис голосового ввода
   micpy trigger                  # Отправить триггер на демон
+  micpy ctl status               # Команда демону, ответ в JSON
+  micpy bench --audio phrase.wav # Замер задержки «остановка → текст»
+  micpy mock-server              # Локальный мок сервера транскрипции
         """
     )
 
@@ -78,10 +78,79 @@ def create_parser() -> argparse.ArgumentParser:
     )
     daemon_parser.add_argument(
         '--output-mode',
-        choices=['auto', 'injection', 'clipboard'],
+        choices=['auto', 'injection', 'clipboard', 'stdout', 'file'],
         default='auto',
         help='Режим вывода: auto (wtype если доступен, иначе clipboard), '
-             'injection (только wtype), clipboard (только буфер обмена)'
+             'injection (только wtype), clipboard (только буфер обмена), '
+             'stdout (строка NDJSON на фразу), file (дописывать в --output-file)'
+    )
+    daemon_parser.add_argument(
+        '--output-file',
+        default=None,
+        help='Файл для режима вывода file (env: MICPY_OUTPUT_FILE)'
+    )
+    daemon_parser.add_argument(
+        '--hot-mic',
+        action='store_true',
+        default=None,
+        help='Держать поток микрофона открытым между записями '
+             '(убирает задержку старта; env: MICPY_HOT_MIC)'
+    )
+    daemon_parser.add_argument(
+        '--preroll-ms',
+        type=int,
+        default=None,
+        help='Сколько мс звука до нажатия хоткея добавлять в начало записи, '
+             'например 300-1000 (включает --hot-mic; env: MICPY_PREROLL_MS)'
+    )
+    daemon_parser.add_argument(
+        '--upload-mode',
+        choices=['batch', 'stream', 'segmented'],
+        default=None,
+        help='Загрузка аудио: batch (целиком после остановки), '
+             'stream (потоково во время записи), segmented (сегменты между '
+             'паузами распознаются параллельно; env: MICPY_UPLOAD_MODE)'
+    )
+    daemon_parser.add_argument(
+        '--no-vad',
+        dest='vad',
+        action='store_false',
+        default=None,
+        help='Не обрезать тишину перед отправкой (env: MICPY_VAD=0)'
+    )
+    daemon_parser.add_argument(
+        '--max-pause-ms',
+        type=int,
+        default=None,
+        help='Сжимать внутренние паузы длиннее N мс (env: MICPY_VAD_MAX_PAUSE_MS)'
+    )
+    daemon_parser.add_argument(
+        '--codec',
+        choices=['wav', 'mulaw', 'flac', 'opus', 'auto'],
+        default=None,
+        help='Формат загрузки: wav, mulaw, flac, opus или auto (по пропускной '
+             'способности канала и длине записи; env: MICPY_CODEC)'
+    )
+    daemon_parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=None,
+        help='Дублировать запрос на другой сервер, если ответа нет дольше '
+             'p95 обычной задержки (env: MICPY_HEDGE)'
+    )
+    daemon_parser.add_argument(
+        '--cache',
+        choices=['off', 'memory', 'disk'],
+        default=None,
+        help='Кэш результатов для одинакового аудио: в памяти или ещё и на '
+             'диске в ~/.cache/micpy (env: MICPY_CACHE)'
+    )
+    daemon_parser.add_argument(
+        '--metrics',
+        default=None,
+        metavar='ADDRESS',
+        help='Метрики Prometheus: порт, host:port или путь к Unix сокету '
+             '(env: MICPY_METRICS)'
     )
 
     # Команда trigger
@@ -96,6 +165,226 @@ def create_parser() -> argparse.ArgumentParser:
         help='Путь к Unix сокету демона'
     )
 
+    # Команда ctl
+    ctl_parser = subparsers.add_parser(
+        'ctl',
+        help='Отправить команду демону и вывести ответ',
+        description='Команда протокола управления демоном; ответ — JSON '
+                    'с состоянием и таймингами. Код возврата 1, если ok=false'
+    )
+    ctl_parser.add_argument(
+        'ctl_command',
+        metavar='COMMAND',
+        choices=['start', 'stop', 'toggle', 'cancel', 'status', 'stats', 'last'],
+        help='start, stop, toggle, cancel, status, stats или last'
+    )
+    ctl_parser.add_argument(
+        '--socket-path',
+        default=None,
+        help='Путь к Unix сокету демона'
+    )
+    ctl_parser.add_argument(
+        '--wait',
+        action='store_true',
+        help='stop/toggle: ответить после распознавания и вывода фразы '
+             '(с текстом и таймингами)'
+    )
+    ctl_parser.add_argument(
+        '--timeout',
+        type=float,
+        default=150.0,
+        help='Сколько ждать ответа, с'
+    )
+
+    # Команда bench
+    bench_parser = subparsers.add_parser(
+        'bench',
+        help='Замерить задержку «остановка → текст»',
+        description='Прогоняет демон на заранее записанном аудио и выводит '
+                    'p50/p95/p99 по этапам в JSON'
+    )
+    bench_parser.add_argument(
+        '--api-url',
+        default=None,
+        help='URL Parakeet API (по умолчанию: PARAKEET_API_URL или http://localhost:5092/v1)'
+    )
+    bench_parser.add_argument(
+        '--model',
+        default=None,
+        help='Модель (по умолчанию: PARAKEET_MODEL или parakeet-tdt-0.6b-v3)'
+    )
+    bench_parser.add_argument(
+        '--audio',
+        default=None,
+        help='WAV-файл 16 кГц, 16 бит, моно; обрезается или зацикливается '
+             'до каждой длины (по умолчанию — синтетический сигнал)'
+    )
+    bench_parser.add_argument(
+        '--lengths',
+        default='2,5,15',
+        help='Длины фраз в секундах через запятую (по умолчанию: 2,5,15)'
+    )
+    bench_parser.add_argument(
+        '--runs',
+        type=int,
+        default=10,
+        help='Замеров на каждую длину (по умолчанию: 10)'
+    )
+    bench_parser.add_argument(
+        '--warmup',
+        type=int,
+        default=1,
+        help='Прогревочных прогонов на длину, не учитываются (по умолчанию: 1)'
+    )
+    bench_parser.add_argument(
+        '--realtime',
+        action='store_true',
+        help='Подавать аудио в реальном времени (нужно для stream/segmented)'
+    )
+    bench_parser.add_argument(
+        '--output',
+        choices=['none', 'clipboard', 'injection'],
+        default='none',
+        help='Куда выводить текст (по умолчанию никуда)'
+    )
+    bench_parser.add_argument(
+        '--upload-mode',
+        choices=['batch', 'stream', 'segmented'],
+        default=None,
+        help='Режим загрузки (env: MICPY_UPLOAD_MODE)'
+    )
+    bench_parser.add_argument(
+        '--codec',
+        choices=['wav', 'mulaw', 'flac', 'opus', 'auto'],
+        default=None,
+        help='Формат загрузки (env: MICPY_CODEC)'
+    )
+    bench_parser.add_argument(
+        '--hot-mic',
+        action='store_true',
+        default=None,
+        help='Режим hot mic (env: MICPY_HOT_MIC)'
+    )
+    bench_parser.add_argument(
+        '--no-vad',
+        dest='vad',
+        action='store_false',
+        default=None,
+        help='Не обрезать тишину (env: MICPY_VAD=0)'
+    )
+    bench_parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=None,
+        help='Хеджирование запросов (env: MICPY_HEDGE)'
+    )
+    bench_parser.add_argument(
+        '--sounds',
+        action='store_true',
+        help='Проигрывать звуки начала и конца записи'
+    )
+    bench_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Показывать логи демона'
+    )
+    bench_parser.add_argument(
+        '--json',
+        default=None,
+        help='Записать результат в файл вместо stdout'
+    )
+
+    # Команда mock-server
+    mock_parser = subparsers.add_parser(
+        'mock-server',
+        help='Запустить локальный мок сервера транскрипции',
+        description='OpenAI-совместимый мок (/health, /v1/models, '
+                    '/v1/audio/transcriptions) с настраиваемыми задержками и сбоями'
+    )
+    mock_parser.add_argument('--host', default='127.0.0.1', help='Адрес (по умолчанию: 127.0.0.1)')
+    mock_parser.add_argument('--port', type=int, default=5092, help='Порт (по умолчанию: 5092)')
+    mock_parser.add_argument(
+        '--model',
+        default='parakeet-tdt-0.6b-v3',
+        help='Имя модели в /v1/models'
+    )
+    mock_parser.add_argument(
+        '--latency',
+        default='fixed:0.05',
+        help='Распределение задержки, с: fixed:A, uniform:A,B, normal:MEAN,SD, '
+             'lognormal:MU,SIGMA, exp:MEAN (по умолчанию: fixed:0.05)'
+    )
+    mock_parser.add_argument(
+        '--rtf',
+        type=float,
+        default=0.0,
+        help='Дополнительные секунды обработки на секунду аудио'
+    )
+    mock_parser.add_argument(
+        '--bandwidth',
+        type=float,
+        default=0.0,
+        help='Скорость приёма загрузки, байт/с (0 — без ограничения)'
+    )
+    mock_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=0,
+        help='Одновременно обрабатываемых запросов, прочие ждут (0 — без ограничения)'
+    )
+    mock_parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Доля запросов с ошибкой (0.0–1.0)'
+    )
+    mock_parser.add_argument(
+        '--error-status',
+        type=int,
+        default=500,
+        help='HTTP-статус внедрённой ошибки (по умолчанию: 500)'
+    )
+    mock_parser.add_argument(
+        '--timeout-rate',
+        type=float,
+        default=0.0,
+        help='Доля запросов, на которые сервер не отвечает'
+    )
+    mock_parser.add_argument(
+        '--hang',
+        type=float,
+        default=600.0,
+        help='Сколько секунд держать такой запрос (по умолчанию: 600)'
+    )
+    mock_parser.add_argument(
+        '--drip-rate',
+        type=float,
+        default=0.0,
+        help='Доля ответов, которые отдаются медленно'
+    )
+    mock_parser.add_argument(
+        '--drip-bytes-per-s',
+        type=float,
+        default=20.0,
+        help='Скорость медленной отдачи, байт/с (по умолчанию: 20)'
+    )
+    mock_parser.add_argument(
+        '--text',
+        default=None,
+        help='Текст ответа (по умолчанию — длина и размер аудио)'
+    )
+    mock_parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Зерно генератора для воспроизводимых сбоев'
+    )
+    mock_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Логировать каждый запрос'
+    )
+
     return parser
 
 
@@ -109,6 +398,12 @@ def main():
         main_daemon(args)
     elif args.command == 'trigger':
         main_trigger(args)
+    elif args.command == 'ctl':
+        main_ctl(args)
+    elif args.command == 'bench':
+        main_bench(args)
+    elif args.command == 'mock-server':
+        main_mock_server(args)
     else:
         # Запускаем клиент с переданными аргументами
         main_client(args)
@@ -181,7 +476,9 @@ def main_client(args):
     # Заменяем sys.argv для оригинальной функции
     sys.argv = ['stt-client'] + original_args
 
-    if minimal_editor_main is None:
+    try:
+        from client.minimal_editor import main as minimal_editor_main
+    except ImportError:
         print("❌ Модуль клиента не найден")
         print("💡 Установите зависимости: pip install -e .")
         sys.exit(1)
@@ -193,8 +490,14 @@ def main_client(args):
 
 def main_daemon(args):
     """Точка входа для демона голосового ввода"""
+    import contextlib
+
+    # В режиме stdout там только распознанный текст — сообщения в stderr
+    out = sys.stderr if args.output_mode == 'stdout' else sys.stdout
+
     # Ищем и загружаем .env файл
-    load_env_file()
+    with contextlib.redirect_stdout(out):
+        load_env_file()
 
     # Устанавливаем переменные окружения из аргументов (если указаны)
     if hasattr(args, 'api_url') and args.api_url:
@@ -202,20 +505,31 @@ def main_daemon(args):
     if hasattr(args, 'model') and args.model:
         os.environ['PARAKEET_MODEL'] = args.model
 
-    print("Voice Input Daemon")
-    print(f"   API: {args.api_url}")
-    print(f"   Model: {args.model}")
-    print(f"   Socket: {args.socket_path or '~/.cache/voice-input.sock'}")
-    print(f"   Output mode: {args.output_mode}")
+    print("Voice Input Daemon", file=out)
+    print(f"   API: {args.api_url}", file=out)
+    print(f"   Model: {args.model}", file=out)
+    print(f"   Socket: {args.socket_path or '~/.cache/voice-input.sock'}", file=out)
+    print(f"   Output mode: {args.output_mode}", file=out)
 
     # Импортируем и запускаем демон
     try:
+        from pathlib import Path
         from client.voice_daemon import VoiceInputDaemon
         daemon = VoiceInputDaemon(
             api_url=args.api_url,
             model=args.model,
             socket_path=Path(args.socket_path) if args.socket_path else None,
-            output_mode=args.output_mode
+            output_mode=args.output_mode,
+            hot_mic=args.hot_mic,
+            preroll_ms=args.preroll_ms,
+            upload_mode=args.upload_mode,
+            vad=args.vad,
+            max_pause_ms=args.max_pause_ms,
+            codec=args.codec,
+            hedge=args.hedge,
+            cache=args.cache,
+            metrics=args.metrics,
+            output_file=Path(args.output_file) if args.output_file else None
         )
         daemon.run()
     except ImportError as e:
@@ -227,16 +541,49 @@ def main_daemon(args):
         print("\nDaemon stopped.")
 
 
+def main_bench(args):
+    """Точка входа для бенчмарка задержки"""
+    import contextlib
+
+    # stdout занят JSON-результатом — сообщения о конфигурации в stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        load_env_file()
+    args.api_url = args.api_url or os.environ.get('PARAKEET_API_URL', 'http://localhost:5092/v1')
+    args.model = args.model or os.environ.get('PARAKEET_MODEL', 'parakeet-tdt-0.6b-v3')
+
+    from client.bench import main as bench_main
+    sys.exit(bench_main(args))
+
+
+def main_mock_server(args):
+    """Точка входа для мок-сервера транскрипции"""
+    from client.mock_server import main as mock_server_main
+    sys.exit(mock_server_main(args))
+
+
 def main_trigger(args):
     """Точка входа для отправки триггера на демон"""
-    from client.voice_daemon import send_trigger
+    from client.control import send_trigger
 
-    socket_path = Path(args.socket_path) if args.socket_path else None
-    if send_trigger(socket_path):
+    if send_trigger(args.socket_path):
         print("Trigger sent successfully")
     else:
         sys.exit(1)
 
 
+def main_ctl(args):
+    """Точка входа для команд управления демоном"""
+    import json
+    from client.control import send_command
+
+    params = {"wait": True} if args.wait else {}
+    reply = send_command(args.ctl_command, args.socket_path, timeout=args.timeout, **params)
+    if reply is None:
+        sys.exit(1)
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    if not reply.get("ok"):
+        sys.exit(1)
+
+
 if __name__ == '__main__':
     main()
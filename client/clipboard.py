@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Системный буфер обмена: механизм выбирается один раз при старте.
+
+Раньше каждое копирование импортировало pyperclip, тот заново искал
+механизм, а затем мог запуститься ещё и wl-copy. Теперь probe_clipboard()
+перебирает механизмы по порядку и запоминает первый рабочий:
+
+  wl-copy    — на Wayland (задан WAYLAND_DISPLAY), если установлен. Здесь
+               каждое копирование по-прежнему запускает процесс: владелец
+               ниже виден Wayland-приложениям только через синхронизацию
+               буфера XWayland, а она есть не у каждого композитора.
+  owner      — долгоживущий процесс-владелец буфера на X11 (Tk из стандартной
+               библиотеки), текст передаётся ему по каналу: копирование —
+               это запись в pipe, без fork/exec. Нужен X-дисплей.
+  wl-copy, xclip, xsel, pbcopy — одна команда на копирование, текст в stdin.
+               Команда выбирается пробным копированием, а не по наличию в PATH.
+  pyperclip  — то, что нашёл pyperclip (функция копирования запоминается).
+
+Владелец подтверждает каждый текст строкой ok: упавший или зависший владелец
+перезапускается один раз, иначе копирование считается неудачным. Когда
+процесс завершается, stdin владельца закрывается, но сам он продолжает
+отдавать последний текст, пока буфер не займёт другое приложение, — как
+оставшийся в фоне wl-copy. О потере буфера Tk сообщает событием, владелец
+не опрашивает его по таймеру.
+"""
+
+import atexit
+import logging
+import os
+import platform
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+logger = logging.getLogger('Clipboard')
+
+# Сколько ждать готовности владельца, его подтверждения копирования
+# и команды копирования, с
+OWNER_START_TIMEOUT = 3.0
+OWNER_ACK_TIMEOUT = 2.0
+COMMAND_TIMEOUT = 5.0
+
+# Процесс-владелец: кадры «длина\nтекст» из stdin, последний становится
+# содержимым CLIPBOARD, на каждый кадр — строка ok в stdout. Запросы вставки
+# обслуживает selection handle из mainloop Tk, о перехвате буфера сообщает
+# selection own -command (SelectionClear). После закрытия stdin владелец
+# живёт, пока CLIPBOARD за ним.
+OWNER_SCRIPT = r'''
+import os
+import sys
+import tkinter
+
+root = tkinter.Tk()
+root.withdraw()
+buffer = bytearray()
+state = {'text': '', 'owned': False, 'closed': False}
+
+
+def serve(offset, max_chars):
+    offset = int(offset)
+    return state['text'][offset:offset + int(max_chars)]
+
+
+def lost():
+    state['owned'] = False
+    if state['closed']:
+        root.destroy()
+
+
+# Команды Tcl регистрируются один раз, а не на каждое копирование
+lost_command = root.register(lost)
+root.tk.call('selection', 'handle', '-selection', 'CLIPBOARD', root._w, root.register(serve))
+
+
+def on_input(*_):
+    chunk = os.read(0, 65536)
+    if not chunk:
+        root.tk.deletefilehandler(0)
+        state['closed'] = True
+        if not state['owned']:
+            root.destroy()
+        return
+    buffer.extend(chunk)
+    text = None
+    frames = 0
+    while True:
+        newline = buffer.find(b'\n')
+        if newline < 0:
+            break
+        size = int(buffer[:newline])
+        if len(buffer) < newline + 1 + size:
+            break
+        text = bytes(buffer[newline + 1:newline + 1 + size]).decode('utf-8')
+        del buffer[:newline + 1 + size]
+        frames += 1
+    if text is not None:
+        state['text'] = text
+        root.tk.call('selection', 'own', '-selection', 'CLIPBOARD', '-command', lost_command,
+                     root._w)
+        state['owned'] = True
+        root.update()
+    if frames:
+        sys.stdout.write('ok\n' * frames)
+        sys.stdout.flush()
+
+
+root.tk.createfilehandler(0, tkinter.READABLE, on_input)
+sys.stdout.write('ready\n')
+sys.stdout.flush()
+root.mainloop()
+'''
+
+# Чтение буфера для пробного копирования, по имени команды копирования
+_PASTE_COMMANDS = {
+    'wl-copy': ['wl-paste', '--no-newline', '--type', 'text'],
+    'xclip': ['xclip', '-selection', 'clipboard', '-out'],
+    'xsel': ['xsel', '--clipboard', '--output'],
+    'pbcopy': ['pbpaste'],
+}
+
+
+def ensure_wayland_env():
+    """Убедиться, что WAYLAND_DISPLAY установлена для работы wl-copy."""
+    if os.environ.get('WAYLAND_DISPLAY'):
+        return
+    uid = os.getuid()
+    for name in ('wayland-0', 'wayland-1'):
+        if Path(f'/run/user/{uid}/{name}').exists():
+            os.environ['WAYLAND_DISPLAY'] = name
+            logger.info(f"Auto-detected WAYLAND_DISPLAY={name}")
+            return
+
+
+class OwnerClipboard:
+    """Долгоживущий владелец буфера обмена, текст — по каналу."""
+
+    name = 'owner'
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        """Запустить владельца и дождаться готовности. False — Tk или дисплей недоступны."""
+        try:
+            proc = subprocess.Popen(
+                [sys.executable, '-c', OWNER_SCRIPT],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                # Ctrl+C в терминале не должен забрать буфер раньше выхода
+                start_new_session=True
+            )
+        except OSError as e:
+            logger.debug(f"Clipboard owner failed to start: {e}")
+            return False
+        self._proc = proc
+        if self._read_line(OWNER_START_TIMEOUT) != b'ready\n':
+            self._kill()
+            return False
+        return True
+
+    def _read_line(self, timeout: float) -> Optional[bytes]:
+        """Строка от владельца; None — он молчит дольше timeout или завершился."""
+        fd = self._proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        line = b''
+        while not line.endswith(b'\n'):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            # Без буфера файла: владелец отвечает строкой на каждый кадр,
+            # а select не видит данных, застрявших в буфере
+            chunk = os.read(fd, 64)
+            if not chunk:
+                return None
+            line += chunk
+        return line
+
+    def copy(self, text: str) -> bool:
+        data = text.encode('utf-8')
+        with self._lock:
+            for _ in range(2):
+                if self._proc is None or self._proc.poll() is not None:
+                    logger.warning("Clipboard owner is gone, restarting")
+                    self._kill()
+                    if not self.start():
+                        return False
+                try:
+                    self._proc.stdin.write(b'%d\n' % len(data) + data)
+                    self._proc.stdin.flush()
+                except OSError:
+                    self._kill()
+                    continue
+                if self._read_line(OWNER_ACK_TIMEOUT) == b'ok\n':
+                    return True
+                logger.warning("Clipboard owner did not confirm the copy")
+                self._kill()
+        return False
+
+    def _kill(self):
+        """Завершить владельца (упал или завис)."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        proc.kill()
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def close(self):
+        """Отпустить владельца: он отдаёт последний текст, пока буфер не займут."""
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None:
+                return
+            for pipe in (proc.stdin, proc.stdout):
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+
+
+class CommandClipboard:
+    """Команда копирования, текст в stdin (wl-copy, xclip, xsel, pbcopy)."""
+
+    def __init__(self, name: str, argv: List[str], paste_argv: Optional[List[str]] = None):
+        """
+        Args:
+            name: Имя механизма
+            argv: Команда копирования
+            paste_argv: Команда чтения буфера (для пробного копирования)
+        """
+        self.name = name
+        self.argv = argv
+        self.paste_argv = paste_argv
+
+    def paste(self) -> Optional[str]:
+        """Текст из буфера; None — буфер пуст, в нём не текст или чтение не удалось."""
+        if not self.paste_argv:
+            return None
+        try:
+            result = subprocess.run(self.paste_argv, capture_output=True, timeout=COMMAND_TIMEOUT)
+            if result.returncode != 0:
+                return None
+            return result.stdout.decode('utf-8')
+        except (OSError, subprocess.TimeoutExpired, UnicodeDecodeError):
+            return None
+
+    def probe(self) -> bool:
+        """
+        Пробное копирование: в буфер записывается его же текущий текст.
+
+        Если текста в буфере нет, копируется пустая строка — буфер без
+        текста (например, с картинкой) при этом очищается.
+        """
+        return self.copy(self.paste() or '')
+
+    def copy(self, text: str) -> bool:
+        # stdout/stderr не перехватываем: wl-copy и xclip остаются в фоне
+        # обслуживать вставку и держали бы канал открытым
+        proc = subprocess.Popen(
+            self.argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            proc.communicate(text.encode('utf-8'), timeout=COMMAND_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            logger.warning(f"{self.name} timeout")
+            return False
+        if proc.returncode != 0:
+            logger.warning(f"{self.name} failed with exit code {proc.returncode}")
+            return False
+        return True
+
+    def close(self):
+        pass
+
+
+class PyperclipClipboard:
+    """Функция копирования, найденная pyperclip (определяется один раз)."""
+
+    name = 'pyperclip'
+
+    def __init__(self, copy: Callable[[str], None]):
+        self._copy = copy
+
+    def copy(self, text: str) -> bool:
+        self._copy(text)
+        return True
+
+    def close(self):
+        pass
+
+
+def _commands() -> List[CommandClipboard]:
+    """Команды копирования, подходящие для текущей сессии."""
+    candidates = []
+    if platform.system() == 'Darwin':
+        candidates.append(('pbcopy', ['pbcopy']))
+    if os.environ.get('WAYLAND_DISPLAY'):
+        candidates.append(('wl-copy', ['wl-copy']))
+    if os.environ.get('DISPLAY'):
+        candidates.append(('xclip', ['xclip', '-selection', 'clipboard']))
+        candidates.append(('xsel', ['xsel', '--clipboard', '--input']))
+    commands = []
+    for name, argv in candidates:
+        path = shutil.which(argv[0])
+        if not path:
+            continue
+        paste_argv = _PASTE_COMMANDS[name]
+        paste_path = shutil.which(paste_argv[0])
+        commands.append(CommandClipboard(
+            name, [path] + argv[1:], [paste_path] + paste_argv[1:] if paste_path else None
+        ))
+    return commands
+
+
+def _first_working(commands: List[CommandClipboard]) -> Optional[CommandClipboard]:
+    """Первая команда, прошедшая пробное копирование."""
+    for command in commands:
+        if command.probe():
+            return command
+        logger.debug(f"{command.name} failed the test copy")
+    return None
+
+
+def probe_clipboard():
+    """
+    Найти рабочий механизм буфера обмена.
+
+    Returns:
+        OwnerClipboard, CommandClipboard, PyperclipClipboard или None
+    """
+    ensure_wayland_env()
+    commands = _commands()
+
+    # На Wayland буфер держит композитор: wl-copy надёжнее владельца через
+    # XWayland, хотя и запускает процесс на каждое копирование
+    if os.environ.get('WAYLAND_DISPLAY'):
+        wl_copy = [command for command in commands if command.name == 'wl-copy']
+        commands = [command for command in commands if command.name != 'wl-copy']
+        command = _first_working(wl_copy)
+        if command is not None:
+            return command
+
+    if os.environ.get('DISPLAY') and platform.system() != 'Darwin':
+        owner = OwnerClipboard()
+        if owner.start():
+            return owner
+        logger.debug("Clipboard owner unavailable (no tkinter or X display)")
+
+    command = _first_working(commands)
+    if command is not None:
+        return command
+
+    try:
+        import pyperclip
+        copy, _paste = pyperclip.determine_clipboard()
+    except Exception as e:
+        logger.debug(f"pyperclip unavailable: {e}")
+        return None
+    # Заглушка pyperclip «механизма нет» ложна в булевом контексте
+    if not copy:
+        return None
+    return PyperclipClipboard(copy)
+
+
+_CLIPBOARD = None
+_PROBED = False
+_PROBE_LOCK = threading.Lock()
+
+
+def get_clipboard():
+    """Механизм буфера обмена процесса (при первом вызове — probe_clipboard)."""
+    global _CLIPBOARD, _PROBED
+    with _PROBE_LOCK:
+        if not _PROBED:
+            _CLIPBOARD = probe_clipboard()
+            _PROBED = True
+            if _CLIPBOARD is None:
+                logger.warning("No clipboard mechanism available")
+            else:
+                logger.info(f"Clipboard: {_CLIPBOARD.name}")
+                atexit.register(close_clipboard)
+        return _CLIPBOARD
+
+
+def close_clipboard():
+    """Отпустить механизм буфера при выходе (последний текст остаётся в буфере)."""
+    clipboard = _CLIPBOARD
+    if clipboard is not None:
+        clipboard.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Клиент протокола управления демоном голосового ввода.
+
+Только стандартная библиотека: `micpy trigger` запускается на каждое
+нажатие хоткея, и его путь не должен тянуть за собой аудио, HTTP-клиент
+и редактор. Модуль при загрузке импортирует только os, socket и sys
+(даже logging, pathlib и typing стоят миллисекунды), json — лишь для
+send_command. Сам демон — в voice_daemon.
+
+Протокол: запрос — одна строка JSON ({"command": "status"}), ответ — одна
+строка JSON с полем ok и состоянием демона. Любые данные не в JSON
+(исторически b'trigger') означают toggle без ответа.
+"""
+
+import os
+import socket
+import sys
+
+# Путь к сокету по умолчанию
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'voice-input.sock')
+
+# Команды протокола управления
+COMMANDS = ('start', 'stop', 'toggle', 'cancel', 'status', 'stats', 'last')
+
+# С wait ответ на stop приходит после транскрипции — клиент ждёт дольше таймаута API
+CONTROL_TIMEOUT = 150.0
+
+
+def _error(message: str):
+    print(message, file=sys.stderr)
+
+
+def send_command(
+    command: str,
+    socket_path: str | os.PathLike | None = None,
+    timeout: float = CONTROL_TIMEOUT,
+    **params
+) -> dict | None:
+    """
+    Отправить команду демону и дождаться ответа.
+
+    Args:
+        command: Одна из COMMANDS
+        socket_path: Путь к сокету
+        timeout: Сколько ждать ответа (stop с wait отвечает после транскрипции)
+        **params: Дополнительные поля запроса (например, id, wait)
+
+    Returns:
+        Ответ демона или None, если связаться не удалось
+    """
+    import json
+
+    path = os.fspath(socket_path or DEFAULT_SOCKET_PATH)
+
+    if not os.path.exists(path):
+        _error(f"Socket not found: {path}")
+        _error("Is the daemon running?")
+        return None
+
+    request = dict(params, command=command)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError) as e:
+        _error(f"Failed to send command: {e}")
+        return None
+
+
+def send_trigger(socket_path: str | os.PathLike | None = None) -> bool:
+    """
+    Отправить триггер на демон через сокет.
+
+    Args:
+        socket_path: Путь к сокету
+
+    Returns:
+        True если успешно
+    """
+    path = os.fspath(socket_path or DEFAULT_SOCKET_PATH)
+
+    if not os.path.exists(path):
+        _error(f"Socket not found: {path}")
+        _error("Is the daemon running?")
+        return False
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        sock.sendall(b'trigger')
+        sock.close()
+        return True
+    except Exception as e:
+        _error(f"Failed to send trigger: {e}")
+        return False
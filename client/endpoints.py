@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Маршрутизация запросов между несколькими серверами Parakeet.
+
+Для каждого сервера ведутся скользящие средние (EWMA) задержки, real-time
+factor (время запроса / длина аудио) и доли ошибок. Очередная запись уходит
+на сервер с наименьшим ожидаемым временем ответа. Сервер, который подряд
+отвечает ошибками, исключается из ротации на время, растущее
+экспоненциально, и возвращается после успешной проверки или по истечении
+этого времени.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger('Endpoints')
+
+# Вес нового замера в EWMA
+EWMA_ALPHA = 0.3
+
+# Подряд идущих ошибок до исключения сервера
+EJECT_AFTER = 2
+
+# Время исключения: удваивается при каждом повторном исключении
+EJECT_BASE_S = 5.0
+EJECT_MAX_S = 120.0
+
+
+def parse_endpoints(api_url: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Список базовых URL из строки (через запятую) или последовательности.
+
+    Returns:
+        URL без завершающего слэша, в исходном порядке, без повторов
+    """
+    if isinstance(api_url, str):
+        api_url = api_url.split(',')
+    urls = []
+    for url in api_url:
+        url = url.strip().rstrip('/')
+        if url and url not in urls:
+            urls.append(url)
+    if not urls:
+        raise ValueError("No API endpoints given")
+    return urls
+
+
+class Endpoint:
+    """Сервер API и его статистика (изменяется только под блокировкой пула)."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None  # EWMA времени запроса, с
+        self.rtf: Optional[float] = None  # EWMA времени запроса на секунду аудио
+        self.error_rate = 0.0  # EWMA доли ошибок
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0  # исключений подряд, задаёт время следующего
+        self.ejected_until = 0.0
+        self.failed_at = 0.0  # время последней ошибки
+
+    @property
+    def health_url(self) -> str:
+        base_url = self.url.rsplit('/v1', 1)[0]
+        return f"{base_url}/health"
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def expected_time(self, audio_seconds: Optional[float]) -> float:
+        """Ожидаемое время ответа с поправкой на долю ошибок."""
+        if self.rtf is not None and audio_seconds:
+            estimate = self.rtf * audio_seconds
+        elif self.latency is not None:
+            estimate = self.latency
+        else:
+            # Сервер ещё не измерен — пробуем его в первую очередь
+            return 0.0
+        return estimate / max(0.05, 1.0 - self.error_rate)
+
+
+class EndpointPool:
+    """
+    Набор серверов API с выбором лучшего по измеренной скорости.
+
+    Потокобезопасен: параллельные сегменты и прогрев обращаются к нему
+    из разных потоков.
+    """
+
+    def __init__(self, urls: Sequence[str]):
+        """
+        Args:
+            urls: Базовые URL серверов (например, http://gpu1:5092/v1);
+                при равной оценке предпочтение отдаётся стоящему раньше
+        """
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def select(
+        self,
+        audio_seconds: Optional[float] = None,
+        exclude: Sequence[Endpoint] = ()
+    ) -> Endpoint:
+        """
+        Выбрать сервер для запроса.
+
+        Серверы с ошибкой за последние EJECT_BASE_S секунд идут после
+        остальных — повторная попытка уходит на другой сервер. Если исключены
+        все, берётся тот, чьё исключение закончится раньше.
+
+        Args:
+            audio_seconds: Длина записи (None — неизвестна, как при потоковой
+                загрузке; тогда сравнивается средняя задержка)
+            exclude: Серверы, которых по возможности избегать (например,
+                сервер основного запроса при хеджировании)
+        """
+        now = time.monotonic()
+        with self._lock:
+            active = [e for e in self.endpoints if not e.is_ejected(now)]
+            preferred = [e for e in active if e not in exclude]
+            active = preferred or active
+            if not active:
+                return min(self.endpoints, key=lambda e: e.ejected_until)
+            return min(
+                active,
+                key=lambda e: (
+                    now - e.failed_at < EJECT_BASE_S,
+                    e.expected_time(audio_seconds)
+                )
+            )
+
+    def record_success(
+        self,
+        endpoint: Endpoint,
+        elapsed: float,
+        audio_seconds: Optional[float] = None
+    ):
+        """Учесть успешный запрос длительностью elapsed секунд."""
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.latency = self._ewma(endpoint.latency, elapsed)
+            if audio_seconds:
+                endpoint.rtf = self._ewma(endpoint.rtf, elapsed / audio_seconds)
+            endpoint.error_rate = self._ewma(endpoint.error_rate, 0.0)
+            self._readmit(endpoint)
+
+    def record_failure(self, endpoint: Endpoint):
+        """Учесть ошибку сервера; при серии ошибок исключить его из ротации."""
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.failed_at = time.monotonic()
+            endpoint.error_rate = self._ewma(endpoint.error_rate, 1.0)
+            # Единственный сервер не исключаем — запросам больше некуда идти
+            if len(self.endpoints) > 1 and endpoint.consecutive_failures >= EJECT_AFTER:
+                ejection = min(EJECT_MAX_S, EJECT_BASE_S * 2 ** endpoint.ejections)
+                endpoint.ejections += 1
+                endpoint.ejected_until = time.monotonic() + ejection
+                logger.warning(
+                    f"Endpoint {endpoint.url} ejected for {ejection:.0f}s "
+                    f"after {endpoint.consecutive_failures} failures"
+                )
+
+    def record_health(self, endpoint: Endpoint, healthy: bool):
+        """Результат проверки здоровья: здоровый сервер возвращается в ротацию."""
+        with self._lock:
+            if healthy:
+                self._readmit(endpoint)
+            elif len(self.endpoints) > 1 and not endpoint.is_ejected(time.monotonic()):
+                endpoint.ejected_until = time.monotonic() + EJECT_BASE_S
+
+    def _readmit(self, endpoint: Endpoint):
+        if endpoint.ejections or endpoint.ejected_until:
+            logger.info(f"Endpoint {endpoint.url} re-admitted")
+        endpoint.consecutive_failures = 0
+        endpoint.failed_at = 0.0
+        endpoint.ejections = 0
+        endpoint.ejected_until = 0.0
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return (1 - EWMA_ALPHA) * current + EWMA_ALPHA * sample
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Статистика по серверам в исходном порядке."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "latency": e.latency,
+                    "rtf": e.rtf,
+                    "error_rate": round(e.error_rate, 3),
+                    "ejected": e.is_ejected(now),
+                }
+                for e in self.endpoints
+            ]
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Метрики демона в текстовом формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса, экспортёр (необязательный)
+отдаёт их по HTTP на локальном TCP-порту или на отдельном Unix сокете:
+
+  curl http://127.0.0.1:9464/metrics
+  curl --unix-socket ~/.cache/micpy-metrics.sock http://localhost/metrics
+
+Гистограммы — с фиксированными границами корзин: наблюдение стоит одного
+bisect и инкремента под блокировкой, без аллокаций. На пути захвата аудио
+метрики не обновляются вовсе — потерянные кадры учитываются после остановки.
+"""
+
+import bisect
+import logging
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger('Metrics')
+
+DEFAULT_METRICS_HOST = '127.0.0.1'
+
+# Задержка запроса к API, с: от прогретого соединения до длинной диктовки
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+# Вывод текста, с: от записи в файл до медленного композитора
+OUTPUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+# Длина записи, с
+AUDIO_BUCKETS = (1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+MetricsAddress = Union[Tuple[str, int], Path]
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        )
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонный счётчик, опционально с метками."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Увеличить счётчик (amount ≥ 0)."""
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}{labels} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Текущее значение, читается функцией в момент экспорта."""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self._read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self._read())
+        except Exception:
+            return []
+        return [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} gauge',
+            f'{self.name} {_format_value(value)}',
+        ]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, опционально с метками."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float],
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # По серии на набор меток: счётчики корзин (последняя — +Inf) и сумма
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._series[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels: str) -> int:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(counts), total) for key, (counts, total) in self._series.items()
+            )
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, counts, total in items:
+            names = self.labelnames + ('le',)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик и их вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help_text, read)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, help_text, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class DaemonMetrics(MetricsRegistry):
+    """Метрики демона голосового ввода."""
+
+    def __init__(self, is_recording: Optional[Callable[[], bool]] = None):
+        super().__init__()
+        self.recordings = self.counter(
+            'micpy_recordings_total', 'Recordings stopped')
+        self.skipped = self.counter(
+            'micpy_recordings_skipped_total',
+            'Recordings not sent to the API', ('reason',))
+        self.audio_seconds = self.counter(
+            'micpy_audio_seconds_total', 'Seconds of audio recorded')
+        self.audio_length = self.histogram(
+            'micpy_recording_duration_seconds', 'Length of stopped recordings', AUDIO_BUCKETS)
+        self.dropped_frames = self.counter(
+            'micpy_input_overflows_total', 'Input overflows reported by PortAudio (dropped frames)')
+        self.transcriptions = self.counter(
+            'micpy_transcriptions_total', 'Transcription outcomes', ('outcome',))
+        self.api_requests = self.counter(
+            'micpy_api_requests_total', 'Requests to the transcription API')
+        self.api_latency = self.histogram(
+            'micpy_api_request_duration_seconds', 'Transcription API request latency',
+            LATENCY_BUCKETS)
+        self.api_errors = self.counter(
+            'micpy_api_errors_total', 'Failed API requests by error type', ('type',))
+        self.retries = self.counter(
+            'micpy_api_retries_total', 'API request retries')
+        self.upload_bytes = self.counter(
+            'micpy_upload_bytes_total', 'Audio bytes uploaded to the API')
+        self.stop_to_text = self.histogram(
+            'micpy_stop_to_text_seconds', 'Time from the stop trigger to text output',
+            LATENCY_BUCKETS)
+        self.output_latency = self.histogram(
+            'micpy_output_duration_seconds', 'Text output attempts by backend',
+            OUTPUT_BUCKETS, ('backend',))
+        self.output_failures = self.counter(
+            'micpy_output_failures_total', 'Text output failures by backend', ('backend',))
+        if is_recording is not None:
+            self.gauge('micpy_recording', 'Whether a recording is in progress',
+                       lambda: 1.0 if is_recording() else 0.0)
+
+
+def parse_metrics_address(value: str) -> MetricsAddress:
+    """
+    Адрес экспортёра: порт (9464 — на 127.0.0.1), host:port или путь к
+    Unix сокету (содержит '/' или начинается с '~').
+    """
+    value = value.strip()
+    if '/' in value or value.startswith('~'):
+        return Path(value).expanduser()
+    host, _, port = value.rpartition(':')
+    try:
+        port_number = int(port)
+    except ValueError:
+        raise ValueError(f"Invalid metrics address: {value!r}")
+    if not 0 < port_number < 65536:
+        raise ValueError(f"Invalid metrics port: {port_number}")
+    return (host.strip('[]') or DEFAULT_METRICS_HOST, port_number)
+
+
+def metrics_address_from_env(value: Optional[str] = None) -> Optional[MetricsAddress]:
+    """Адрес из value или MICPY_METRICS; None — экспортёр выключен."""
+    if value is None:
+        value = os.environ.get('MICPY_METRICS', '')
+    if not value.strip() or value.strip().lower() in ('0', 'off', 'false', 'no'):
+        return None
+    try:
+        return parse_metrics_address(value)
+    except ValueError as e:
+        logger.warning(f"{e}, metrics exporter disabled")
+        return None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics — текущие значения метрик."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # У Unix сокета нет адреса клиента
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """
+    HTTP-экспортёр метрик.
+
+    Два режима: start() — обслуживание в фоновом потоке; open() — только
+    открыть сокет, а соединения принимает цикл событий владельца: он следит
+    за fileno() и вызывает handle_request(), когда сокет готов к чтению.
+    Второй режим не просыпается по таймеру (serve_forever опрашивает
+    флаг остановки каждые 0.5 с).
+    """
+
+    def __init__(self, registry: MetricsRegistry, address: MetricsAddress):
+        self.registry = registry
+        self.address = address
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def description(self) -> str:
+        if isinstance(self.address, Path):
+            return f"unix:{self.address}"
+        host, port = self._server.server_address[:2] if self._server else self.address
+        return f"http://{host}:{port}/metrics"
+
+    def open(self) -> bool:
+        """Открыть сокет. False — адрес недоступен."""
+        try:
+            if isinstance(self.address, Path):
+                self.address.parent.mkdir(parents=True, exist_ok=True)
+                if self.address.exists():
+                    self.address.unlink()
+                server = _UnixHTTPServer(str(self.address), _MetricsHandler)
+                os.chmod(self.address, 0o600)
+            else:
+                server = ThreadingHTTPServer(self.address, _MetricsHandler)
+        except OSError as e:
+            logger.error(f"Metrics exporter failed to start on {self.address}: {e}")
+            return False
+        server.registry = self.registry
+        # handle_request() ждёт соединения select'ом с этим таймаутом: при
+        # ложной готовности сокета цикл событий не должен зависнуть
+        server.timeout = 0
+        self._server = server
+        logger.info(f"Metrics exporter: {self.description}")
+        return True
+
+    def start(self) -> bool:
+        """Открыть сокет и обслуживать его в фоновом потоке."""
+        if not self.open():
+            return False
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def fileno(self) -> int:
+        return self._server.fileno()
+
+    def handle_request(self):
+        """Принять одно соединение, если оно есть (не блокируется)."""
+        self._server.handle_request()
+
+    def stop(self):
+        if self._server is None:
+            return
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+        self._server = None
+        if isinstance(self.address, Path) and self.address.exists():
+            self.address.unlink()
@@ -17,6 +17,7 @@ import asyncio
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Основные зависимости
 try:
@@ -46,10 +47,12 @@ except ImportError as e:
 from client.audio_buffer import (
     AudioBuffer,
     play_sound,
-    start_keepalive,
-    stop_keepalive,
+    start_playback,
+    stop_playback,
 )
+from client.clipboard import get_clipboard
 from client.parakeet_client import ParakeetClient
+from client.segmenter import SegmentedTranscriber
 
 
 def load_env_file() -> None:
@@ -72,12 +75,18 @@ load_env_file()
 class ClipboardManager:
     """Менеджер для работы с системным буфером обмена"""
 
-    @staticmethod
-    def copy_text(text: str) -> bool:
+    def __init__(self):
+        # Механизм копирования выбирается один раз: автокопирование выделения
+        # срабатывает на каждое его изменение
+        self.clipboard = get_clipboard()
+
+    def copy_text(self, text: str) -> bool:
         """Копирование текста в системный буфер обмена"""
+        if self.clipboard is None:
+            print("Ошибка копирования в буфер: буфер обмена недоступен")
+            return False
         try:
-            pyperclip.copy(text)
-            return True
+            return self.clipboard.copy(text)
         except Exception as e:
             print(f"Ошибка копирования в буфер: {e}")
             return False
@@ -187,6 +196,14 @@ class MinimalSTTEditor:
         model = os.getenv('PARAKEET_MODEL', 'parakeet-tdt-0.6b-v3')
         self.parakeet_client = ParakeetClient(api_url=api_url, model=model)
 
+        # MICPY_UPLOAD_MODE=segmented — длинная диктовка режется на паузах,
+        # сегменты распознаются параллельно во время записи
+        self.segmented = os.getenv('MICPY_UPLOAD_MODE', '').strip().lower() == 'segmented'
+        self._segment_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='segment')
+        self._segmenter = None
+        # Текущий асинхронный запрос транскрипции (отменяется при выходе)
+        self._transcribe_task = None
+
         # Состояние
         self.is_recording = False
         self.api_available = False
@@ -278,9 +295,6 @@ class MinimalSTTEditor:
             on_invalidate=self.on_app_invalidate
         )
 
-        # Задача записи
-        self._recording_task = None
-
     def create_key_bindings(self) -> KeyBindings:
         """Создание клавиатурных привязок"""
         kb = KeyBindings()
@@ -464,47 +478,44 @@ class MinimalSTTEditor:
         self.is_recording = True
         self.recording_start_time = time.time()
         self.status_bar.set_state(StatusBar.STATE_RECORDING)
+        if self.segmented:
+            self._segmenter = SegmentedTranscriber(
+                self.audio_buffer,
+                self.parakeet_client,
+                self._segment_executor
+            )
+            self._segmenter.start()
+        # Пока пользователь говорит, держим прогретое соединение с API
+        self.parakeet_client.prewarm()
         play_sound('start')
+        # Аудио пишется из callback PortAudio, а таймер в статус-баре
+        # обновляется через refresh_interval приложения
         self.app.invalidate()
 
-        # Запускаем задачу чтения аудио и обновления UI
-        self._recording_task = asyncio.create_task(self._recording_loop())
-
-    async def _recording_loop(self):
-        """Цикл записи аудио с обновлением UI"""
-        while self.is_recording:
-            self.audio_buffer.read_chunk()
-            # Обновляем UI для отображения времени
-            self.app.invalidate()
-            await asyncio.sleep(0.1)
-
     async def stop_recording_and_transcribe(self):
         """Остановка записи и отправка на транскрипцию"""
         if not self.is_recording:
             return
 
         self.is_recording = False
-
-        # Останавливаем запись
-        if self._recording_task:
-            self._recording_task.cancel()
-            try:
-                await self._recording_task
-            except asyncio.CancelledError:
-                # Ожидаемое поведение при отмене задачи
-                pass
+        self.parakeet_client.cancel_prewarm()
+        segmenter, self._segmenter = self._segmenter, None
 
         # Получаем WAV байты
         wav_bytes = self.audio_buffer.stop_recording()
         duration = self.audio_buffer.get_duration()
 
         if not wav_bytes:
+            if segmenter:
+                segmenter.cancel()
             self.status_bar.set_state(StatusBar.STATE_IDLE, "No audio")
             self.app.invalidate()
             return
 
         # Проверяем длительность
         if duration < 0.3:
+            if segmenter:
+                segmenter.cancel()
             self.status_bar.set_state(StatusBar.STATE_IDLE, "Too short")
             self.app.invalidate()
             return
@@ -513,13 +524,21 @@ class MinimalSTTEditor:
         self.status_bar.set_state(StatusBar.STATE_SENDING)
         self.app.invalidate()
 
-        # Выполняем транскрипцию в отдельном потоке
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            self.parakeet_client.transcribe_with_retry,
-            wav_bytes
-        )
+        if segmenter:
+            # Ранние сегменты уже распознаются — ждём в основном последний
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, segmenter.finish)
+        else:
+            # Запрос идёт в цикле событий prompt_toolkit, без отдельного потока
+            self._transcribe_task = asyncio.ensure_future(
+                self.parakeet_client.atranscribe_with_retry(wav_bytes)
+            )
+            try:
+                result = await self._transcribe_task
+            except asyncio.CancelledError:
+                return
+            finally:
+                self._transcribe_task = None
 
         if result.get("success"):
             text = result.get("text", "").strip()
@@ -554,7 +573,7 @@ class MinimalSTTEditor:
     async def initialize(self):
         """Инициализация редактора"""
         # Проверяем доступность API
-        self.api_available = self.parakeet_client.health_check()
+        self.api_available = await self.parakeet_client.ahealth_check()
 
         if self.api_available:
             connection_status = "✓ Parakeet API доступен"
@@ -579,20 +598,27 @@ class MinimalSTTEditor:
         """Очистка ресурсов"""
         if self.is_recording:
             self.is_recording = False
-            if self._recording_task:
-                self._recording_task.cancel()
             self.audio_buffer.stop_recording()
+            if self._segmenter:
+                self._segmenter.cancel()
+                self._segmenter = None
+        if self._transcribe_task:
+            self._transcribe_task.cancel()
+        self._segment_executor.shutdown(wait=False, cancel_futures=True)
+        await self.parakeet_client.aclose()
+        self.parakeet_client.close()
 
     async def run(self):
         """Запуск редактора"""
-        # Не даём аудиовыходу заснуть (MICPY_SOUND_KEEPALIVE=1), иначе короткий
-        # бип теряется при пробуждении устройства — см. SOUND_DEBUGGING.md
-        start_keepalive()
+        # Постоянный поток для бипов: тоны синтезированы заранее, на триггере
+        # они только подмешиваются. С MICPY_SOUND_KEEPALIVE=1 поток ещё и не
+        # даёт аудиовыходу заснуть — см. SOUND_DEBUGGING.md
+        start_playback()
         try:
             await self.initialize()
             await self.app.run_async()
         finally:
-            stop_keepalive()
+            stop_playback()
             await self.cleanup()
 
 
@@ -601,7 +627,11 @@ async def main():
     import argparse
 
     parser = argparse.ArgumentParser(description="Минималистичный STT редактор")
-    parser.add_argument('--test', action='store_true', help='Тестовый режим (показать интерфейс и выйти)')
+    parser.add_argument(
+        '--test',
+        action='store_true',
+        help='Тестовый режим (показать интерфейс и выйти)'
+    )
     args = parser.parse_args()
 
     editor = MinimalSTTEditor()
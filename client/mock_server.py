@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Локальный мок OpenAI-совместимого сервера транскрипции (micpy mock-server).
+
+Заменяет GPU-сервер Parakeet при бенчмарках и нагрузочных проверках
+клиента: повторы, таймауты, пул соединений и хеджирование можно
+воспроизводимо измерить на ноутбуке без сети.
+
+Эндпоинты:
+- GET  /health                   — {"status": "ok"}
+- GET  /v1/models                — список из одной модели
+- POST /v1/audio/transcriptions  — multipart (в т.ч. chunked), отвечает
+                                   {"text": ..., "duration": ...}
+- GET  /mock/stats               — счётчики запросов и внедрённых сбоев
+
+Внедрение сбоев и нагрузки (всё случайное — из генератора с --seed):
+- задержка: распределение (fixed/uniform/normal/lognormal/exp) плюс
+  rtf × длина аудио;
+- пропускная способность: ограничение скорости чтения тела запроса и
+  число одновременно «распознаваемых» запросов (очередь к GPU);
+- ошибки: доля ответов с заданным HTTP-статусом;
+- таймауты: доля запросов, на которые сервер не отвечает;
+- медленная отдача: доля ответов, тело которых отдаётся по байту.
+"""
+
+import json
+import logging
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('MockServer')
+
+DEFAULT_PORT = 5092
+DEFAULT_MODEL = 'parakeet-tdt-0.6b-v3'
+
+# Размер блока при чтении тела с ограничением скорости
+_READ_BLOCK = 16 * 1024
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Распределение задержки из строки вида 'имя:параметры' (секунды).
+
+    fixed:0.2, uniform:0.1,0.5, normal:0.3,0.05 (среднее, σ),
+    lognormal:-1.5,0.5 (μ, σ логарифма), exp:0.3 (среднее).
+    Отрицательные значения обрезаются до нуля.
+
+    Raises:
+        ValueError: неизвестное распределение или неверные параметры
+    """
+    name, _, params = spec.partition(':')
+    try:
+        args = [float(x) for x in params.split(',')] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid distribution parameters: {spec}")
+
+    builders = {
+        'fixed': (1, lambda rng, a: a[0]),
+        'uniform': (2, lambda rng, a: rng.uniform(a[0], a[1])),
+        'normal': (2, lambda rng, a: rng.gauss(a[0], a[1])),
+        'lognormal': (2, lambda rng, a: rng.lognormvariate(a[0], a[1])),
+        'exp': (1, lambda rng, a: rng.expovariate(1 / a[0]) if a[0] > 0 else 0.0),
+    }
+    if name not in builders:
+        raise ValueError(f"Unknown distribution '{name}' (use {', '.join(builders)})")
+    count, sample = builders[name]
+    if len(args) != count:
+        raise ValueError(f"Distribution '{name}' takes {count} parameter(s)")
+    return lambda rng: max(0.0, sample(rng, args))
+
+
+def audio_seconds(audio: bytes) -> float:
+    """Длина WAV-файла по заголовку и фактическому объёму данных (0 — не WAV)."""
+    if audio[:4] != b'RIFF' or audio[8:12] != b'WAVE':
+        return 0.0
+    pos = 12
+    byte_rate = 0
+    while pos + 8 <= len(audio):
+        chunk_id = audio[pos:pos + 4]
+        size = struct.unpack('<I', audio[pos + 4:pos + 8])[0]
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack('<I', audio[pos + 16:pos + 20])[0]
+        elif chunk_id == b'data':
+            # У потокового WAV размер 0xFFFFFFFF — считаем по факту
+            data_len = min(size, len(audio) - pos - 8)
+            return data_len / byte_rate if byte_rate else 0.0
+        pos += 8 + size + (size & 1)
+    return 0.0
+
+
+def _multipart_file(body: bytes, content_type: str) -> bytes:
+    """Содержимое поля file из multipart/form-data."""
+    boundary = content_type.partition('boundary=')[2].strip('"')
+    if not boundary:
+        return b''
+    for part in body.split(b'--' + boundary.encode()):
+        headers, sep, content = part.partition(b'\r\n\r\n')
+        if sep and b'name="file"' in headers:
+            return content[:-2] if content.endswith(b'\r\n') else content
+    return b''
+
+
+class MockConfig:
+    """Параметры поведения мок-сервера."""
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        latency: str = 'fixed:0.05',
+        rtf: float = 0.0,
+        bandwidth: float = 0.0,
+        concurrency: int = 0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        timeout_rate: float = 0.0,
+        hang_s: float = 600.0,
+        drip_rate: float = 0.0,
+        drip_bytes_per_s: float = 20.0,
+        text: Optional[str] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            model: Имя модели в /v1/models
+            latency: Распределение задержки обработки (см. parse_distribution)
+            rtf: Дополнительные секунды обработки на секунду аудио
+            bandwidth: Скорость приёма тела запроса, байт/с (0 — без ограничения)
+            concurrency: Сколько запросов обрабатывается одновременно, прочие
+                ждут в очереди (0 — без ограничения)
+            error_rate: Доля запросов, получающих error_status
+            error_status: HTTP-статус внедрённой ошибки
+            timeout_rate: Доля запросов, на которые сервер не отвечает hang_s секунд
+            hang_s: Сколько держать «зависший» запрос
+            drip_rate: Доля ответов, отдаваемых медленно
+            drip_bytes_per_s: Скорость медленной отдачи
+            text: Текст ответа (None — описание запроса)
+            seed: Зерно генератора для воспроизводимости
+        """
+        self.model = model
+        self.latency_spec = latency
+        self.latency = parse_distribution(latency)
+        self.rtf = rtf
+        self.bandwidth = bandwidth
+        self.concurrency = concurrency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.hang_s = hang_s
+        self.drip_rate = drip_rate
+        self.drip_bytes_per_s = drip_bytes_per_s
+        self.text = text
+        self.seed = seed
+
+
+class MockTranscriptionServer(ThreadingHTTPServer):
+    """HTTP-сервер, каждый запрос — в своём потоке."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, _MockHandler)
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._gpu = threading.BoundedSemaphore(config.concurrency) if config.concurrency else None
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "transcriptions": 0,
+            "in_flight": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "drips": 0,
+            "bytes_received": 0,
+        }
+
+    def draw(self) -> Dict[str, Any]:
+        """Случайные решения для одного запроса (под блокировкой — воспроизводимо)."""
+        config = self.config
+        with self._rng_lock:
+            return {
+                "error": self._rng.random() < config.error_rate,
+                "timeout": self._rng.random() < config.timeout_rate,
+                "drip": self._rng.random() < config.drip_rate,
+                "latency": config.latency(self._rng),
+            }
+
+    def count(self, key: str, delta: int = 1):
+        with self._stats_lock:
+            self.stats[key] += delta
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MockTranscriptionServer
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], drip: bool = False):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not drip:
+            self.wfile.write(body)
+            return
+        delay = 1 / self.server.config.drip_bytes_per_s
+        for i in range(len(body)):
+            self.wfile.write(body[i:i + 1])
+            self.wfile.flush()
+            time.sleep(delay)
+
+    def do_GET(self):
+        self.server.count("requests")
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok"})
+        elif self.path == '/v1/models':
+            self._send_json(200, {
+                "object": "list",
+                "data": [{"id": self.server.config.model, "object": "model"}],
+            })
+        elif self.path == '/mock/stats':
+            self._send_json(200, self.server.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def _read(self, size: int) -> bytes:
+        """Прочитать size байт с ограничением скорости."""
+        bandwidth = self.server.config.bandwidth
+        if not bandwidth:
+            return self.rfile.read(size)
+        parts = []
+        while size > 0:
+            block = self.rfile.read(min(size, _READ_BLOCK))
+            if not block:
+                break
+            parts.append(block)
+            size -= len(block)
+            time.sleep(len(block) / bandwidth)
+        return b''.join(parts)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    # Завершающие заголовки (trailers) до пустой строки
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                parts.append(self._read(size))
+                self.rfile.readline()
+            return b''.join(parts)
+        return self._read(int(self.headers.get('Content-Length') or 0))
+
+    def do_POST(self):
+        server = self.server
+        config = server.config
+        server.count("requests")
+        if self.path != '/v1/audio/transcriptions':
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        body = self._read_body()
+        server.count("bytes_received", len(body))
+        audio = _multipart_file(body, self.headers.get('Content-Type', ''))
+        if not audio:
+            self._send_json(400, {"error": {"message": "Missing file field"}})
+            return
+
+        draw = server.draw()
+        seconds = audio_seconds(audio)
+
+        if draw["timeout"]:
+            server.count("timeouts")
+            time.sleep(config.hang_s)
+            self.close_connection = True
+            return
+
+        server.count("in_flight")
+        try:
+            if server._gpu is not None:
+                server._gpu.acquire()
+            try:
+                time.sleep(draw["latency"] + config.rtf * seconds)
+            finally:
+                if server._gpu is not None:
+                    server._gpu.release()
+        finally:
+            server.count("in_flight", -1)
+
+        if draw["error"]:
+            server.count("errors")
+            self._send_json(config.error_status, {
+                "error": {"message": f"Injected error {config.error_status}"}
+            })
+            return
+
+        server.count("transcriptions")
+        if draw["drip"]:
+            server.count("drips")
+        text = config.text if config.text is not None else (
+            f"mock transcription of {seconds:.2f}s ({len(audio)} bytes)"
+        )
+        self._send_json(200, {"text": text, "duration": round(seconds, 3)}, drip=draw["drip"])
+
+
+def start_mock_server(
+    config: Optional[MockConfig] = None,
+    host: str = '127.0.0.1',
+    port: int = 0
+) -> MockTranscriptionServer:
+    """
+    Запустить мок-сервер в фоновом потоке.
+
+    Args:
+        config: Параметры (None — по умолчанию)
+        host: Адрес
+        port: Порт (0 — любой свободный)
+
+    Returns:
+        Сервер; base_url — адрес для ParakeetClient, shutdown() — остановка
+    """
+    server = MockTranscriptionServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, name='mock-server', daemon=True).start()
+    return server
+
+
+def main(args) -> int:
+    """Точка входа для micpy mock-server (args — из cli.create_parser)."""
+    try:
+        config = MockConfig(
+            model=args.model,
+            latency=args.latency,
+            rtf=args.rtf,
+            bandwidth=args.bandwidth,
+            concurrency=args.concurrency,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            timeout_rate=args.timeout_rate,
+            hang_s=args.hang,
+            drip_rate=args.drip_rate,
+            drip_bytes_per_s=args.drip_bytes_per_s,
+            text=args.text,
+            seed=args.seed,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    server = MockTranscriptionServer((args.host, args.port), config)
+    logger.info(f"Mock transcription server on {server.base_url}")
+    logger.info(
+        f"  latency {config.latency_spec} + rtf {config.rtf}, "
+        f"errors {config.error_rate:.0%} ({config.error_status}), "
+        f"timeouts {config.timeout_rate:.0%}, slow drip {config.drip_rate:.0%}"
+    )
+    if config.bandwidth or config.concurrency:
+        logger.info(
+            f"  bandwidth {config.bandwidth or 'unlimited'} B/s, "
+            f"concurrency {config.concurrency or 'unlimited'}"
+        )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Stats: {server.snapshot()}")
+    return 0
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Бэкенды вывода распознанного текста.
+
+Бэкенд — один способ доставить текст: ввод в активное окно (wtype), буфер
+обмена (механизм выбирается при старте, см. clipboard), строка NDJSON в stdout, строка в файле или
+список в памяти для тестов. Режим вывода — цепочка бэкендов: текст уходит
+первому, кто справился (auto: wtype, затем буфер обмена).
+
+Вызывается из потока вывода демона: медленный композитор задерживает
+только вывод, но не следующую запись. Каждая попытка попадает в метрики —
+время по бэкенду и число неудач.
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from client.clipboard import close_clipboard, get_clipboard
+
+logger = logging.getLogger('OutputBackends')
+
+# Режимы вывода и их цепочки бэкендов
+OUTPUT_MODES = ('auto', 'injection', 'clipboard', 'stdout', 'file')
+
+# Сколько ждать wtype, с
+INJECTION_TIMEOUT = 10.0
+
+
+class OutputBackend:
+    """Способ вывода текста."""
+
+    name = ''
+
+    def available(self) -> bool:
+        """Можно ли пробовать этот бэкенд (проверяется один раз при создании)."""
+        return True
+
+    def write(self, text: str) -> bool:
+        """Вывести текст. False — не получилось, пробовать следующий бэкенд."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class WtypeBackend(OutputBackend):
+    """Ввод в активное окно через wtype (Wayland)."""
+
+    name = 'wtype'
+
+    def __init__(self):
+        self._path = shutil.which('wtype')
+
+    def available(self) -> bool:
+        return self._path is not None
+
+    def write(self, text: str) -> bool:
+        try:
+            result = subprocess.run(
+                [self._path, '--', text],
+                capture_output=True,
+                timeout=INJECTION_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            logger.warning("wtype timeout")
+            return False
+        if result.returncode == 0:
+            logger.info("Text inserted via wtype")
+            return True
+        stderr = result.stderr.decode().strip()
+        if stderr:
+            logger.warning(f"wtype failed: {stderr}")
+        else:
+            logger.warning("wtype failed with non-zero exit code")
+        return False
+
+
+class ClipboardBackend(OutputBackend):
+    """
+    Буфер обмена механизмом, найденным при старте (client.clipboard).
+
+    Имя бэкенда — имя механизма (owner, wl-copy, xclip, pyperclip...),
+    под ним он и попадает в статистику и метрики.
+    """
+
+    name = 'clipboard'
+
+    def __init__(self):
+        self._clipboard = get_clipboard()
+        if self._clipboard is not None:
+            self.name = self._clipboard.name
+
+    def available(self) -> bool:
+        return self._clipboard is not None
+
+    def write(self, text: str) -> bool:
+        if not self._clipboard.copy(text):
+            return False
+        logger.info(f"Text copied to clipboard via {self.name} - press Ctrl+V to paste")
+        return True
+
+    def close(self):
+        close_clipboard()
+
+
+class StdoutBackend(OutputBackend):
+    """Строка NDJSON на фразу в stdout: {"text": ..., "time": ...}."""
+
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        self._stream = stream
+
+    def write(self, text: str) -> bool:
+        stream = self._stream or sys.stdout
+        stream.write(json.dumps({"text": text, "time": time.time()}, ensure_ascii=False) + '\n')
+        stream.flush()
+        return True
+
+
+class FileBackend(OutputBackend):
+    """Дописывать каждую фразу строкой в файл."""
+
+    name = 'file'
+
+    def __init__(self, path: Path):
+        self.path = Path(path).expanduser()
+        self._file = None
+
+    def write(self, text: str) -> bool:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(text + '\n')
+        self._file.flush()
+        return True
+
+    def close(self):
+        file, self._file = self._file, None
+        if file is not None:
+            file.close()
+
+
+class FakeBackend(OutputBackend):
+    """Текст остаётся в памяти — для тестов и бенчмарков."""
+
+    name = 'fake'
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        """
+        Args:
+            delay: Имитация медленного вывода, с
+            fail: Всегда возвращать неудачу
+        """
+        self.delay = delay
+        self.fail = fail
+        self.texts: List[str] = []
+
+    def write(self, text: str) -> bool:
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            return False
+        self.texts.append(text)
+        return True
+
+
+def create_backends(mode: str, output_file: Optional[Path] = None) -> List[OutputBackend]:
+    """
+    Цепочка бэкендов для режима вывода.
+
+    Args:
+        mode: Один из OUTPUT_MODES
+        output_file: Файл для режима file
+    """
+    if mode == 'auto':
+        return [WtypeBackend(), ClipboardBackend()]
+    if mode == 'injection':
+        return [WtypeBackend()]
+    if mode == 'clipboard':
+        return [ClipboardBackend()]
+    if mode == 'stdout':
+        return [StdoutBackend()]
+    if mode == 'file':
+        if output_file is None:
+            raise ValueError("Output mode 'file' requires an output file")
+        return [FileBackend(output_file)]
+    raise ValueError(f"Unknown output mode: {mode!r}")
+
+
+class TextOutput:
+    """Цепочка бэкендов вывода с учётом времени и неудач каждого."""
+
+    def __init__(self, backends: Sequence[OutputBackend], metrics=None):
+        """
+        Args:
+            backends: Бэкенды в порядке попыток; недоступные отбрасываются сразу
+            metrics: DaemonMetrics для output_latency/output_failures
+        """
+        self.backends = [backend for backend in backends if backend.available()]
+        self.metrics = metrics
+        self._stats: Dict[str, Dict[str, float]] = {
+            backend.name: {"attempts": 0, "failures": 0, "seconds": 0.0}
+            for backend in self.backends
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return [backend.name for backend in self.backends]
+
+    def write(self, text: str) -> Optional[str]:
+        """
+        Вывести текст первым сработавшим бэкендом.
+
+        Returns:
+            Имя бэкенда или None, если не справился ни один
+        """
+        for backend in self.backends:
+            started = time.perf_counter()
+            try:
+                ok = backend.write(text)
+            except Exception as e:
+                logger.warning(f"{backend.name} failed: {e}")
+                ok = False
+            self._observe(backend.name, time.perf_counter() - started, ok)
+            if ok:
+                return backend.name
+        logger.error("No output backend succeeded" if self.backends
+                     else "No output backend available")
+        return None
+
+    def _observe(self, name: str, seconds: float, ok: bool):
+        with self._lock:
+            stats = self._stats[name]
+            stats["attempts"] += 1
+            stats["seconds"] += seconds
+            if not ok:
+                stats["failures"] += 1
+        if self.metrics is not None:
+            self.metrics.output_latency.observe(seconds, backend=name)
+            if not ok:
+                self.metrics.output_failures.inc(backend=name)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Попытки, неудачи и среднее время (мс) по бэкендам."""
+        with self._lock:
+            return {
+                name: {
+                    "attempts": stats["attempts"],
+                    "failures": stats["failures"],
+                    "mean_ms": round(stats["seconds"] / stats["attempts"] * 1000, 3)
+                    if stats["attempts"] else None,
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def close(self):
+        for backend in self.backends:
+            try:
+                backend.close()
+            except Exception as e:
+                logger.debug(f"{backend.name} close failed: {e}")
@@ -5,42 +5,201 @@
 Отправка аудио на API и получение распознанного текста.
 """
 
+import asyncio
+import importlib.util
+import io
 import logging
-from typing import Optional, Dict, Any
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional, Callable, Dict, Any, Iterable, Iterator, Sequence, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.filepost import encode_multipart_formdata
+
+from client.audio_codecs import (
+    CODEC_CHOICES,
+    available_codecs,
+    choose_codec,
+    encode_pcm,
+    wav_duration,
+    wav_to_pcm,
+)
+from client.endpoints import Endpoint, EndpointPool, parse_endpoints
+from client.metrics import DaemonMetrics
+from client.tracing import Tracer, UtteranceTrace
+from client.transcription_cache import TranscriptionCache, cache_from_env, cache_key
 
 logger = logging.getLogger('ParakeetClient')
 
+# Пул соединений: хватает на параллельные сегменты и прогрев
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Интервал повторного прогрева во время записи. Меньше типичного keep-alive
+# таймаута сервера (uvicorn — 5 с), иначе сервер закроет прогретое соединение
+PREWARM_INTERVAL = 4.0
+
+# Хеджирование: если ответа нет дольше HEDGE_PERCENTILE-го перцентиля
+# недавних задержек на секунду аудио, умноженного на длину записи,
+# дублирующий запрос уходит на другой сервер (или по другому соединению).
+# Пока замеров меньше HEDGE_MIN_SAMPLES — ждём HEDGE_INITIAL_DELAY секунд
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 5
+HEDGE_INITIAL_DELAY = 3.0
+HEDGE_HISTORY = 100
+
+# Статусы, которыми сервер отвергает формат файла
+_REJECT_STATUSES = (400, 415, 422)
+
+# Значение cache по умолчанию: взять из MICPY_CACHE (None — явно без кэша)
+_CACHE_FROM_ENV: Any = object()
+
+# aiohttp — опциональная зависимость асинхронного клиента (pip install micpy[async]).
+# Импортируется лениво: демону он не нужен
+ASYNC_HTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+
+
+class _TimedBody(io.BytesIO):
+    """
+    Тело запроса, запоминающее момент, когда оно отправлено целиком.
+
+    urllib3 читает файловое тело блоками до пустого read(): к этому моменту
+    последний блок уже передан в сокет. Момент (time.perf_counter) отмечается
+    и в трассе фразы как upload_done.
+    """
+
+    def __init__(self, data: bytes, trace: Optional[UtteranceTrace] = None):
+        super().__init__(data)
+        self.sent_at: Optional[float] = None
+        self._trace = trace
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        chunk = super().read(size)
+        if not chunk and self.sent_at is None:
+            self.sent_at = time.perf_counter()
+            if self._trace is not None:
+                self._trace.mark('upload_done', self.sent_at)
+        return chunk
+
+
+def _http_error_type(status_code: int) -> str:
+    """Тип ошибки для метрик: http_4xx / http_5xx (429 — перегрузка сервера)."""
+    if status_code == 429:
+        return 'http_429'
+    return f"http_{status_code // 100}xx"
+
 
 class ParakeetClient:
     """
     Клиент для работы с Parakeet API.
 
     Поддерживает OpenAI-совместимый протокол (/v1/audio/transcriptions).
+    Может работать с несколькими серверами: каждый запрос уходит на сервер
+    с наименьшим ожидаемым временем ответа (см. client.endpoints).
     """
 
     def __init__(
         self,
-        api_url: str = "http://localhost:5092/v1",
+        api_url: Union[str, Sequence[str]] = "http://localhost:5092/v1",
         model: str = "parakeet-tdt-0.6b-v3",
         api_key: Optional[str] = None,
-        timeout: int = 120
+        timeout: int = 120,
+        codec: Optional[str] = None,
+        hedge: Optional[bool] = None,
+        hedge_percentile: Optional[float] = None,
+        cache: Optional[TranscriptionCache] = _CACHE_FROM_ENV
     ):
         """
         Инициализация клиента.
 
         Args:
-            api_url: Базовый URL API (например, http://localhost:5092/v1)
+            api_url: Базовый URL API (например, http://localhost:5092/v1),
+                список URL или строка с URL через запятую
             model: Название модели
             api_key: API ключ (опционально)
             timeout: Таймаут запроса в секундах
+            codec: Формат загрузки: wav/mulaw/flac/opus/auto.
+                None — взять из MICPY_CODEC (по умолчанию wav)
+            hedge: Хеджировать запросы transcribe_with_retry.
+                None — взять из MICPY_HEDGE (по умолчанию выключено)
+            hedge_percentile: Перцентиль задержек, после которого уходит
+                дублирующий запрос. None — MICPY_HEDGE_PERCENTILE или 95
+            cache: Кэш результатов; None — без кэша. Не задан — по
+                MICPY_CACHE (off/memory/disk, по умолчанию выключен)
         """
-        self.api_url = api_url.rstrip('/')
+        urls = parse_endpoints(api_url)
+        self.endpoints = EndpointPool(urls)
+        # Основной сервер — первый в списке
+        self.api_url = urls[0]
         self.model = model
         self.api_key = api_key
         self.timeout = timeout
 
-        logger.info(f"ParakeetClient initialized: {api_url}, model: {model}")
+        if codec is None:
+            codec = os.environ.get('MICPY_CODEC', '').strip().lower() or 'wav'
+        if codec not in CODEC_CHOICES:
+            logger.warning(f"Unknown codec '{codec}', using wav")
+            codec = 'wav'
+        elif codec != 'auto' and codec not in available_codecs():
+            logger.warning(f"Codec '{codec}' is not available (no encoder found), using wav")
+            codec = 'wav'
+        self.codec = codec
+        # Кодеки, которые сервер отверг — больше их не пробуем
+        self._rejected_codecs: set = set()
+        # EWMA пропускной способности загрузки, байт/с: время от начала
+        # запроса до отправки последнего байта тела, без распознавания
+        self._throughput: Optional[float] = None
+
+        # Постоянная сессия: TCP/TLS-соединения переиспользуются между запросами
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._prewarm_stop: Optional[threading.Event] = None
+        self._prewarm_count = 0
+        # Асинхронная сессия aiohttp создаётся в цикле событий вызывающего кода
+        self._async_session = None
+
+        if hedge is None:
+            hedge = os.environ.get('MICPY_HEDGE', '').strip().lower() in ('1', 'true', 'yes', 'on')
+        if hedge_percentile is None:
+            try:
+                hedge_percentile = float(os.environ.get('MICPY_HEDGE_PERCENTILE', HEDGE_PERCENTILE))
+            except ValueError:
+                hedge_percentile = HEDGE_PERCENTILE
+        self.hedge = hedge
+        self.hedge_percentile = min(99.9, max(1.0, hedge_percentile))
+        # Задержки успешных запросов на секунду аудио — порог хеджирования
+        # масштабируется на длину записи, и длинные записи не дублируются
+        # только из-за того, что они длинные
+        self._latencies_per_second: deque = deque(maxlen=HEDGE_HISTORY)
+        # Потоки пула создаются при первом запросе
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=POOL_MAXSIZE,
+            thread_name_prefix='hedge'
+        )
+        # Счётчики статистики (хеджирование, прогревы) меняются из разных потоков
+        self._hedge_lock = threading.Lock()
+        self._hedge_counts = {"requests": 0, "hedged": 0, "wins": 0, "skipped": 0}
+        # Занятые потоки пула: проигравший запрос не прервать, он держит
+        # поток до ответа или таймаута
+        self._hedge_busy = 0
+
+        self.cache = cache_from_env() if cache is _CACHE_FROM_ENV else cache
+        # Трассировка фраз: отметки request_sent / response_received
+        self.tracer: Optional[Tracer] = None
+        # Метрики демона: задержка и ошибки запросов, объём загрузки, повторы
+        self.metrics: Optional[DaemonMetrics] = None
+
+        logger.info(
+            f"ParakeetClient initialized: {', '.join(urls)}, model: {model}, codec: {codec}"
+            + (f", hedging at p{self.hedge_percentile:g}" if hedge else "")
+            + (", cache on" if self.cache else "")
+        )
 
     def _get_headers(self) -> Dict[str, str]:
         """Получение заголовков для запроса."""
@@ -49,29 +208,117 @@ class ParakeetClient:
             headers["Authorization"] = f"Bearer {self.api_key}"
         return headers
 
+    def prewarm(self, interval: float = PREWARM_INTERVAL):
+        """
+        Прогреть соединение с API в фоне.
+
+        Вызывается при старте записи: к моменту остановки в пуле уже есть
+        открытое соединение, и запрос не платит за TCP/TLS-рукопожатие.
+        Пока прогрев не отменён (cancel_prewarm), соединение освежается
+        раз в interval секунд, чтобы его не закрыл keep-alive таймаут сервера.
+        """
+        self.cancel_prewarm()
+        stop = threading.Event()
+        self._prewarm_stop = stop
+
+        def warm():
+            while not stop.is_set():
+                try:
+                    # Греем тот сервер, на который уйдёт запрос
+                    self.session.get(self.endpoints.select().health_url, timeout=5)
+                    with self._hedge_lock:
+                        self._prewarm_count += 1
+                except Exception as e:
+                    logger.debug(f"Prewarm failed: {e}")
+                stop.wait(interval)
+
+        threading.Thread(target=warm, name='prewarm', daemon=True).start()
+
+    def cancel_prewarm(self):
+        """Остановить фоновый прогрев (соединение остаётся в пуле)."""
+        if self._prewarm_stop is not None:
+            self._prewarm_stop.set()
+            self._prewarm_stop = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Статистика пула соединений.
+
+        Returns:
+            requests — всего HTTP-запросов, new_connections — открыто
+            соединений, reused_connections — запросов по уже открытому
+            соединению, prewarms — выполненных прогревов, endpoints —
+            статистика по серверам, hedge_requests / hedged / hedge_wins /
+            hedge_rate — запросов с хеджированием, из них продублировано,
+            побед дубля и доля продублированных, hedge_skipped — запросов без
+            дубля из-за занятого пула, cache — статистика кэша
+            (None, если кэш выключен)
+        """
+        total = new = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    total += pool.num_requests
+                    new += pool.num_connections
+        with self._hedge_lock:
+            hedge = dict(self._hedge_counts)
+            prewarms = self._prewarm_count
+        return {
+            "requests": total,
+            "new_connections": new,
+            "reused_connections": max(0, total - new),
+            "prewarms": prewarms,
+            "endpoints": self.endpoints.stats(),
+            "hedge_requests": hedge["requests"],
+            "hedged": hedge["hedged"],
+            "hedge_wins": hedge["wins"],
+            "hedge_skipped": hedge["skipped"],
+            "hedge_rate": hedge["hedged"] / hedge["requests"] if hedge["requests"] else 0.0,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def close(self):
+        """Закрыть сессию и все соединения."""
+        self.cancel_prewarm()
+        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
     def health_check(self) -> bool:
         """
         Проверка доступности API.
 
+        Проверяются все серверы: недоступные исключаются из ротации,
+        восстановившиеся возвращаются.
+
         Returns:
-            True если API доступен
+            True если доступен хотя бы один сервер
         """
+        available = False
+        for endpoint in self.endpoints.endpoints:
+            healthy = self._check_endpoint(endpoint)
+            self.endpoints.record_health(endpoint, healthy)
+            if not healthy and len(self.endpoints) > 1:
+                logger.warning(f"Endpoint unavailable: {endpoint.url}")
+            available = available or healthy
+        return available
+
+    def _check_endpoint(self, endpoint: Endpoint) -> bool:
         try:
             # Пытаемся получить /health
-            base_url = self.api_url.rsplit('/v1', 1)[0]
-            health_url = f"{base_url}/health"
-            response = requests.get(health_url, timeout=5)
+            response = self.session.get(endpoint.health_url, timeout=5)
 
             if response.status_code == 200:
                 return True
 
             # Пробуем /v1/models как fallback
-            models_url = f"{self.api_url}/models"
-            response = requests.get(models_url, timeout=5, headers=self._get_headers())
+            models_url = f"{endpoint.url}/models"
+            response = self.session.get(models_url, timeout=5, headers=self._get_headers())
             return response.status_code == 200
 
         except Exception as e:
-            logger.debug(f"Health check failed: {e}")
+            logger.debug(f"Health check failed for {endpoint.url}: {e}")
             return False
 
     def transcribe(
@@ -82,6 +329,11 @@ class ParakeetClient:
         """
         Транскрипция аудио через API.
 
+        Если выбран сжимающий кодек, PCM из WAV перекодируется перед
+        отправкой; при отказе сервера принять формат запрос повторяется
+        в WAV, а кодек запоминается как неподдерживаемый. С включённым кэшем
+        повторное аудио распознаётся без запроса (в результате есть "cached").
+
         Args:
             audio_bytes: Байты аудио файла (WAV формат)
             filename: Имя файла для отправки
@@ -95,6 +347,294 @@ class ParakeetClient:
                 "error": str           # Ошибка (если есть)
             }
         """
+        key, cached = self._cache_lookup(audio_bytes)
+        if cached:
+            return cached
+        result = self._transcribe(audio_bytes, filename)
+        self._cache_store(key, result)
+        return result
+
+    def _cache_lookup(self, audio_bytes: bytes) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Ключ кэша и сохранённый результат (None, None — кэш выключен)."""
+        if self.cache is None:
+            return None, None
+        key = cache_key(audio_bytes, self.model)
+        if key is None:
+            return None, None
+        cached = self.cache.get(key)
+        if cached:
+            logger.info(f"Transcription served from {cached['cached']} cache")
+        return key, cached
+
+    def _cache_store(self, key: Optional[str], result: Dict[str, Any]):
+        if key is not None:
+            self.cache.put(key, result)
+
+    def _transcribe(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        endpoint: Optional[Endpoint] = None
+    ) -> Dict[str, Any]:
+        """transcribe() на заданный сервер (None — выбрать лучший)."""
+        audio_seconds = wav_duration(audio_bytes)
+        file_bytes, upload_name, mime, codec = self._encode_upload(audio_bytes, filename)
+        result = self._send_file(file_bytes, upload_name, mime, audio_seconds, endpoint)
+        if self._codec_rejected(result, codec):
+            result = self._send_file(audio_bytes, filename, 'audio/wav', audio_seconds, endpoint)
+        return result
+
+    def _hedge_delay(self, audio_seconds: Optional[float]) -> float:
+        """
+        Порог хеджирования для записи длиной audio_seconds.
+
+        Заданный перцентиль недавних задержек на секунду аудио, умноженный
+        на длину записи: иначе короткие фразы задают порог, который длинная
+        диктовка превышает почти всегда.
+        """
+        with self._hedge_lock:
+            latencies = sorted(self._latencies_per_second)
+        if not audio_seconds or len(latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_INITIAL_DELAY
+        index = min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100))
+        return latencies[index] * audio_seconds
+
+    def _record_latency(self, elapsed: float, audio_seconds: Optional[float]):
+        """Учесть задержку успешного запроса (длина потоковой записи неизвестна)."""
+        if audio_seconds:
+            with self._hedge_lock:
+                self._latencies_per_second.append(elapsed / audio_seconds)
+
+    def _submit_hedge_leg(self, fn: Callable, *args, reserve: int = 2) -> Optional[Future]:
+        """
+        Запустить запрос в пуле хеджирования, если в нём есть reserve
+        свободных потоков (основному запросу нужен ещё один — под дубль).
+
+        Returns:
+            Future или None, если пул занят
+        """
+        with self._hedge_lock:
+            if POOL_MAXSIZE - self._hedge_busy < reserve:
+                return None
+            self._hedge_busy += 1
+        future = self._hedge_executor.submit(fn, *args)
+        future.add_done_callback(self._release_hedge_leg)
+        return future
+
+    def _release_hedge_leg(self, _future: Future):
+        with self._hedge_lock:
+            self._hedge_busy -= 1
+
+    def _count_hedge(self, counter: str):
+        with self._hedge_lock:
+            self._hedge_counts[counter] += 1
+
+    def _transcribe_hedged(self, audio_bytes: bytes, filename: str) -> Dict[str, Any]:
+        """
+        transcribe() с хеджированием.
+
+        Если основной запрос не ответил за _hedge_delay(), такой же запрос
+        уходит на другой сервер (с одним сервером — по другому соединению).
+        Побеждает первый успешный ответ. Блокирующий запрос requests прервать
+        нельзя: проигравший дорабатывает в фоне, его результат отбрасывается,
+        а задержка идёт в статистику сервера. Пока он держит поток пула,
+        свободных потоков меньше; без свободного потока запрос не дублируется
+        (hedge_skipped), а без двух — выполняется в вызывающем потоке.
+        """
+        self._count_hedge("requests")
+        audio_seconds = wav_duration(audio_bytes)
+        primary_endpoint = self.endpoints.select(audio_seconds)
+        delay = self._hedge_delay(audio_seconds)
+        transcribe = self._transcribe
+        if self.tracer is not None:
+            # Потоки пула не привязаны к трассе: отметки запроса — в трассу
+            # той фразы, что вызвала transcribe()
+            transcribe = self.tracer.wrap(transcribe)
+
+        primary = self._submit_hedge_leg(transcribe, audio_bytes, filename, primary_endpoint)
+        if primary is None:
+            # Пул занят зависшими запросами — без хеджирования, в этом потоке
+            self._count_hedge("skipped")
+            return self._transcribe(audio_bytes, filename, primary_endpoint)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        backup_endpoint = self.endpoints.select(audio_seconds, exclude=[primary_endpoint])
+        backup = self._submit_hedge_leg(
+            transcribe, audio_bytes, filename, backup_endpoint, reserve=1
+        )
+        if backup is None:
+            logger.warning("Hedge pool is busy, waiting for the primary request")
+            self._count_hedge("skipped")
+            return primary.result()
+        logger.info(f"No response after {delay:.2f}s, hedging to {backup_endpoint.url}")
+        self._count_hedge("hedged")
+
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result["success"]:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is backup:
+                        self._count_hedge("wins")
+                        logger.info("Hedged request won")
+                    return result
+        # Оба запроса неудачны — возвращаем ошибку основного
+        return primary.result()
+
+    def _encode_upload(self, audio_bytes: bytes, filename: str) -> Tuple[bytes, str, str, str]:
+        """
+        Перекодировать WAV в выбранный кодек.
+
+        Returns:
+            (байты файла, имя файла, MIME, кодек); исходный WAV, если кодек
+            не нужен или кодирование не удалось
+        """
+        as_wav = (audio_bytes, filename, 'audio/wav', 'wav')
+        if self.codec == 'wav':
+            return as_wav
+
+        try:
+            pcm, sample_rate, channels = wav_to_pcm(audio_bytes)
+            codec = self._select_codec(len(pcm) / (sample_rate * channels * 2))
+            if codec == 'wav':
+                return as_wav
+            encoded, encoded_name, mime = encode_pcm(pcm, sample_rate, channels, codec)
+        except Exception as e:
+            logger.warning(f"Encoding failed, sending WAV: {e}")
+            return as_wav
+
+        logger.info(
+            f"Encoded as {codec}: {len(audio_bytes) / 1024:.0f} KB -> {len(encoded) / 1024:.0f} KB"
+        )
+        return encoded, encoded_name, mime, codec
+
+    def _codec_rejected(self, result: Dict[str, Any], codec: str) -> bool:
+        """Отверг ли сервер формат; отвергнутый кодек больше не используется."""
+        if codec == 'wav' or result["success"]:
+            return False
+        if result.get("status_code") not in _REJECT_STATUSES:
+            return False
+        logger.warning(f"Server rejected {codec}, falling back to WAV")
+        self._rejected_codecs.add(codec)
+        return True
+
+    def _select_codec(self, audio_seconds: float) -> str:
+        """Кодек для записи данной длины с учётом режима и отказов сервера."""
+        if self.codec != 'auto':
+            return 'wav' if self.codec in self._rejected_codecs else self.codec
+
+        candidates = [c for c in available_codecs() if c not in self._rejected_codecs]
+        return choose_codec(audio_seconds, self._throughput, candidates)
+
+    def _send_file(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        mime: str,
+        audio_seconds: Optional[float] = None,
+        endpoint: Optional[Endpoint] = None
+    ) -> Dict[str, Any]:
+        """
+        Отправить файл и обновить оценку пропускной способности.
+
+        Пропускная способность считается по времени загрузки тела, а не всего
+        запроса: иначе в неё входит распознавание, и на быстром канале оценка
+        занижена — а после выбора сжатия ещё и падает дальше (файл меньше,
+        время почти то же).
+        """
+        body, content_type = encode_multipart_formdata({
+            'model': self.model,
+            'file': (filename, file_bytes, mime),
+        })
+        timed = _TimedBody(body, self.tracer.current if self.tracer else None)
+        headers = self._get_headers()
+        headers['Content-Type'] = content_type
+        started = time.perf_counter()
+        self._count_upload_bytes(len(file_bytes))
+        result = self._post_transcription(audio_seconds, endpoint, data=timed, headers=headers)
+        if result["success"] and timed.sent_at is not None:
+            self._record_upload(len(body), timed.sent_at - started)
+        return result
+
+    def _record_upload(self, size: int, elapsed: float):
+        """Обновить EWMA пропускной способности по успешной загрузке."""
+        if elapsed <= 0:
+            return
+        sample = size / elapsed
+        self._throughput = sample if self._throughput is None else (
+            0.7 * self._throughput + 0.3 * sample
+        )
+
+    def transcribe_stream(
+        self,
+        chunks: Iterable[bytes],
+        filename: str = "audio.wav"
+    ) -> Dict[str, Any]:
+        """
+        Транскрипция с потоковой загрузкой (chunked transfer encoding).
+
+        Тело multipart-запроса собирается генератором поверх chunks, поэтому
+        загрузка идёт параллельно с записью: к моменту остановки почти всё
+        аудио уже на сервере. Повторить такой запрос нельзя — генератор
+        одноразовый; при ошибке вызывающий код отправляет запись целиком.
+
+        Args:
+            chunks: Итератор байтов аудиофайла (например, AudioBuffer.iter_live_wav())
+            filename: Имя файла для отправки
+
+        Returns:
+            Словарь с результатом, как у transcribe()
+        """
+        boundary = uuid.uuid4().hex
+        headers = self._get_headers()
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        body = self._multipart_stream(boundary, chunks, filename)
+        return self._post_transcription(None, data=body, headers=headers)
+
+    def _multipart_stream(
+        self,
+        boundary: str,
+        chunks: Iterable[bytes],
+        filename: str
+    ) -> Iterator[bytes]:
+        """Тело multipart/form-data с полями model и file, файл — из chunks."""
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="model"\r\n\r\n'
+            f'{self.model}\r\n'
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n'
+        ).encode()
+        for chunk in chunks:
+            if chunk:
+                self._count_upload_bytes(len(chunk))
+                yield chunk
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    def _post_transcription(
+        self,
+        audio_seconds: Optional[float],
+        endpoint: Optional[Endpoint] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        POST на /audio/transcriptions и нормализация ответа.
+
+        Args:
+            audio_seconds: Длина записи для выбора сервера и учёта RTF
+                (None — неизвестна)
+            endpoint: Сервер (None — выбрать лучший)
+            **kwargs: Аргументы для session.post (files, data, headers)
+
+        Returns:
+            Словарь с результатом, как у transcribe()
+        """
         result = {
             "text": "",
             "duration": 0.0,
@@ -102,27 +642,31 @@ class ParakeetClient:
             "error": None
         }
 
-        try:
-            url = f"{self.api_url}/audio/transcriptions"
+        endpoint = endpoint or self.endpoints.select(audio_seconds)
+        if len(self.endpoints) > 1:
+            result["endpoint"] = endpoint.url
+        trace = self.tracer.current if self.tracer else None
+        started = time.monotonic()
 
-            files = {
-                'file': (filename, audio_bytes, 'audio/wav')
-            }
-            data = {
-                'model': self.model
-            }
+        try:
+            url = f"{endpoint.url}/audio/transcriptions"
 
-            response = requests.post(
+            if trace:
+                trace.mark('request_sent')
+            response = self.session.post(
                 url,
-                files=files,
-                data=data,
-                headers=self._get_headers(),
-                timeout=self.timeout
+                timeout=self.timeout,
+                **kwargs
             )
+            if trace:
+                trace.mark('response_received')
 
             if response.status_code != 200:
+                result["status_code"] = response.status_code
                 result["error"] = f"API error {response.status_code}: {response.text[:200]}"
                 logger.error(result["error"])
+                self._record_endpoint_error(endpoint, response.status_code)
+                self._observe_request(started, _http_error_type(response.status_code))
                 return result
 
             api_result = response.json()
@@ -131,21 +675,50 @@ class ParakeetClient:
             result["text"] = api_result.get("text", "")
             result["duration"] = api_result.get("duration", 0.0)
             result["success"] = True
+            elapsed = time.monotonic() - started
+            self.endpoints.record_success(endpoint, elapsed, audio_seconds)
+            self._record_latency(elapsed, audio_seconds)
+            self._observe_request(started)
 
             logger.info(f"Transcription complete: {len(result['text'])} chars")
 
         except requests.exceptions.Timeout:
             result["error"] = f"Request timeout ({self.timeout}s)"
             logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'timeout')
         except requests.exceptions.ConnectionError as e:
             result["error"] = f"Connection failed: {str(e)[:100]}"
             logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'connection')
         except Exception as e:
             result["error"] = f"Transcription error: {str(e)[:100]}"
             logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'other')
 
         return result
 
+    def _observe_request(self, started: float, error_type: Optional[str] = None):
+        """Учесть запрос в метриках: задержка (только успешные) и тип ошибки."""
+        if self.metrics is None:
+            return
+        self.metrics.api_requests.inc()
+        if error_type is None:
+            self.metrics.api_latency.observe(time.monotonic() - started)
+        else:
+            self.metrics.api_errors.inc(type=error_type)
+
+    def _count_upload_bytes(self, size: int):
+        if self.metrics is not None:
+            self.metrics.upload_bytes.inc(size)
+
+    def _record_endpoint_error(self, endpoint: Endpoint, status_code: int):
+        """Ошибки 5xx/429 — проблема сервера; прочие 4xx — запроса (например, формата)."""
+        if status_code >= 500 or status_code == 429:
+            self.endpoints.record_failure(endpoint)
+
     def transcribe_with_retry(
         self,
         audio_bytes: bytes,
@@ -155,6 +728,9 @@ class ParakeetClient:
         """
         Транскрипция с повторными попытками.
 
+        При включённом хеджировании каждая попытка хеджируется; кэш
+        проверяется один раз до первой попытки.
+
         Args:
             audio_bytes: Байты аудио файла
             filename: Имя файла
@@ -163,19 +739,28 @@ class ParakeetClient:
         Returns:
             Результат транскрипции
         """
+        key, cached = self._cache_lookup(audio_bytes)
+        if cached:
+            return cached
+
         last_result = None
 
         for attempt in range(max_retries + 1):
-            result = self.transcribe(audio_bytes, filename)
+            if self.hedge:
+                result = self._transcribe_hedged(audio_bytes, filename)
+            else:
+                result = self._transcribe(audio_bytes, filename)
 
             if result["success"]:
+                self._cache_store(key, result)
                 return result
 
             last_result = result
 
             if attempt < max_retries:
                 logger.info(f"Retry {attempt + 1}/{max_retries}...")
-                import time
+                if self.metrics is not None:
+                    self.metrics.retries.inc()
                 time.sleep(1)
 
         return last_result or {
@@ -184,3 +769,293 @@ class ParakeetClient:
             "success": False,
             "error": "All retries failed"
         }
+
+    async def _get_async_session(self):
+        """Общая сессия aiohttp с пулом соединений (создаётся в текущем цикле)."""
+        if self._async_session is None or self._async_session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=POOL_MAXSIZE, limit_per_host=POOL_MAXSIZE)
+            # Момент отправки последнего куска тела — конец загрузки
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_chunk_sent.append(self._on_chunk_sent)
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace_config]
+            )
+        return self._async_session
+
+    @staticmethod
+    async def _on_chunk_sent(_session, context, _params):
+        if isinstance(context.trace_request_ctx, dict):
+            context.trace_request_ctx['sent_at'] = time.perf_counter()
+
+    async def ahealth_check(self) -> bool:
+        """
+        Асинхронная проверка доступности API.
+
+        Без aiohttp выполняет health_check() в пуле потоков.
+
+        Returns:
+            True если API доступен
+        """
+        if not ASYNC_HTTP_AVAILABLE:
+            return await asyncio.get_running_loop().run_in_executor(None, self.health_check)
+
+        import aiohttp
+        session = await self._get_async_session()
+        short = aiohttp.ClientTimeout(total=5)
+
+        async def check(endpoint: Endpoint) -> bool:
+            try:
+                async with session.get(endpoint.health_url, timeout=short) as response:
+                    if response.status == 200:
+                        return True
+                models_url = f"{endpoint.url}/models"
+                async with session.get(
+                    models_url, timeout=short, headers=self._get_headers()
+                ) as response:
+                    return response.status == 200
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Health check failed for {endpoint.url}: {e}")
+                return False
+
+        endpoints = self.endpoints.endpoints
+        results = await asyncio.gather(*(check(e) for e in endpoints))
+        for endpoint, healthy in zip(endpoints, results):
+            self.endpoints.record_health(endpoint, healthy)
+        return any(results)
+
+    async def atranscribe(
+        self,
+        audio_bytes: bytes,
+        filename: str = "audio.wav"
+    ) -> Dict[str, Any]:
+        """
+        Асинхронная транскрипция — неблокирующий аналог transcribe().
+
+        Работает в цикле событий вызывающего кода (например, prompt_toolkit):
+        несколько запросов могут идти одновременно в одном потоке, а отмена
+        задачи обрывает запрос. Без aiohttp выполняет transcribe() в пуле потоков.
+
+        Args:
+            audio_bytes: Байты аудио файла (WAV формат)
+            filename: Имя файла для отправки
+
+        Returns:
+            Словарь с результатом, как у transcribe()
+        """
+        key, cached = self._cache_lookup(audio_bytes)
+        if cached:
+            return cached
+        result = await self._atranscribe(audio_bytes, filename)
+        self._cache_store(key, result)
+        return result
+
+    async def _atranscribe(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        endpoint: Optional[Endpoint] = None
+    ) -> Dict[str, Any]:
+        """atranscribe() на заданный сервер (None — выбрать лучший)."""
+        loop = asyncio.get_running_loop()
+        if not ASYNC_HTTP_AVAILABLE:
+            return await loop.run_in_executor(
+                None, self._transcribe, audio_bytes, filename, endpoint
+            )
+
+        audio_seconds = wav_duration(audio_bytes)
+        if self.codec == 'wav':
+            upload = (audio_bytes, filename, 'audio/wav', 'wav')
+        else:
+            # Внешние кодировщики (ffmpeg) не должны блокировать цикл событий
+            upload = await loop.run_in_executor(None, self._encode_upload, audio_bytes, filename)
+        file_bytes, upload_name, mime, codec = upload
+
+        result = await self._apost_transcription(
+            file_bytes, upload_name, mime, audio_seconds, endpoint
+        )
+        if self._codec_rejected(result, codec):
+            result = await self._apost_transcription(
+                audio_bytes, filename, 'audio/wav', audio_seconds, endpoint
+            )
+        return result
+
+    async def _atranscribe_hedged(self, audio_bytes: bytes, filename: str) -> Dict[str, Any]:
+        """
+        atranscribe() с хеджированием (см. _transcribe_hedged).
+
+        Проигравший запрос отменяется вместе с его соединением.
+        """
+        self._count_hedge("requests")
+        audio_seconds = wav_duration(audio_bytes)
+        primary_endpoint = self.endpoints.select(audio_seconds)
+        delay = self._hedge_delay(audio_seconds)
+
+        primary = asyncio.ensure_future(
+            self._atranscribe(audio_bytes, filename, primary_endpoint)
+        )
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        backup_endpoint = self.endpoints.select(audio_seconds, exclude=[primary_endpoint])
+        logger.info(f"No response after {delay:.2f}s, hedging to {backup_endpoint.url}")
+        self._count_hedge("hedged")
+        backup = asyncio.ensure_future(
+            self._atranscribe(audio_bytes, filename, backup_endpoint)
+        )
+
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result["success"]:
+                        if task is backup:
+                            self._count_hedge("wins")
+                            logger.info("Hedged request won")
+                        return result
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _apost_transcription(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        mime: str,
+        audio_seconds: Optional[float] = None,
+        endpoint: Optional[Endpoint] = None
+    ) -> Dict[str, Any]:
+        """Асинхронный POST на /audio/transcriptions (endpoint=None — лучший сервер)."""
+        import aiohttp
+
+        result = {
+            "text": "",
+            "duration": 0.0,
+            "success": False,
+            "error": None
+        }
+
+        form = aiohttp.FormData()
+        form.add_field('model', self.model)
+        form.add_field('file', file_bytes, filename=filename, content_type=mime)
+        self._count_upload_bytes(len(file_bytes))
+
+        session = await self._get_async_session()
+        endpoint = endpoint or self.endpoints.select(audio_seconds)
+        if len(self.endpoints) > 1:
+            result["endpoint"] = endpoint.url
+        trace = self.tracer.current if self.tracer else None
+        upload: Dict[str, float] = {}
+        started = time.monotonic()
+        upload_started = time.perf_counter()
+        try:
+            url = f"{endpoint.url}/audio/transcriptions"
+            if trace:
+                trace.mark('request_sent')
+            async with session.post(
+                url, data=form, headers=self._get_headers(), trace_request_ctx=upload
+            ) as response:
+                if trace:
+                    trace.mark('response_received')
+                    if 'sent_at' in upload:
+                        trace.mark('upload_done', upload['sent_at'])
+                if response.status != 200:
+                    body = await response.text()
+                    result["status_code"] = response.status
+                    result["error"] = f"API error {response.status}: {body[:200]}"
+                    logger.error(result["error"])
+                    self._record_endpoint_error(endpoint, response.status)
+                    self._observe_request(started, _http_error_type(response.status))
+                    return result
+                api_result = await response.json(content_type=None)
+
+            elapsed = time.monotonic() - started
+            result["text"] = api_result.get("text", "")
+            result["duration"] = api_result.get("duration", 0.0)
+            result["success"] = True
+            if 'sent_at' in upload:
+                self._record_upload(len(file_bytes), upload['sent_at'] - upload_started)
+            self.endpoints.record_success(endpoint, elapsed, audio_seconds)
+            self._record_latency(elapsed, audio_seconds)
+            self._observe_request(started)
+
+            logger.info(f"Transcription complete: {len(result['text'])} chars")
+
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            result["error"] = f"Request timeout ({self.timeout}s)"
+            logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'timeout')
+        except aiohttp.ClientConnectionError as e:
+            result["error"] = f"Connection failed: {str(e)[:100]}"
+            logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'connection')
+        except Exception as e:
+            result["error"] = f"Transcription error: {str(e)[:100]}"
+            logger.error(result["error"])
+            self.endpoints.record_failure(endpoint)
+            self._observe_request(started, 'other')
+
+        return result
+
+    async def atranscribe_with_retry(
+        self,
+        audio_bytes: bytes,
+        filename: str = "audio.wav",
+        max_retries: int = 2
+    ) -> Dict[str, Any]:
+        """
+        Асинхронная транскрипция с повторными попытками.
+
+        Пауза между попытками — asyncio.sleep, поток не блокируется.
+
+        Returns:
+            Результат транскрипции
+        """
+        key, cached = self._cache_lookup(audio_bytes)
+        if cached:
+            return cached
+
+        last_result = None
+
+        for attempt in range(max_retries + 1):
+            if self.hedge:
+                result = await self._atranscribe_hedged(audio_bytes, filename)
+            else:
+                result = await self._atranscribe(audio_bytes, filename)
+
+            if result["success"]:
+                self._cache_store(key, result)
+                return result
+
+            last_result = result
+
+            if attempt < max_retries:
+                logger.info(f"Retry {attempt + 1}/{max_retries}...")
+                if self.metrics is not None:
+                    self.metrics.retries.inc()
+                await asyncio.sleep(1)
+
+        return last_result or {
+            "text": "",
+            "duration": 0.0,
+            "success": False,
+            "error": "All retries failed"
+        }
+
+    async def aclose(self):
+        """Закрыть асинхронную сессию."""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
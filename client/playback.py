@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Постоянный движок воспроизведения звуковых уведомлений.
+
+Один выходной поток на всё время работы демона или редактора: pw-play,
+читающий сырой PCM из канала (PipeWire), или PyAudio output stream.
+Бипы подмешиваются в поток с точностью до сэмпла, keepalive — это тот же
+поток, в который непрерывно пишется тишина. Раньше на каждый бип
+запускались bash и pw-play, а keepalive перезапускал pw-play каждые 10 с:
+создание процесса и подключение к PipeWire на каждом звуке — ровно то,
+с чем боролся SOUND_DEBUGGING.md.
+
+Без keepalive поток пишется только пока звучит бип, между бипами поток
+воспроизведения спит на условной переменной — без пробуждений по таймеру.
+"""
+
+import contextlib
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('Playback')
+
+# Размер блока записи и сколько звука держать в канале pw-play, мс:
+# опережение — это и задержка бипа, поэтому она постоянна
+BLOCK_MS = 50
+LEAD_MS = 100
+
+
+@contextlib.contextmanager
+def suppress_alsa_warnings():
+    """Подавление ALSA warnings (пишутся библиотекой прямо в stderr)."""
+    try:
+        devnull = open(os.devnull, 'w')
+        old_stderr = os.dup(2)
+    except OSError:
+        # Не удалось перенаправить stderr — просто продолжаем
+        yield
+        return
+    try:
+        os.dup2(devnull.fileno(), 2)
+        yield
+    finally:
+        os.dup2(old_stderr, 2)
+        os.close(old_stderr)
+        devnull.close()
+
+
+class PipeWireSink:
+    """
+    pw-play, читающий PCM 16-bit моно из stdin.
+
+    Канал сам по себе буферизует секунды звука, поэтому запись идёт в темпе
+    реального времени: в канале не больше LEAD_MS. Если демон убит, pw-play
+    получает EOF и завершается — сирот не остаётся.
+    """
+
+    name = 'pw-play'
+
+    def __init__(self, pw_play: str, sample_rate: int, env: Optional[dict] = None):
+        self.pw_play = pw_play
+        self.sample_rate = sample_rate
+        self.env = env
+        self._proc: Optional[subprocess.Popen] = None
+        # Опорная точка темпа: момент и число записанных с него сэмплов
+        self._anchor: Optional[float] = None
+        self._samples = 0
+
+    def open(self):
+        self._proc = subprocess.Popen(
+            [self.pw_play, '--raw', '--format', 's16', '--rate', str(self.sample_rate),
+             '--channels', '1', '-'],
+            stdin=subprocess.PIPE,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Ctrl+C в терминале не должен убить звук раньше штатной остановки
+            start_new_session=True
+        )
+
+    def write(self, data: bytes):
+        now = time.monotonic()
+        if self._anchor is None or now > self._anchor + self._samples / self.sample_rate:
+            # Первый блок или канал опустел (пауза между бипами) — новый отсчёт
+            self._anchor = now
+            self._samples = 0
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+        self._samples += len(data) // 2
+        ahead = self._anchor + self._samples / self.sample_rate - now
+        if ahead > LEAD_MS / 1000:
+            time.sleep(ahead - LEAD_MS / 1000)
+
+    def close(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+class PyAudioSink:
+    """PyAudio output stream: блокирующая запись сама задаёт темп."""
+
+    name = 'pyaudio'
+
+    def __init__(self, sample_rate: int, block_frames: int):
+        self.sample_rate = sample_rate
+        self.block_frames = block_frames
+        self._pa = None
+        self._stream = None
+
+    def open(self):
+        import pyaudio
+
+        with suppress_alsa_warnings():
+            self._pa = pyaudio.PyAudio()
+            try:
+                self._stream = self._pa.open(
+                    format=pyaudio.paInt16,
+                    channels=1,
+                    rate=self.sample_rate,
+                    output=True,
+                    frames_per_buffer=self.block_frames
+                )
+            except Exception:
+                self._pa.terminate()
+                self._pa = None
+                raise
+
+    def write(self, data: bytes):
+        self._stream.write(data)
+
+    def close(self):
+        stream, self._stream = self._stream, None
+        pa, self._pa = self._pa, None
+        try:
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+        finally:
+            if pa is not None:
+                pa.terminate()
+
+
+class PlaybackEngine:
+    """
+    Один поток вывода и микшер поверх него.
+
+    play() только ставит звук в очередь — вызов не блокируется и не
+    порождает процессов. Поток воспроизведения пишет блоки по BLOCK_MS:
+    сумму звучащих в этом окне бипов или тишину.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        keepalive: bool = False,
+        pw_play: Optional[str] = None,
+        env: Optional[dict] = None
+    ):
+        """
+        Args:
+            sample_rate: Частота PCM всех звуков
+            keepalive: Непрерывно писать тишину, чтобы выход не засыпал
+            pw_play: Путь к pw-play; None — сразу PyAudio
+            env: Окружение для pw-play
+        """
+        self.sample_rate = sample_rate
+        self.keepalive = keepalive
+        self.block_frames = sample_rate * BLOCK_MS // 1000
+        self._sinks = []
+        if pw_play:
+            self._sinks.append(PipeWireSink(pw_play, sample_rate, env))
+        self._sinks.append(PyAudioSink(sample_rate, self.block_frames))
+        self._sink = None
+        self._silence = b'\x00\x00' * self.block_frames
+        self._cond = threading.Condition()
+        # Звучащие и запланированные звуки: (сэмплы, позиция начала)
+        self._voices: List[Tuple[np.ndarray, int]] = []
+        # Позиция следующего записываемого сэмпла
+        self._cursor = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def backend(self) -> Optional[str]:
+        return self._sink.name if self._sink else None
+
+    def start(self) -> bool:
+        """Открыть вывод (pw-play, затем PyAudio). False — звук недоступен."""
+        if self._running:
+            return True
+        if not self._open_sink():
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='playback', daemon=True)
+        self._thread.start()
+        mode = ', keepalive' if self.keepalive else ''
+        logger.info(f"Playback via {self.backend}{mode}")
+        return True
+
+    def _open_sink(self) -> bool:
+        while self._sinks:
+            sink = self._sinks.pop(0)
+            try:
+                sink.open()
+            except Exception as e:
+                logger.warning(f"{sink.name} output unavailable: {e}")
+                continue
+            self._sink = sink
+            return True
+        self._sink = None
+        return False
+
+    def play(self, pcm: bytes, delay: float = 0.0) -> bool:
+        """
+        Подмешать звук в поток.
+
+        Args:
+            pcm: PCM 16-bit моно с частотой sample_rate
+            delay: Сдвиг от текущей позиции потока, с
+
+        Returns:
+            False — движок не работает
+        """
+        samples = np.frombuffer(pcm, dtype='<i2')
+        with self._cond:
+            if not self._running:
+                return False
+            self._voices.append((samples, self._cursor + int(delay * self.sample_rate)))
+            self._cond.notify()
+        return True
+
+    def _next_block(self) -> Optional[bytes]:
+        """Следующий блок (под блокировкой); None — движок остановлен."""
+        while self._running and not self.keepalive and not self._voices:
+            self._cond.wait()
+        if not self._running:
+            return None
+
+        start = self._cursor
+        end = start + self.block_frames
+        self._cursor = end
+        if not any(at < end for _, at in self._voices):
+            return self._silence
+
+        mix = np.zeros(self.block_frames, dtype=np.int32)
+        pending = []
+        for samples, at in self._voices:
+            lo, hi = max(at, start), min(at + len(samples), end)
+            if lo < hi:
+                mix[lo - start:hi - start] += samples[lo - at:hi - at]
+            if at + len(samples) > end:
+                pending.append((samples, at))
+        self._voices = pending
+        return np.clip(mix, -32768, 32767).astype('<i2').tobytes()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                block = self._next_block()
+            if block is None:
+                return
+            try:
+                self._sink.write(block)
+            except Exception as e:
+                logger.warning(f"{self._sink.name} output failed: {e}")
+                self._close_sink()
+                with self._cond:
+                    if self._running and not self._open_sink():
+                        self._running = False
+                        self._voices.clear()
+                        logger.error("No audio output left, notification sounds disabled")
+                        return
+                logger.info(f"Playback switched to {self.backend}")
+
+    def _close_sink(self):
+        sink, self._sink = self._sink, None
+        if sink is None:
+            return
+        try:
+            sink.close()
+        except Exception as e:
+            logger.debug(f"{sink.name} close failed: {e}")
+
+    def stop(self, timeout: float = 1.0):
+        """Доиграть текущий блок и закрыть вывод."""
+        with self._cond:
+            self._running = False
+            self._voices.clear()
+            self._cond.notify()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._close_sink()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Сегментированная транскрипция длинной диктовки.
+
+Живая запись режется на паузах, каждый готовый сегмент сразу уходит в API
+через ограниченный пул потоков, пока пользователь продолжает говорить.
+После остановки остаётся дождаться только последнего сегмента; тексты
+склеиваются в исходном порядке.
+"""
+
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Dict, List, Optional
+
+from client.audio_buffer import AudioBuffer, VoiceActivityDetector
+from client.parakeet_client import ParakeetClient
+
+logger = logging.getLogger('Segmenter')
+
+
+class SegmentedTranscriber:
+    """
+    Нарезка живой записи AudioBuffer на сегменты по паузам.
+
+    Анализ идёт в отдельном потоке поверх AudioBuffer.iter_live_pcm():
+    аудио делится на кадры по frame_ms, RMS всех готовых кадров считается
+    одним векторным вызовом VoiceActivityDetector, кадр с RMS ниже порога
+    считается тишиной. Когда тишина длится не меньше min_pause_ms, а сегмент не
+    короче min_segment_s, сегмент обрезается посередине паузы и
+    отправляется на транскрипцию.
+    """
+
+    def __init__(
+        self,
+        audio_buffer: AudioBuffer,
+        api_client: ParakeetClient,
+        executor: Executor,
+        min_pause_ms: int = 600,
+        min_segment_s: float = 3.0,
+        silence_rms: int = 500,
+        frame_ms: int = 30
+    ):
+        """
+        Args:
+            audio_buffer: Буфер, в который идёт запись
+            api_client: Клиент API
+            executor: Пул для параллельных запросов (ограничивает их число)
+            min_pause_ms: Минимальная пауза, по которой можно резать
+            min_segment_s: Минимальная длина сегмента — короткие куски хуже
+                распознаются и дают лишние запросы
+            silence_rms: Порог RMS (int16), ниже которого кадр — тишина
+            frame_ms: Длина кадра анализа
+        """
+        self.audio_buffer = audio_buffer
+        # Хранилище именно этой записи: к моменту finish() буфер может уже
+        # писать следующую
+        self.frames = audio_buffer.frames
+        self.api_client = api_client
+        self.executor = executor
+        self.silence_rms = silence_rms
+
+        frame_bytes = audio_buffer.channels * audio_buffer.sample_width
+        self._bytes_per_second = audio_buffer.sample_rate * frame_bytes
+        self._frame_len = audio_buffer.sample_rate * frame_ms // 1000 * frame_bytes
+        self._min_pause_frames = max(1, min_pause_ms // frame_ms)
+        self._min_segment_bytes = int(min_segment_s * self._bytes_per_second)
+        self._vad = VoiceActivityDetector(sample_rate=audio_buffer.sample_rate, frame_ms=frame_ms)
+
+        self._futures: List[Future] = []
+        self._thread: Optional[threading.Thread] = None
+        # Состояние анализа (только поток анализа)
+        self._segment_start = 0
+        self._voiced_frames = 0
+        self._silent_run = 0
+
+    def start(self):
+        """Запустить анализ живой записи (вызывать после start_recording)."""
+        self._thread = threading.Thread(target=self._run, name='segmenter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Поток анализа: читает живую запись и режет её на паузах."""
+        pending = bytearray()
+        offset = 0  # смещение начала pending в записи
+        for chunk in self.audio_buffer.iter_live_pcm():
+            pending += chunk
+            consumed = len(pending) // self._frame_len * self._frame_len
+            if not consumed:
+                continue
+            silent = self._vad.frame_rms(bytes(pending[:consumed])) < self.silence_rms
+            for i, is_silent in enumerate(silent.tolist()):
+                self._process_frame(is_silent, offset + (i + 1) * self._frame_len)
+            del pending[:consumed]
+            offset += consumed
+
+    def _process_frame(self, is_silent: bool, frame_end: int):
+        """Учесть очередной кадр и при необходимости отрезать сегмент."""
+        if not is_silent:
+            self._voiced_frames += 1
+            self._silent_run = 0
+            return
+
+        self._silent_run += 1
+        if self._silent_run < self._min_pause_frames:
+            return
+        if frame_end - self._segment_start < self._min_segment_bytes:
+            return
+
+        # Режем посередине паузы: хвост и начало соседних фраз не страдают
+        cut = frame_end - (self._silent_run * self._frame_len) // 2
+        cut -= cut % (self.audio_buffer.channels * self.audio_buffer.sample_width)
+        self._submit(self._segment_start, cut)
+        self._segment_start = cut
+        self._voiced_frames = 0
+        self._silent_run = 0
+
+    def _submit(self, start: int, end: Optional[int], force: bool = False):
+        """Отправить сегмент [start, end) на транскрипцию, если в нём есть речь."""
+        if not self._voiced_frames and not force:
+            logger.debug("Skipping silent segment")
+            return
+        pcm = self.frames.tobytes(start, end)
+        wav_bytes = self.audio_buffer.create_wav_bytes(pcm)
+        index = len(self._futures)
+        logger.info(f"Segment {index + 1}: {len(pcm) / self._bytes_per_second:.1f}s submitted")
+        transcribe = self.api_client.transcribe_with_retry
+        if self.api_client.tracer is not None:
+            # Отметки запроса — в трассу этой фразы, а не той, что идёт сейчас
+            transcribe = self.api_client.tracer.wrap(transcribe)
+        self._futures.append(self.executor.submit(transcribe, wav_bytes))
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Дождаться конца записи, отправить последний сегмент и склеить тексты.
+
+        Вызывать после AudioBuffer.stop_recording().
+
+        Returns:
+            Результат в формате ParakeetClient.transcribe(); success — только
+            если все сегменты распознаны
+        """
+        if self._thread:
+            self._thread.join()
+        # Хвост после последнего разреза. Если сегментов не было вовсе,
+        # отправляем запись целиком — решение о ней за вызывающим кодом
+        start = self._segment_start if self._futures else 0
+        if len(self.frames) > start:
+            self._submit(start, None, force=not self._futures)
+
+        texts = []
+        duration = 0.0
+        error = None
+        for i, future in enumerate(self._futures):
+            result = future.result()
+            if result["success"]:
+                if result["text"].strip():
+                    texts.append(result["text"].strip())
+                duration += result.get("duration") or 0.0
+            elif error is None:
+                error = f"Segment {i + 1}: {result.get('error')}"
+
+        return {
+            "text": " ".join(texts),
+            "duration": duration,
+            "success": error is None,
+            "error": error,
+            "segments": len(self._futures)
+        }
+
+    def cancel(self):
+        """Отменить ещё не начатые запросы (запись отброшена)."""
+        if self._thread:
+            self._thread.join()
+        for future in self._futures:
+            future.cancel()
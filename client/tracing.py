@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Трассировка этапов одной фразы (utterance).
+
+Каждая запись демона получает UtteranceTrace с отметками времени этапов:
+от триггера до звука окончания. По ним видно, где теряется время —
+микрофон, сеть, сервер или вывод текста. Завершённые трассы хранятся
+в ограниченной истории в памяти.
+
+Отметки ставятся из разных потоков (сегменты, потоковая загрузка,
+хеджирование), поэтому трасса потокобезопасна, а запоздавшие отметки
+уже завершённой трассы игнорируются. Пока одна фраза распознаётся в фоне,
+может начаться следующая: фоновый поток привязывает свою трассу через
+bind()/wrap(), и его отметки не попадают в текущую.
+"""
+
+import contextlib
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger('Tracing')
+
+# Этапы в порядке прохождения
+STAGES = (
+    'trigger',            # триггер старта получен
+    'stream_opened',      # входной поток открыт (или включена запись hot mic)
+    'first_frame',        # первый буфер аудио записан
+    'stop',               # триггер остановки получен
+    'wav_encoded',        # итоговый WAV готов (после VAD)
+    'request_sent',       # первый запрос к API отправлен
+    'upload_done',        # тело первого запроса передано целиком
+    'response_received',  # последний ответ API получен
+    'text_output',        # текст выведен
+    'end_beep',           # звук окончания запущен
+)
+
+# Для этих этапов важна последняя отметка: ответов несколько при сегментах
+# и повторах, WAV пересобирается после обрезки тишины
+_LAST_WINS = frozenset({'wav_encoded', 'response_received'})
+
+DEFAULT_HISTORY = 100
+
+
+class UtteranceTrace:
+    """Отметки времени этапов одной фразы (time.perf_counter)."""
+
+    def __init__(self, utterance_id: int):
+        self.id = utterance_id
+        self.started_at = time.time()
+        self.marks: Dict[str, float] = {}
+        self.meta: Dict[str, Any] = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Отметить этап (at — момент по time.perf_counter, по умолчанию сейчас)."""
+        at = time.perf_counter() if at is None else at
+        with self._lock:
+            if self.finished:
+                return
+            if stage in _LAST_WINS or stage not in self.marks:
+                self.marks[stage] = at
+
+    def durations(self) -> Dict[str, float]:
+        """
+        Длительность каждого этапа от предыдущего отмеченного, мс.
+
+        При потоковой и сегментированной загрузке запрос уходит до остановки,
+        тогда длительность request_sent отрицательна.
+        """
+        with self._lock:
+            marks = dict(self.marks)
+        durations = {}
+        previous = None
+        for stage in STAGES:
+            if stage not in marks:
+                continue
+            if previous is not None:
+                durations[stage] = round((marks[stage] - marks[previous]) * 1000, 3)
+            previous = stage
+        return durations
+
+    def offsets(self) -> Dict[str, float]:
+        """Время каждого этапа от триггера, мс."""
+        with self._lock:
+            marks = dict(self.marks)
+        origin = marks.get('trigger', min(marks.values(), default=0.0))
+        return {
+            stage: round((marks[stage] - origin) * 1000, 3)
+            for stage in STAGES if stage in marks
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'started_at': self.started_at,
+            'offsets_ms': self.offsets(),
+            'stages_ms': self.durations(),
+            **self.meta,
+        }
+
+
+class Tracer:
+    """Текущая трасса и история завершённых."""
+
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        self._history: deque = deque(maxlen=max(1, history))
+        self._lock = threading.Lock()
+        self._current: Optional[UtteranceTrace] = None
+        self._local = threading.local()
+        self._next_id = 1
+
+    @property
+    def current(self) -> Optional[UtteranceTrace]:
+        """Трасса, привязанная к потоку, иначе — идущая запись."""
+        bound = getattr(self._local, 'trace', None)
+        return bound if bound is not None else self._current
+
+    @contextlib.contextmanager
+    def bind(self, trace: Optional[UtteranceTrace]) -> Iterator[None]:
+        """Отметки из этого потока внутри блока — в trace."""
+        previous = getattr(self._local, 'trace', None)
+        self._local.trace = trace
+        try:
+            yield
+        finally:
+            self._local.trace = previous
+
+    def wrap(self, fn: Callable) -> Callable:
+        """fn, который выполнится с привязкой к трассе, текущей в момент вызова wrap."""
+        trace = self.current
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with self.bind(trace):
+                return fn(*args, **kwargs)
+        return run
+
+    def begin(self, at: Optional[float] = None) -> UtteranceTrace:
+        """Начать новую трассу с отметкой trigger."""
+        with self._lock:
+            trace = UtteranceTrace(self._next_id)
+            self._next_id += 1
+            self._current = trace
+        trace.mark('trigger', at)
+        return trace
+
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Отметить этап текущей трассы (если она есть)."""
+        trace = self.current
+        if trace is not None:
+            trace.mark(stage, at)
+
+    def annotate(self, **meta):
+        """Добавить сведения к текущей трассе (длина аудио, результат и т.п.)."""
+        trace = self.current
+        if trace is not None:
+            trace.meta.update(meta)
+
+    def detach(self) -> Optional[UtteranceTrace]:
+        """
+        Снять трассу с идущей записи, не завершая её: фраза дорабатывает
+        в фоне, а следующая запись начнёт свою трассу.
+        """
+        with self._lock:
+            trace, self._current = self._current, None
+        return trace
+
+    def finish(self, trace: Optional[UtteranceTrace] = None) -> Optional[UtteranceTrace]:
+        """Завершить трассу (по умолчанию текущую) и сохранить её в истории."""
+        with self._lock:
+            if trace is None:
+                trace = self._current
+            if trace is self._current:
+                self._current = None
+        if trace is None:
+            return None
+        with trace._lock:
+            trace.finished = True
+        self._history.append(trace)
+        durations = trace.durations()
+        if durations:
+            logger.info(
+                f"Utterance {trace.id} stages: "
+                + ", ".join(f"{stage} {ms:+.0f} ms" for stage, ms in durations.items())
+            )
+        return trace
+
+    def discard(self):
+        """Отбросить текущую трассу (запись не началась)."""
+        with self._lock:
+            self._current = None
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Завершённые трассы, от старых к новым."""
+        traces = list(self._history)
+        if limit is not None:
+            traces = traces[-limit:]
+        return [trace.to_dict() for trace in traces]
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        """Последняя завершённая трасса."""
+        return self._history[-1].to_dict() if self._history else None
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Кэш результатов транскрипции.
+
+Одинаковое аудио распознаётся повторно чаще, чем кажется: прогоны тестов,
+повторная отправка после сбоя вывода, повторы бенчмарков. Ключ кэша —
+SHA-256 от PCM (вместе с частотой и числом каналов) и имени модели, так что
+результат не зависит от кодека загрузки и заголовка WAV.
+
+Два уровня:
+- в памяти — LRU на max_entries записей;
+- на диске (опционально) — JSON-файлы в ~/.cache/micpy/transcripts,
+  суммарный размер ограничен max_disk_bytes, вытесняются давно не
+  использованные (по mtime, который обновляется при попадании).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from client.audio_codecs import wav_to_pcm
+
+logger = logging.getLogger('TranscriptionCache')
+
+CACHE_MODES = ('off', 'memory', 'disk')
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'micpy' / 'transcripts'
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_MB = 50
+
+
+def cache_key(audio_bytes: bytes, model: str) -> Optional[str]:
+    """
+    Ключ кэша для WAV.
+
+    Returns:
+        Hex SHA-256 или None, если это не 16-bit PCM WAV (не кэшируем)
+    """
+    try:
+        pcm, sample_rate, channels = wav_to_pcm(audio_bytes)
+    except Exception:
+        return None
+    digest = hashlib.sha256(f"{model}\0{sample_rate}\0{channels}\0".encode())
+    digest.update(pcm)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Двухуровневый кэш успешных результатов транскрипции.
+
+    Потокобезопасен: сегменты распознаются параллельно.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        cache_dir: Optional[Path] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_MB * 1024 * 1024
+    ):
+        """
+        Args:
+            max_entries: Размер LRU в памяти
+            cache_dir: Каталог дискового уровня (None — только память)
+            max_disk_bytes: Предельный размер дискового уровня
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._disk_bytes = 0
+
+        if cache_dir is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                self._disk_bytes = sum(f.stat().st_size for f in cache_dir.glob('*.json'))
+            except OSError as e:
+                logger.warning(f"Disk cache disabled: {e}")
+                self.cache_dir = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Результат по ключу или None; попадание на диске поднимается в память."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return dict(result, cached="memory")
+
+            result = self._disk_get(key)
+            if result is not None:
+                self._memory_put(key, result)
+                self._stats["disk_hits"] += 1
+                return dict(result, cached="disk")
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Сохранить успешный результат (неуспешные не кэшируются)."""
+        if not result.get("success"):
+            return
+        entry = {
+            "text": result.get("text", ""),
+            "duration": result.get("duration", 0.0),
+            "success": True,
+            "error": None,
+        }
+        with self._lock:
+            self._memory_put(key, entry)
+            self._disk_put(key, entry)
+            self._stats["stores"] += 1
+
+    def clear(self):
+        """Очистить оба уровня."""
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir is not None:
+                for path in self.cache_dir.glob('*.json'):
+                    path.unlink(missing_ok=True)
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий, промахов и вытеснений, hit_rate, размеры уровней."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def _memory_put(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f"{key}.json"
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+            # mtime — время последнего использования для вытеснения
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Disk cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key: str, entry: Dict[str, Any]):
+        if self.cache_dir is None:
+            return
+        path = self.cache_dir / f"{key}.json"
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Disk cache write failed: {e}")
+            return
+        self._disk_bytes += len(data) - old_size
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Удалять давно не использованные файлы, пока размер не станет ≤ 90% лимита."""
+        try:
+            files = sorted(
+                ((f.stat().st_mtime, f.stat().st_size, f) for f in self.cache_dir.glob('*.json')),
+                key=lambda item: item[0]
+            )
+        except OSError:
+            return
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in files:
+            if self._disk_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+
+
+def cache_from_env(mode: Optional[str] = None) -> Optional[TranscriptionCache]:
+    """
+    Кэш по настройкам: mode или MICPY_CACHE (off/memory/disk),
+    MICPY_CACHE_MAX_MB — предел дискового уровня.
+
+    Returns:
+        TranscriptionCache или None, если кэш выключен
+    """
+    if mode is None:
+        mode = os.environ.get('MICPY_CACHE', '').strip().lower() or 'off'
+    if mode not in CACHE_MODES:
+        logger.warning(f"Unknown cache mode '{mode}', cache disabled")
+        return None
+    if mode == 'off':
+        return None
+    if mode == 'memory':
+        return TranscriptionCache()
+
+    try:
+        max_mb = float(os.environ.get('MICPY_CACHE_MAX_MB', DEFAULT_MAX_DISK_MB))
+    except ValueError:
+        max_mb = DEFAULT_MAX_DISK_MB
+    return TranscriptionCache(
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_disk_bytes=int(max_mb * 1024 * 1024)
+    )
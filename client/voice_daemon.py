@@ -9,30 +9,75 @@
   1. Запустите демон: mic-stream daemon --socket
   2. Привяжите команду к хоткею в DE: mic-stream trigger
   3. GNOME: Settings → Keyboard → Custom Shortcuts
+
+Протокол сокета: запрос — одна строка JSON ({"command": "status"}), ответ —
+одна строка JSON с полем ok и состоянием демона. Команды: start, stop,
+toggle, cancel, status, stats, last. Любые данные не в JSON (исторически
+b'trigger') означают toggle без ответа. Клиентская сторона — в control.
 """
 
+import functools
+import json
 import logging
 import os
-import shutil
+import queue
+import selectors
 import signal
 import socket
-import subprocess
 import sys
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Any, Callable, Dict, Optional, Literal, Tuple
 
 from client.audio_buffer import (
     AudioBuffer,
+    PCMStore,
+    VoiceActivityDetector,
     play_sound,
-    start_keepalive,
-    stop_keepalive,
+    start_playback,
+    stop_playback,
+)
+from client.audio_codecs import CODEC_CHOICES
+# Клиент протокола живёт в control; send_command/send_trigger доступны и отсюда
+from client.control import (  # noqa: F401
+    COMMANDS,
+    DEFAULT_SOCKET_PATH,
+    send_command,
+    send_trigger,
 )
+from client.metrics import DaemonMetrics, MetricsServer, metrics_address_from_env
+from client.clipboard import ensure_wayland_env
+from client.output_backends import OUTPUT_MODES, TextOutput, create_backends
+from client.tracing import DEFAULT_HISTORY, Tracer, UtteranceTrace
+from client.transcription_cache import CACHE_MODES, cache_from_env
 from client.parakeet_client import ParakeetClient
+from client.segmenter import SegmentedTranscriber
+
+# Тип режима вывода (цепочки бэкендов — в output_backends)
+OutputMode = Literal['auto', 'injection', 'clipboard', 'stdout', 'file']
+
+# Режим загрузки аудио: batch — целиком после остановки,
+# stream — потоково во время записи, segmented — по сегментам между паузами
+UploadMode = Literal['batch', 'stream', 'segmented']
+UPLOAD_MODES = ('batch', 'stream', 'segmented')
+
+# Сколько запросов к API может идти параллельно (сегменты длинной диктовки)
+UPLOAD_WORKERS = 3
+
+# Сколько остановленных фраз может распознаваться одновременно: следующая
+# запись начинается, не дожидаясь ответа по предыдущей
+TRANSCRIBE_WORKERS = 2
 
-# Тип режима вывода
-OutputMode = Literal['auto', 'injection', 'clipboard']
+# Команды, которые открывают или останавливают входной поток (холодный
+# старт, слив hot mic — сотни мс): выполняются в потоке управления, чтобы
+# цикл событий тем временем отвечал другим клиентам и экспортёру метрик
+RECORDING_COMMANDS = frozenset({'toggle', 'start', 'stop', 'cancel'})
+
+# Сколько при завершении ждать вывода уже остановленных фраз, с
+SHUTDOWN_TIMEOUT = 10.0
 
 # Настройка логирования
 logging.basicConfig(
@@ -44,8 +89,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger('VoiceDaemon')
 
-# Путь к сокету по умолчанию
-DEFAULT_SOCKET_PATH = Path.home() / '.cache' / 'voice-input.sock'
+# Предел размера запроса, число одновременно открытых соединений
+# управления и время на отправку ответа
+MAX_REQUEST_BYTES = 64 * 1024
+MAX_CLIENTS = 16
+REQUEST_TIMEOUT = 2.0
+
+
+class _Utterance:
+    """Фраза в конвейере: задача распознавания и итог после вывода."""
+
+    def __init__(self, trace: Optional[UtteranceTrace], transcription: Future):
+        self.trace = trace
+        self.transcription = transcription
+        # {"result": ..., "trace": ...} — выставляет поток вывода
+        self.done: Future = Future()
+
+
+def _env_flag(name: str) -> bool:
+    """Булев флаг из окружения (1/true/yes/on)."""
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name: str, default: int = 0) -> int:
+    """Неотрицательное целое из окружения."""
+    try:
+        value = int(os.environ.get(name, '').strip())
+    except ValueError:
+        return default
+    return value if value >= 0 else default
 
 
 class VoiceInputDaemon:
@@ -61,7 +133,17 @@ class VoiceInputDaemon:
         api_url: str = "http://localhost:5092/v1",
         model: str = "parakeet-tdt-0.6b-v3",
         socket_path: Optional[Path] = None,
-        output_mode: OutputMode = 'auto'
+        output_mode: OutputMode = 'auto',
+        hot_mic: Optional[bool] = None,
+        preroll_ms: Optional[int] = None,
+        upload_mode: Optional[UploadMode] = None,
+        vad: Optional[bool] = None,
+        max_pause_ms: Optional[int] = None,
+        codec: Optional[str] = None,
+        hedge: Optional[bool] = None,
+        cache: Optional[str] = None,
+        metrics: Optional[str] = None,
+        output_file: Optional[Path] = None
     ):
         """
         Инициализация демона.
@@ -70,46 +152,136 @@ class VoiceInputDaemon:
             api_url: URL Parakeet API
             model: Модель для транскрипции
             socket_path: Путь к Unix сокету
-            output_mode: Режим вывода текста (auto/injection/clipboard)
+            output_mode: Режим вывода текста (auto/injection/clipboard/stdout/file)
+            hot_mic: Держать входной поток открытым всё время работы демона.
+                None — взять из MICPY_HOT_MIC
+            preroll_ms: Сколько мс звука до нажатия хоткея добавлять в начало
+                записи (включает hot mic). None — взять из MICPY_PREROLL_MS
+            upload_mode: batch/stream/segmented. None — взять из MICPY_UPLOAD_MODE
+            vad: Обрезать тишину перед отправкой (batch) и не вызывать API,
+                если речи нет. None — MICPY_VAD (по умолчанию включено)
+            max_pause_ms: Сжимать внутренние паузы до этой длины (0 — не
+                сжимать). None — MICPY_VAD_MAX_PAUSE_MS
+            codec: Формат загрузки wav/mulaw/flac/opus/auto. None — MICPY_CODEC
+            hedge: Дублировать запрос, не ответивший за перцентиль обычной
+                задержки. None — MICPY_HEDGE
+            cache: Кэш результатов off/memory/disk. None — MICPY_CACHE
+            metrics: Адрес экспортёра метрик Prometheus: порт, host:port или
+                путь к Unix сокету. None — MICPY_METRICS (по умолчанию выключен)
+            output_file: Файл для режима вывода file. None — MICPY_OUTPUT_FILE
         """
+        if output_mode == 'stdout':
+            # stdout занят текстом — логи демона в stderr
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                    handler.setStream(sys.stderr)
         self.api_url = api_url
         self.model = model
-        self.socket_path = socket_path or DEFAULT_SOCKET_PATH
+        self.socket_path = Path(socket_path or DEFAULT_SOCKET_PATH)
         self.output_mode = output_mode
-
-        self.audio_buffer = AudioBuffer(sample_rate=16000, channels=1)
-        self.api_client = ParakeetClient(api_url=api_url, model=model)
+        if hot_mic is None:
+            hot_mic = _env_flag('MICPY_HOT_MIC')
+        if preroll_ms is None:
+            preroll_ms = _env_int('MICPY_PREROLL_MS')
+        if upload_mode is None:
+            upload_mode = os.environ.get('MICPY_UPLOAD_MODE', '').strip().lower() or 'batch'
+        if upload_mode not in UPLOAD_MODES:
+            logger.warning(f"Unknown upload mode '{upload_mode}', using batch")
+            upload_mode = 'batch'
+        self.upload_mode = upload_mode
+        if vad is None:
+            vad = os.environ.get('MICPY_VAD', '1').strip().lower()
+            vad = vad not in ('0', 'false', 'no', 'off')
+        self.vad = VoiceActivityDetector(sample_rate=16000) if vad else None
+        if max_pause_ms is None:
+            max_pause_ms = _env_int('MICPY_VAD_MAX_PAUSE_MS')
+        self.max_pause_ms = max_pause_ms
+
+        self.audio_buffer = AudioBuffer(
+            sample_rate=16000,
+            channels=1,
+            hot_mic=hot_mic,
+            preroll_ms=preroll_ms
+        )
+        self.hot_mic = self.audio_buffer.hot_mic
+        self.api_client = ParakeetClient(
+            api_url=api_url,
+            model=model,
+            codec=codec,
+            hedge=hedge,
+            cache=cache_from_env(cache)
+        )
+        # Отметки этапов каждой фразы; MICPY_TRACE_HISTORY — сколько хранить
+        self.tracer = Tracer(history=_env_int('MICPY_TRACE_HISTORY', DEFAULT_HISTORY))
+        self.api_client.tracer = self.tracer
+        # Счётчики и гистограммы собираются всегда (это дёшево), экспортёр —
+        # только если задан адрес
+        self.metrics = DaemonMetrics(is_recording=lambda: self.is_recording)
+        self.api_client.metrics = self.metrics
+        self.metrics_address = metrics_address_from_env(metrics)
+        self._metrics_server: Optional[MetricsServer] = None
         self.is_recording = False
+        self._started_at = time.time()
+        self._recording_started: Optional[float] = None
+        # Результат последней фразы для команды last
+        self._last_result: Optional[Dict[str, Any]] = None
         self._lock = threading.Lock()
         self._running = False
         self._socket: Optional[socket.socket] = None
-        self._recording_thread: Optional[threading.Thread] = None
-
-        # Проверяем доступность инструментов при инициализации
-        self._wtype_available = shutil.which('wtype') is not None
-        self._wl_copy_available = shutil.which('wl-copy') is not None
-        self._ensure_wayland_env()
+        # Цикл событий (_run_socket_mode)
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup_w: Optional[socket.socket] = None
+        self._clients: Dict[socket.socket, bytearray] = {}
+        self._calls: deque = deque()
+
+        # Потоковая и сегментированная загрузка: запросы идут в фоне,
+        # пока пользователь говорит
+        self._upload_executor = ThreadPoolExecutor(
+            max_workers=UPLOAD_WORKERS,
+            thread_name_prefix='upload'
+        )
+        self._live_upload: Optional[Future] = None
+        self._segmenter: Optional[SegmentedTranscriber] = None
+
+        # Конвейер: остановка только ставит фразу в очередь, распознавание
+        # идёт в пуле, вывод — в одном потоке строго в порядке записи
+        self._transcribe_executor = ThreadPoolExecutor(
+            max_workers=TRANSCRIBE_WORKERS,
+            thread_name_prefix='transcribe'
+        )
+        self._output_queue: "queue.Queue[Optional[_Utterance]]" = queue.Queue()
+        # Один поток: команды записи выполняются строго в порядке поступления
+        self._control_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='control'
+        )
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.metrics.gauge('micpy_pending_utterances',
+                           'Stopped utterances not yet output', lambda: self._pending)
+        self._output_thread = threading.Thread(
+            target=self._output_loop, name='output', daemon=True
+        )
+        self._output_thread.start()
+
+        # Бэкенды вывода: доступность инструментов проверяется один раз
+        if output_file is None and os.environ.get('MICPY_OUTPUT_FILE', '').strip():
+            output_file = Path(os.environ['MICPY_OUTPUT_FILE'].strip())
+        self.output = TextOutput(create_backends(output_mode, output_file), self.metrics)
+        ensure_wayland_env()
 
         logger.info("VoiceInputDaemon initialized")
         logger.info(f"  API: {api_url}")
         logger.info(f"  Model: {model}")
         logger.info(f"  Socket: {self.socket_path}")
         logger.info(f"  Output mode: {output_mode}")
-        if self._wtype_available:
-            logger.info("  wtype: available")
-        else:
-            logger.info("  wtype: not found (will use clipboard fallback)")
-
-    def _ensure_wayland_env(self):
-        """Убедиться, что WAYLAND_DISPLAY установлена для работы wl-copy."""
-        if os.environ.get('WAYLAND_DISPLAY'):
-            return
-        uid = os.getuid()
-        for name in ('wayland-0', 'wayland-1'):
-            if Path(f'/run/user/{uid}/{name}').exists():
-                os.environ['WAYLAND_DISPLAY'] = name
-                logger.info(f"Auto-detected WAYLAND_DISPLAY={name}")
-                return
+        logger.info(f"  Upload mode: {self.upload_mode}")
+        pause = f", max pause {self.max_pause_ms} ms" if self.vad and self.max_pause_ms else ""
+        logger.info(f"  VAD: {'on' if self.vad else 'off'}{pause}")
+        logger.info(f"  Hot mic: {'on' if self.hot_mic else 'off'}")
+        if self.audio_buffer.preroll_ms:
+            logger.info(f"  Pre-roll: {self.audio_buffer.preroll_ms} ms")
+        logger.info(f"  Output backends: {' -> '.join(self.output.names) or 'none available'}")
 
     def _check_dependencies(self) -> bool:
         """Проверка системных зависимостей."""
@@ -119,7 +291,7 @@ class VoiceInputDaemon:
 
     def _output_text(self, text: str) -> bool:
         """
-        Вывести текст в активное окно или буфер обмена.
+        Вывести текст цепочкой бэкендов режима вывода (в потоке вывода).
 
         Args:
             text: Текст для вывода
@@ -127,150 +299,510 @@ class VoiceInputDaemon:
         Returns:
             True если успешно
         """
-        # Если режим только clipboard - сразу копируем
-        if self.output_mode == 'clipboard':
-            return self._copy_to_clipboard(text)
+        return self.output.write(text) is not None
 
-        # Пробуем wtype (Wayland injection)
-        if self.output_mode in ('auto', 'injection') and self._wtype_available:
-            try:
-                result = subprocess.run(
-                    ['wtype', '--', text],
-                    capture_output=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    logger.info("Text inserted via wtype")
-                    return True
-                stderr = result.stderr.decode().strip()
-                if stderr:
-                    logger.warning(f"wtype failed: {stderr}")
-                else:
-                    logger.warning("wtype failed with non-zero exit code")
-            except subprocess.TimeoutExpired:
-                logger.warning("wtype timeout")
-            except Exception as e:
-                logger.warning(f"wtype error: {e}")
+    def toggle_recording(self, wait: bool = False) -> Dict[str, Any]:
+        """
+        Переключение состояния записи.
 
-        # Fallback: clipboard
-        if self.output_mode == 'auto':
-            logger.info("Falling back to clipboard mode")
-            return self._copy_to_clipboard(text)
+        Args:
+            wait: При остановке дождаться распознавания и вывода этой фразы
+                (иначе она дорабатывает в фоне)
+        """
+        reply, utterance = self._toggle()
+        return self._await_utterance(reply, utterance, wait)
 
-        return False
+    def _toggle(self) -> Tuple[Dict[str, Any], Optional['_Utterance']]:
+        # Момент триггера — до блокировки: ожидание на ней тоже задержка
+        received = time.perf_counter()
+        with self._lock:
+            if not self.is_recording:
+                return self._begin_recording(received), None
+            return self._end_recording(received)
 
-    def _copy_to_clipboard(self, text: str) -> bool:
-        """Копировать текст в буфер обмена."""
-        # Сначала пробуем pyperclip
-        try:
-            import pyperclip
-            pyperclip.copy(text)
-            logger.info("Text copied to clipboard - press Ctrl+V to paste")
-            return True
-        except Exception as e:
-            logger.warning(f"pyperclip failed: {e}")
+    def start(self) -> Dict[str, Any]:
+        """Начать запись (ошибка, если она уже идёт)."""
+        received = time.perf_counter()
+        with self._lock:
+            if self.is_recording:
+                return {"ok": False, "error": "Already recording"}
+            return self._begin_recording(received)
 
-        # Fallback: wl-copy напрямую
-        if self._wl_copy_available:
-            try:
-                self._ensure_wayland_env()
-                result = subprocess.run(
-                    ['wl-copy', text],
-                    capture_output=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    logger.info("Text copied to clipboard via wl-copy - press Ctrl+V to paste")
-                    return True
-                logger.error(f"wl-copy failed: {result.stderr.decode().strip()}")
-            except Exception as e:
-                logger.error(f"wl-copy error: {e}")
+    def stop(self, wait: bool = False) -> Dict[str, Any]:
+        """Остановить запись и поставить фразу на распознавание (ошибка, если записи нет)."""
+        reply, utterance = self._stop()
+        return self._await_utterance(reply, utterance, wait)
 
-        logger.error("No clipboard mechanism available")
-        return False
+    def _stop(self) -> Tuple[Dict[str, Any], Optional['_Utterance']]:
+        received = time.perf_counter()
+        with self._lock:
+            if not self.is_recording:
+                return {"ok": False, "error": "Not recording"}, None
+            return self._end_recording(received)
 
-    def toggle_recording(self):
-        """Переключение состояния записи."""
+    def cancel(self) -> Dict[str, Any]:
+        """Прервать запись без транскрипции и вывода."""
         with self._lock:
             if not self.is_recording:
-                self._start_recording()
-            else:
-                self._stop_and_transcribe()
+                return {"ok": False, "error": "Not recording"}
+            logger.info("Cancelling recording...")
+            self.is_recording = False
+            self._recording_started = None
+            self.api_client.cancel_prewarm()
+            # Потоковый запрос закончится вместе с записью, его результат не нужен
+            self._live_upload = None
+            segmenter, self._segmenter = self._segmenter, None
+            # Сначала остановить запись: поток сегментатора ждёт в
+            # iter_live_pcm() и завершится только с её концом
+            self.audio_buffer.stop_recording()
+            if segmenter is not None:
+                segmenter.cancel()
+            duration = self.audio_buffer.get_duration()
+            self.audio_buffer.clear()
+            self.tracer.discard()
+            self.metrics.skipped.inc(reason='cancelled')
+            logger.info(f"Recording cancelled, {duration:.1f}s discarded")
+            return {"ok": True, "action": "cancelled", "audio_seconds": round(duration, 3)}
+
+    def _begin_recording(self, received: float) -> Dict[str, Any]:
+        self.tracer.begin(received)
+        self._start_recording()
+        if not self.is_recording:
+            self.tracer.discard()
+            return {"ok": False, "error": "Failed to start recording"}
+        self._recording_started = time.monotonic()
+        return {"ok": True, "action": "started"}
+
+    def _end_recording(self, received: float) -> Tuple[Dict[str, Any], '_Utterance']:
+        """
+        Остановить запись и поставить фразу в конвейер.
 
-    def _recording_loop(self):
-        """Цикл записи аудио (выполняется в отдельном потоке)."""
-        while self.is_recording:
-            self.audio_buffer.read_chunk()
-            time.sleep(0.01)  # 10ms — предотвращает 100% CPU, PyAudio сам блокирует до данных
+        Под блокировкой остаётся только остановка потока и снимок аудио —
+        распознавание и вывод идут в фоне, следующую запись можно начинать сразу.
+        """
+        self.tracer.mark('stop', received)
+        self._recording_started = None
+        job = self.tracer.wrap(self._stop_recording())
+        trace = self.tracer.detach()
+        utterance = _Utterance(trace, self._transcribe_executor.submit(job))
+        with self._pending_lock:
+            self._pending += 1
+        self._output_queue.put(utterance)
+        reply = {"ok": True, "action": "stopped", "utterance": trace.id if trace else None}
+        return reply, utterance
+
+    def _await_utterance(
+        self,
+        reply: Dict[str, Any],
+        utterance: Optional['_Utterance'],
+        wait: bool
+    ) -> Dict[str, Any]:
+        """Дополнить ответ итогом фразы (result, trace), если нужно его дождаться."""
+        if wait and utterance is not None:
+            reply.update(utterance.done.result())
+        return reply
+
+    def _observe_trace(self, trace):
+        """Время от остановки до вывода текста — в гистограмму метрик."""
+        if trace is None:
+            return
+        offsets = trace.offsets()
+        if 'stop' in offsets and 'text_output' in offsets:
+            self.metrics.stop_to_text.observe((offsets['text_output'] - offsets['stop']) / 1000)
 
     def _start_recording(self):
         """Начало записи."""
         logger.info("Starting recording...")
 
-        # Звук ДО инициализации PyAudio — избегаем гонки PipeWire-соединений
+        # Звук ДО инициализации PyAudio — избегаем гонки PipeWire-соединений.
+        # В режиме hot mic поток уже открыт, гонки нет
         play_sound('start')
 
-        # Начать запись аудио
+        # Начать запись аудио: буфер заполняется из callback PortAudio,
+        # отдельный поток чтения не нужен
         if not self.audio_buffer.start_recording():
             logger.error("Failed to start recording")
             return
 
+        self.tracer.mark('stream_opened')
         self.is_recording = True
 
-        # Запустить поток записи
-        self._recording_thread = threading.Thread(target=self._recording_loop, daemon=True)
-        self._recording_thread.start()
+        # Пока пользователь говорит, держим прогретое соединение с API
+        self.api_client.prewarm()
+
+        if self.upload_mode == 'stream':
+            # Тело запроса читается из живой записи и закончится вместе с ней
+            self._live_upload = self._upload_executor.submit(
+                self.api_client.transcribe_stream,
+                self.audio_buffer.iter_live_wav()
+            )
+        elif self.upload_mode == 'segmented':
+            self._segmenter = SegmentedTranscriber(
+                self.audio_buffer,
+                self.api_client,
+                self._upload_executor
+            )
+            self._segmenter.start()
 
         logger.info("Recording started - speak now")
 
-    def _stop_and_transcribe(self):
-        """Остановка записи и транскрипция."""
+    def _stop_recording(self) -> Callable[[], Dict[str, Any]]:
+        """
+        Остановка записи (быстрая часть, под блокировкой демона).
+
+        Returns:
+            Задача распознавания этой записи для пула: возвращает итог фразы —
+            success, text, error, audio_seconds; skipped — почему запрос к API
+            не делался (too_short/no_speech)
+        """
         logger.info("Stopping recording...")
 
-        # Сначала останавливаем запись (это остановит поток)
         self.is_recording = False
+        self.api_client.cancel_prewarm()
+        live_upload, self._live_upload = self._live_upload, None
+        segmenter, self._segmenter = self._segmenter, None
 
-        # Ждем завершения потока записи
-        if self._recording_thread and self._recording_thread.is_alive():
-            self._recording_thread.join(timeout=1.0)
-
-        # Получаем записанные данные
+        # Получаем записанные данные (это же завершает потоковую загрузку)
         wav_bytes = self.audio_buffer.stop_recording()
+        self.tracer.mark('wav_encoded')
+        # Хранилище этой записи: следующая запись начнёт новое
+        frames = self.audio_buffer.frames
         duration = self.audio_buffer.get_duration()
+        if self.audio_buffer.first_sample_at is not None:
+            self.tracer.mark('first_frame', self.audio_buffer.first_sample_at)
+        self.tracer.annotate(audio_seconds=round(duration, 3), upload_mode=self.upload_mode)
         logger.info(f"Recording stopped, duration: {duration:.1f}s")
-
-        # Проверить длительность
+        self.metrics.recordings.inc()
+        self.metrics.audio_seconds.inc(duration)
+        self.metrics.audio_length.observe(duration)
+        if self.audio_buffer.overflow_count:
+            logger.warning(f"Input overflow reported {self.audio_buffer.overflow_count} time(s)")
+            self.metrics.dropped_frames.inc(self.audio_buffer.overflow_count)
+
+        # Проверить длительность (потоковый запрос, если был, просто
+        # доработает в фоне, его результат не нужен)
         if duration < 0.5:
             logger.warning("Recording too short, skipping transcription")
-            self.audio_buffer.clear()
-            return
+            self.metrics.skipped.inc(reason='too_short')
+            if segmenter is not None:
+                segmenter.cancel()
+            frames.clear()
+            skipped = {"success": False, "text": "", "error": None, "skipped": "too_short",
+                       "audio_seconds": round(duration, 3)}
+            return lambda: skipped
+
+        return functools.partial(
+            self._transcribe, wav_bytes, frames, duration, live_upload, segmenter
+        )
+
+    def _transcribe(
+        self,
+        wav_bytes: bytes,
+        frames: PCMStore,
+        duration: float,
+        live_upload: Optional[Future],
+        segmenter: Optional[SegmentedTranscriber]
+    ) -> Dict[str, Any]:
+        """Распознавание остановленной записи (в пуле, параллельно со следующей)."""
+        try:
+            if segmenter is not None:
+                # Ранние сегменты уже распознаются — ждём в основном последний
+                logger.info("Waiting for segment results...")
+                result = segmenter.finish()
+            elif live_upload is not None:
+                logger.info("Waiting for streamed upload result...")
+                result = live_upload.result()
+                if not result["success"]:
+                    # Потоковый запрос не повторить — отправляем запись целиком
+                    logger.warning("Streamed upload failed, resending the whole recording")
+                    result = self.api_client.transcribe_with_retry(wav_bytes, max_retries=2)
+            else:
+                if self.vad:
+                    wav_bytes = self._trim_silence(frames, wav_bytes)
+                    if wav_bytes is None:
+                        self.metrics.skipped.inc(reason='no_speech')
+                        return {"success": False, "text": "", "error": None,
+                                "skipped": "no_speech", "audio_seconds": round(duration, 3)}
+                    self.tracer.mark('wav_encoded')
+                # Отправляем в API
+                logger.info("Sending to API...")
+                result = self.api_client.transcribe_with_retry(wav_bytes, max_retries=2)
+        finally:
+            frames.clear()
+
+        return {
+            "success": result["success"],
+            "text": result.get("text") or "",
+            "error": result.get("error"),
+            "audio_seconds": round(duration, 3),
+        }
+
+    def _output_loop(self):
+        """
+        Поток вывода: итоги фраз строго в порядке записи.
+
+        Распознавание следующей фразы может закончиться раньше — её текст
+        всё равно ждёт, пока будет выведена предыдущая.
+        """
+        while True:
+            utterance = self._output_queue.get()
+            if utterance is None:
+                return
+            try:
+                outcome = utterance.transcription.result()
+            except Exception as e:
+                logger.error(f"Transcription failed: {e}")
+                outcome = {"success": False, "text": "", "error": str(e)}
 
-        # Отправляем в API
-        logger.info("Sending to API...")
-        result = self.api_client.transcribe_with_retry(wav_bytes, max_retries=2)
+            try:
+                with self.tracer.bind(utterance.trace):
+                    self._deliver(outcome)
+            except Exception as e:
+                logger.error(f"Output failed: {e}")
+
+            reply: Dict[str, Any] = {"result": outcome}
+            if utterance.trace is not None:
+                trace = self.tracer.finish(utterance.trace)
+                self._observe_trace(trace)
+                reply["trace"] = trace.to_dict()
+            self._last_result = dict(outcome, finished_at=time.time())
+            with self._pending_lock:
+                self._pending -= 1
+            utterance.done.set_result(reply)
+
+    def _deliver(self, outcome: Dict[str, Any]):
+        """Вывести распознанный текст, звук окончания, метрики и статистику API."""
+        if outcome.get("skipped"):
+            return
 
-        if result["success"]:
-            text = result["text"]
+        self.tracer.annotate(success=outcome["success"], chars=len(outcome["text"]))
+        if outcome["success"]:
+            text = outcome["text"]
+            self.metrics.transcriptions.inc(outcome='success' if text else 'empty')
             if text:
                 logger.info(f"Transcription: {text}")
-                # Вывести текст через wtype или clipboard
-                self._output_text(text)
+                # Вывести текст бэкендами режима (wtype, буфер обмена, ...)
+                outcome["output"] = self._output_text(text)
+                self.tracer.mark('text_output')
                 # Звук ПОСЛЕ копирования в буфер
                 play_sound('end')
+                self.tracer.mark('end_beep')
             else:
                 logger.warning("Empty transcription (no speech detected)")
         else:
-            error = result.get("error", "Unknown error")
+            error = outcome.get("error") or "Unknown error"
             logger.error(f"Transcription failed: {error}")
+            self.metrics.transcriptions.inc(outcome='error')
+
+        stats = self.api_client.get_stats()
+        logger.info(
+            f"API connections: {stats['new_connections']} opened, "
+            f"{stats['reused_connections']} reused"
+        )
+        if self.api_client.hedge:
+            logger.info(
+                f"Hedging: {stats['hedged']}/{stats['hedge_requests']} requests hedged "
+                f"({stats['hedge_rate']:.0%}), {stats['hedge_wins']} won, "
+                f"{stats['hedge_skipped']} skipped (pool busy)"
+            )
+        if stats['cache']:
+            logger.info(
+                f"Cache: {stats['cache']['hit_rate']:.0%} hit rate "
+                f"({stats['cache']['memory_hits']} memory, {stats['cache']['disk_hits']} disk, "
+                f"{stats['cache']['misses']} misses)"
+            )
+        if len(stats['endpoints']) > 1:
+            for endpoint in stats['endpoints']:
+                rtf = f"{endpoint['rtf']:.3f}" if endpoint['rtf'] is not None else "n/a"
+                ejected = " (ejected)" if endpoint['ejected'] else ""
+                logger.info(
+                    f"Endpoint {endpoint['url']}: rtf {rtf}, "
+                    f"errors {endpoint['error_rate']:.0%}{ejected}"
+                )
+
+    def _trim_silence(self, frames: PCMStore, wav_bytes: bytes) -> Optional[bytes]:
+        """
+        Обрезать тишину в записи перед отправкой.
+
+        Returns:
+            WAV без тишины; None — явная тишина, API вызывать не нужно.
+            Если VAD не нашёл речи в записи громче тишины — исходный
+            wav_bytes: ошибка детектора не должна стоить пользователю фразы
+        """
+        with frames.view() as pcm:
+            trimmed, stats = self.vad.trim(pcm, max_pause_ms=self.max_pause_ms)
+
+        if not stats["speech"]:
+            if stats["silent"]:
+                logger.warning("No speech detected, skipping transcription")
+                return None
+            logger.warning("VAD found no speech, sending the recording unchanged")
+            return wav_bytes
+
+        saved = stats["original_bytes"] - stats["trimmed_bytes"]
+        logger.info(f"VAD trimmed {stats['ratio'] * 100:.0f}% ({saved / 1024:.0f} KB saved)")
+        return self.audio_buffer.create_wav_bytes(trimmed)
+
+    def status(self) -> Dict[str, Any]:
+        """Состояние демона (без блокировки — отвечает и во время транскрипции)."""
+        started = self._recording_started
+        return {
+            "state": "recording" if self.is_recording else "idle",
+            "recording_seconds": round(time.monotonic() - started, 3) if started else None,
+            "pending": self._pending,
+            "upload_mode": self.upload_mode,
+            "hot_mic": self.hot_mic,
+            "api_url": self.api_url,
+            "uptime": round(time.time() - self._started_at, 1),
+        }
+
+    def handle_command(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнить команду протокола управления.
 
-        # Очистить буфер
-        self.audio_buffer.clear()
+        Args:
+            request: {"command": "...", "id": ..., "wait": ...}; id (если есть)
+                возвращается в ответе, wait — для stop/toggle ответить после
+                распознавания и вывода фразы
+
+        Returns:
+            Ответ: ok, данные команды и состояние демона; при ошибке — error
+        """
+        reply, utterance = self._execute(request)
+        reply = self._await_utterance(reply, utterance, bool(request.get("wait")))
+        return self._complete_reply(reply, request)
+
+    def _execute(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[_Utterance]]:
+        """Выполнить команду, не дожидаясь распознавания; вернуть ответ и остановленную фразу."""
+        command = request.get("command")
+        utterance = None
+        if command == 'toggle':
+            reply, utterance = self._toggle()
+        elif command == 'start':
+            reply = self.start()
+        elif command == 'stop':
+            reply, utterance = self._stop()
+        elif command == 'cancel':
+            reply = self.cancel()
+        elif command == 'status':
+            reply = {"ok": True}
+        elif command == 'stats':
+            reply = {
+                "ok": True,
+                "stats": self.api_client.get_stats(),
+                "output": self.output.stats(),
+            }
+        elif command == 'last':
+            reply = {"ok": True, "result": self._last_result, "trace": self.tracer.last()}
+        else:
+            reply = {"ok": False, "error": f"Unknown command: {command!r}",
+                     "commands": list(COMMANDS)}
+        return reply, utterance
+
+    def _complete_reply(self, reply: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавить к ответу состояние демона и id запроса."""
+        reply.update(self.status())
+        if "id" in request:
+            reply["id"] = request["id"]
+        return reply
+
+    def _serve_request(self, conn: socket.socket, data: bytes):
+        """
+        Выполнить запрос (строку JSON или устаревший trigger) и ответить.
+
+        Команды записи (RECORDING_COMMANDS) уходят в поток управления, ответ
+        возвращается в цикл событий через call_soon. Для stop/toggle с wait
+        ответ уходит ещё позже: когда фраза выведена, его передаёт поток вывода.
+        """
+        data = data.strip()
+        if not data:
+            conn.close()
+            return
+
+        if not data.startswith(b'{'):
+            # Старый клиент: любые данные — переключение, ответа не ждёт
+            logger.info("Trigger received via socket")
+            conn.close()
+            self._control_executor.submit(self.toggle_recording).add_done_callback(
+                self._log_control_error
+            )
+            return
+
+        try:
+            request = json.loads(data.split(b'\n', 1)[0])
+            if not isinstance(request, dict):
+                raise ValueError("request must be an object")
+        except ValueError as e:
+            self._send_reply(conn, dict(self.status(), ok=False, error=f"Invalid request: {e}"))
+            return
+
+        logger.info(f"Command received via socket: {request.get('command')}")
+        if request.get("command") in RECORDING_COMMANDS:
+            self._control_executor.submit(self._respond, conn, request)
+            return
+        # Остальные команды только читают состояние — отвечаем сразу
+        reply, _ = self._execute(request)
+        self._send_reply(conn, self._complete_reply(reply, request))
+
+    def _respond(self, conn: socket.socket, request: Dict[str, Any]):
+        """Выполнить команду записи (поток управления) и передать ответ в цикл событий."""
+        try:
+            reply, utterance = self._execute(request)
+        except Exception as e:
+            logger.error(f"Command failed: {e}")
+            reply, utterance = {"ok": False, "error": str(e)}, None
+        if utterance is not None and request.get("wait"):
+            def deliver(done: Future):
+                final = self._complete_reply(dict(reply, **done.result()), request)
+                self.call_soon(self._send_reply, conn, final)
+            utterance.done.add_done_callback(deliver)
+            return
+        self.call_soon(self._send_reply, conn, self._complete_reply(reply, request))
+
+    @staticmethod
+    def _log_control_error(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Command failed: {future.exception()}")
+
+    def _send_reply(self, conn: socket.socket, reply: Dict[str, Any]):
+        """Отправить ответ строкой JSON и закрыть соединение."""
+        with conn:
+            try:
+                conn.settimeout(REQUEST_TIMEOUT)
+                data = json.dumps(reply, ensure_ascii=False, default=str).encode('utf-8')
+                conn.sendall(data + b'\n')
+            except OSError as e:
+                logger.debug(f"Reply not delivered: {e}")
 
     def _handle_shutdown(self, signum, _frame):
-        """Штатное завершение по сигналу — даёт отработать очистке."""
+        """
+        Штатное завершение по сигналу — даёт отработать очистке.
+
+        Цикл событий просыпается от байта, который интерпретатор пишет
+        в сокет signal.set_wakeup_fd.
+        """
         logger.info(f"Signal {signum} received, shutting down")
         self._running = False
 
+    def shutdown(self):
+        """Остановить цикл событий (из любого потока)."""
+        self._running = False
+        self._wake()
+
+    def call_soon(self, fn: Callable, *args):
+        """Выполнить fn(*args) в потоке цикла событий (из любого потока)."""
+        self._calls.append((fn, args))
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup_w is None:
+            return
+        try:
+            self._wakeup_w.send(b'\0')
+        except OSError:
+            # Буфер полон — цикл и так проснётся
+            pass
+
     def run(self):
         """Запуск демона."""
         logger.info("=" * 50)
@@ -290,22 +822,64 @@ class VoiceInputDaemon:
             logger.warning("Daemon will start anyway, but transcription may fail")
 
         # systemd останавливает сервис по SIGTERM. Без обработчика процесс
-        # умирает мгновенно и finally не отрабатывает — тогда keepalive
-        # остаётся висеть, а сокет не удаляется.
+        # умирает мгновенно и finally не отрабатывает — тогда сокет
+        # не удаляется, а остановленные фразы не выводятся.
         signal.signal(signal.SIGTERM, self._handle_shutdown)
 
-        # Не даём аудиовыходу заснуть (MICPY_SOUND_KEEPALIVE=1), иначе короткий
-        # бип теряется при пробуждении устройства — см. SOUND_DEBUGGING.md
-        start_keepalive()
+        # Постоянный поток для бипов: тоны синтезированы заранее, на триггере
+        # они только подмешиваются. С MICPY_SOUND_KEEPALIVE=1 поток ещё и не
+        # даёт аудиовыходу заснуть — см. SOUND_DEBUGGING.md
+        start_playback()
+
+        if self.metrics_address is not None:
+            # Соединения экспортёра принимает цикл событий демона
+            self._metrics_server = MetricsServer(self.metrics, self.metrics_address)
+            if not self._metrics_server.open():
+                self._metrics_server = None
+
+        # Hot mic: один раз инициализируем PyAudio и держим поток открытым,
+        # чтобы старт записи не ждал опроса ALSA/PipeWire
+        if self.hot_mic and not self.audio_buffer.open():
+            logger.warning("Hot mic stream failed to open, falling back to per-recording streams")
 
         self._running = True
         try:
             self._run_socket_mode()
         finally:
-            stop_keepalive()
+            self.close()
+            stop_playback()
+
+    def close(self):
+        """Остановить пулы и поток вывода, закрыть микрофон, сессию API и вывод."""
+        # Начатая команда записи доработает, очередные отбрасываются
+        self._control_executor.shutdown(wait=True, cancel_futures=True)
+        self.audio_buffer.close()
+        self._drain_pipeline()
+        self._upload_executor.shutdown(wait=False, cancel_futures=True)
+        self._transcribe_executor.shutdown(wait=False, cancel_futures=True)
+        self.api_client.close()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+        self.output.close()
+
+    def _drain_pipeline(self):
+        """Дать уже остановленным фразам вывестись (не дольше SHUTDOWN_TIMEOUT)."""
+        if self._pending:
+            logger.info(f"Waiting for {self._pending} pending utterance(s)...")
+        self._output_queue.put(None)
+        self._output_thread.join(timeout=SHUTDOWN_TIMEOUT)
+        if self._output_thread.is_alive():
+            logger.warning("Pending utterances dropped on shutdown")
 
     def _run_socket_mode(self):
-        """Запуск в режиме Unix сокета."""
+        """
+        Запуск в режиме Unix сокета.
+
+        Один цикл событий на selectors: приём соединений управления и их
+        чтение, экспортёр метрик, сигналы завершения (signal.set_wakeup_fd)
+        и отложенные ответы из потока вывода (call_soon). Без событий цикл
+        спит в select() без таймаута — ни одного пробуждения по таймеру.
+        """
         # Создаем директорию для сокета
         self.socket_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -316,8 +890,24 @@ class VoiceInputDaemon:
         # Создаем Unix сокет
         self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self._socket.bind(str(self.socket_path))
-        self._socket.listen(1)
-        self._socket.settimeout(1.0)  # Таймаут для проверки _running
+        self._socket.listen(MAX_CLIENTS)
+        self._socket.setblocking(False)
+
+        selector = selectors.DefaultSelector()
+        self._selector = selector
+        selector.register(self._socket, selectors.EVENT_READ, self._accept)
+        wakeup_r, self._wakeup_w = socket.socketpair()
+        wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        selector.register(wakeup_r, selectors.EVENT_READ, self._on_wakeup)
+        if self._metrics_server is not None:
+            selector.register(
+                self._metrics_server, selectors.EVENT_READ,
+                lambda _: self._metrics_server.handle_request()
+            )
+        previous_wakeup_fd = None
+        if threading.current_thread() is threading.main_thread():
+            previous_wakeup_fd = signal.set_wakeup_fd(self._wakeup_w.fileno())
 
         logger.info("=" * 50)
         logger.info("Voice Input Daemon is running!")
@@ -335,24 +925,72 @@ class VoiceInputDaemon:
 
         try:
             while self._running:
-                try:
-                    conn, _ = self._socket.accept()
-                    with conn:
-                        data = conn.recv(1024)
-                        if data:
-                            logger.info("Trigger received via socket")
-                            self.toggle_recording()
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self._running:
-                        logger.error(f"Socket error: {e}")
+                for key, _ in selector.select():
+                    try:
+                        key.data(key.fileobj)
+                    except Exception as e:
+                        if self._running:
+                            logger.error(f"Socket error: {e}")
         except KeyboardInterrupt:
             logger.info("\nShutting down...")
         finally:
             self._running = False
+            if previous_wakeup_fd is not None:
+                signal.set_wakeup_fd(previous_wakeup_fd)
+            for conn in list(self._clients):
+                conn.close()
+            self._clients.clear()
+            selector.close()
+            self._selector = None
+            wakeup_w, self._wakeup_w = self._wakeup_w, None
+            wakeup_w.close()
+            wakeup_r.close()
             self._cleanup_socket()
 
+    def _accept(self, server: socket.socket):
+        """Новое соединение управления: читаем его, когда придут данные."""
+        try:
+            conn, _ = server.accept()
+        except BlockingIOError:
+            return
+        if len(self._clients) >= MAX_CLIENTS:
+            # Зависшие клиенты не должны копиться — закрываем самого старого
+            oldest = next(iter(self._clients))
+            self._selector.unregister(oldest)
+            del self._clients[oldest]
+            oldest.close()
+        conn.setblocking(False)
+        self._clients[conn] = bytearray()
+        self._selector.register(conn, selectors.EVENT_READ, self._read_client)
+
+    def _read_client(self, conn: socket.socket):
+        """Дочитать запрос: до перевода строки (JSON) или закрытия (trigger)."""
+        buffer = self._clients[conn]
+        try:
+            chunk = conn.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+            buffer.clear()
+        buffer += chunk
+        if chunk and b'\n' not in buffer and len(buffer) < MAX_REQUEST_BYTES:
+            return
+        self._selector.unregister(conn)
+        del self._clients[conn]
+        self._serve_request(conn, bytes(buffer))
+
+    def _on_wakeup(self, wakeup: socket.socket):
+        """Сигнал или call_soon: вычитать сокет пробуждения и выполнить отложенное."""
+        try:
+            while wakeup.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self._calls:
+            fn, args = self._calls.popleft()
+            fn(*args)
+
     def _cleanup_socket(self):
         """Очистка сокета."""
         if self._socket:
@@ -383,44 +1021,99 @@ def main():
         default=None,
         help=f'Unix socket path (default: {DEFAULT_SOCKET_PATH})'
     )
+    parser.add_argument(
+        '--hot-mic',
+        action='store_true',
+        default=None,
+        help='Keep the microphone stream open between recordings (env: MICPY_HOT_MIC)'
+    )
+    parser.add_argument(
+        '--preroll-ms',
+        type=int,
+        default=None,
+        help='Prepend this much audio captured before the trigger (env: MICPY_PREROLL_MS)'
+    )
+    parser.add_argument(
+        '--upload-mode',
+        choices=UPLOAD_MODES,
+        default=None,
+        help='batch: upload after stop; stream: upload while recording; '
+             'segmented: transcribe pause-separated segments in parallel (env: MICPY_UPLOAD_MODE)'
+    )
+    parser.add_argument(
+        '--no-vad',
+        dest='vad',
+        action='store_false',
+        default=None,
+        help='Do not trim silence before upload (env: MICPY_VAD=0)'
+    )
+    parser.add_argument(
+        '--max-pause-ms',
+        type=int,
+        default=None,
+        help='Compress internal pauses longer than this (env: MICPY_VAD_MAX_PAUSE_MS)'
+    )
+    parser.add_argument(
+        '--codec',
+        choices=CODEC_CHOICES,
+        default=None,
+        help='Upload encoding; auto picks by link throughput and length (env: MICPY_CODEC)'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=None,
+        help='Send a duplicate request when the first is slower than the p95 latency '
+             '(env: MICPY_HEDGE)'
+    )
+    parser.add_argument(
+        '--cache',
+        choices=CACHE_MODES,
+        default=None,
+        help='Cache transcriptions of identical audio in memory or also on disk '
+             '(~/.cache/micpy; env: MICPY_CACHE)'
+    )
+    parser.add_argument(
+        '--output-mode',
+        choices=OUTPUT_MODES,
+        default='auto',
+        help='auto: wtype, then clipboard; injection: wtype only; clipboard only; '
+             'stdout: one NDJSON line per utterance; file: append to --output-file'
+    )
+    parser.add_argument(
+        '--output-file',
+        type=Path,
+        default=None,
+        help='Transcript file for --output-mode file (env: MICPY_OUTPUT_FILE)'
+    )
+    parser.add_argument(
+        '--metrics',
+        default=None,
+        metavar='ADDRESS',
+        help='Expose Prometheus metrics on a port, host:port or Unix socket path '
+             '(env: MICPY_METRICS)'
+    )
 
     args = parser.parse_args()
 
     daemon = VoiceInputDaemon(
         api_url=args.api_url,
         model=args.model,
-        socket_path=args.socket_path
+        socket_path=args.socket_path,
+        output_mode=args.output_mode,
+        hot_mic=args.hot_mic,
+        preroll_ms=args.preroll_ms,
+        upload_mode=args.upload_mode,
+        vad=args.vad,
+        max_pause_ms=args.max_pause_ms,
+        codec=args.codec,
+        hedge=args.hedge,
+        cache=args.cache,
+        metrics=args.metrics,
+        output_file=args.output_file
     )
     daemon.run()
 
 
-def send_trigger(socket_path: Optional[Path] = None) -> bool:
-    """
-    Отправить триггер на демон через сокет.
-
-    Args:
-        socket_path: Путь к сокету
-
-    Returns:
-        True если успешно
-    """
-    path = str(socket_path or DEFAULT_SOCKET_PATH)
-
-    if not Path(path).exists():
-        logger.error(f"Socket not found: {path}")
-        logger.error("Is the daemon running?")
-        return False
-
-    try:
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.connect(path)
-        sock.sendall(b'trigger')
-        sock.close()
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send trigger: {e}")
-        return False
-
-
 if __name__ == '__main__':
     main()
@@ -0,0 +1,61 @@
+"""Общие фикстуры тестов: поток PortAudio без микрофона и генераторы PCM."""
+
+import numpy as np
+import pytest
+
+SAMPLE_RATE = 16000
+
+
+class StubStream:
+    """Входной поток PortAudio без устройства: данные подаются через feed()."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.active = True
+
+    def feed(self, pcm: bytes, chunk_frames: int = 1024):
+        """Отдать PCM в stream_callback буферами по chunk_frames."""
+        step = chunk_frames * 2
+        for i in range(0, len(pcm), step):
+            self.callback(pcm[i:i + step], chunk_frames, {}, 0)
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+@pytest.fixture
+def stub_stream(monkeypatch):
+    """
+    Подменить открытие входного потока AudioBuffer.
+
+    Возвращает список открытых StubStream: последний — текущий поток.
+    """
+    pytest.importorskip('pyaudio')
+    from client.audio_buffer import AudioBuffer
+
+    streams = []
+
+    def open_stream(self):
+        self._audio_stream = StubStream(self._stream_callback)
+        streams.append(self._audio_stream)
+
+    monkeypatch.setattr(AudioBuffer, '_open_stream', open_stream)
+    return streams
+
+
+def tone(seconds: float, freq: float = 220.0, amplitude: int = 5000) -> bytes:
+    """Синусоида int16 моно."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype('<i2').tobytes()
+
+
+def silence(seconds: float, amplitude: int = 0) -> bytes:
+    """Тишина или слабый шум заданной амплитуды."""
+    n = int(seconds * SAMPLE_RATE)
+    if not amplitude:
+        return b'\x00\x00' * n
+    rng = np.random.default_rng(0)
+    return rng.integers(-amplitude, amplitude + 1, n).astype('<i2').tobytes()
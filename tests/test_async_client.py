@@ -0,0 +1,140 @@
+"""Асинхронный клиент: aiohttp и запасной путь через пул потоков."""
+
+import asyncio
+import io
+import wave
+
+import pytest
+
+from client import parakeet_client
+from client.mock_server import MockConfig, start_mock_server
+from client.parakeet_client import ParakeetClient
+
+
+def wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(b'\x00\x00' * int(seconds * 16000))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server():
+    server = start_mock_server(MockConfig(latency='fixed:0.2', text='привет'))
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    for name in ('MICPY_CACHE', 'MICPY_HEDGE', 'MICPY_CODEC'):
+        monkeypatch.delenv(name, raising=False)
+    clients = []
+
+    def make(url: str, **kwargs) -> ParakeetClient:
+        client = ParakeetClient(api_url=url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_concurrent_requests(server, make_client):
+    pytest.importorskip('aiohttp')
+    client = make_client(server.base_url)
+
+    async def run():
+        try:
+            assert await client.ahealth_check()
+            return await asyncio.gather(*(client.atranscribe(wav(1.0)) for _ in range(3)))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+
+    assert [r["text"] for r in results] == ['привет'] * 3
+    assert all(r["success"] for r in results)
+    assert server.snapshot()["transcriptions"] == 3
+    # Загрузка измерена по отправке тела
+    assert client._throughput is not None
+    assert client._async_session is None
+
+
+def test_cancel_aborts_request(server, make_client):
+    pytest.importorskip('aiohttp')
+    server.config.latency = lambda rng: 5.0
+    client = make_client(server.base_url)
+
+    async def run():
+        task = asyncio.create_task(client.atranscribe(wav(1.0)))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        finally:
+            await client.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=3))
+
+
+def test_retry_reports_last_error(make_client):
+    pytest.importorskip('aiohttp')
+    server = start_mock_server(MockConfig(latency='fixed:0', error_rate=1.0, error_status=503))
+    client = make_client(server.base_url)
+
+    async def run():
+        try:
+            return await client.atranscribe_with_retry(wav(1.0), max_retries=1)
+        finally:
+            await client.aclose()
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert not result["success"]
+    assert result["status_code"] == 503
+    assert server.snapshot()["requests"] == 2
+
+
+def test_unreachable_server(make_client):
+    pytest.importorskip('aiohttp')
+    client = make_client('http://127.0.0.1:9/v1')
+
+    async def run():
+        try:
+            return await client.ahealth_check(), await client.atranscribe(wav(1.0))
+        finally:
+            await client.aclose()
+
+    healthy, result = asyncio.run(run())
+
+    assert not healthy
+    assert not result["success"]
+    assert result["error"].startswith("Connection failed")
+
+
+def test_fallback_without_aiohttp(server, make_client, monkeypatch):
+    monkeypatch.setattr(parakeet_client, 'ASYNC_HTTP_AVAILABLE', False)
+    client = make_client(server.base_url)
+
+    async def run():
+        try:
+            return await client.ahealth_check(), await client.atranscribe(wav(1.0))
+        finally:
+            await client.aclose()
+
+    healthy, result = asyncio.run(run())
+
+    assert healthy
+    assert result["success"] and result["text"] == 'привет'
+    # Запрос ушёл через requests, сессия aiohttp не создавалась
+    assert client.get_stats()["requests"] >= 1
+    assert client._async_session is None
@@ -0,0 +1,25 @@
+"""Выбор кодека загрузки по пропускной способности канала."""
+
+from client.audio_codecs import choose_codec
+
+ALL = ['wav', 'mulaw', 'flac', 'opus']
+
+
+def test_unmeasured_link_uses_wav():
+    assert choose_codec(10.0, None, ALL) == 'wav'
+
+
+def test_fast_link_uses_wav():
+    # Гигабитная сеть: загрузка 320 КБ дешевле любого кодирования
+    assert choose_codec(10.0, 100e6, ALL) == 'wav'
+
+
+def test_slow_link_compresses():
+    # Мобильный канал ~50 КБ/с: opus в 10 раз меньше
+    assert choose_codec(10.0, 50e3, ALL) == 'opus'
+    assert choose_codec(10.0, 50e3, ['wav', 'mulaw']) == 'mulaw'
+
+
+def test_only_listed_candidates():
+    assert choose_codec(10.0, 50e3, []) == 'wav'
+    assert choose_codec(10.0, 50e3, ['flac']) == 'flac'
@@ -0,0 +1,49 @@
+"""Путь `micpy trigger`: только стандартная библиотека и бюджет времени запуска."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.cli_import_time import (
+    DEFAULT_BUDGET_MS,
+    FORBIDDEN,
+    LIST_MODULES,
+    ROOT,
+    TRIGGER,
+    best_time,
+    serve,
+)
+
+# Общие CI-машины шумные: бюджет проверяется с запасом
+CI_MARGIN = 3
+
+
+@pytest.fixture
+def trigger_socket(tmp_path):
+    path = str(tmp_path / 'trigger.sock')
+    server = serve(path)
+    yield path
+    server.close()
+
+
+def test_trigger_skips_heavy_modules(trigger_socket):
+    loaded = subprocess.run(
+        [sys.executable, '-c', LIST_MODULES, trigger_socket],
+        env=dict(os.environ, PYTHONPATH=ROOT), check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=30
+    ).stderr.split()
+
+    heavy = [
+        name for name in loaded
+        if any(name == module or name.startswith(module + '.') for module in FORBIDDEN)
+    ]
+    assert heavy == []
+
+
+def test_trigger_startup_budget(trigger_socket):
+    bare = best_time([sys.executable, '-c', 'pass'], runs=5)
+    trigger = best_time([sys.executable, '-c', TRIGGER, trigger_socket], runs=5)
+
+    assert trigger - bare < DEFAULT_BUDGET_MS * CI_MARGIN
@@ -0,0 +1,170 @@
+"""Владелец буфера обмена (подтверждения, перезапуск, выход) и выбор механизма."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from client import clipboard
+from client.clipboard import CommandClipboard, OwnerClipboard, probe_clipboard
+
+# Владелец без Tk с тем же протоколом: кадры «длина\ntext», ответ ok.
+# Принятый текст пишется в OWNER_OUT; с OWNER_WEDGED подтверждений нет
+FAKE_OWNER = r'''
+import os
+import sys
+import time
+
+sys.stdout.write('ready\n')
+sys.stdout.flush()
+buffer = b''
+while True:
+    chunk = os.read(0, 65536)
+    if not chunk:
+        time.sleep(float(os.environ.get('OWNER_LINGER', '0')))
+        break
+    buffer += chunk
+    while b'\n' in buffer:
+        size, rest = buffer.split(b'\n', 1)
+        if len(rest) < int(size):
+            break
+        with open(os.environ['OWNER_OUT'], 'wb') as out:
+            out.write(rest[:int(size)])
+        buffer = rest[int(size):]
+        if not os.environ.get('OWNER_WEDGED'):
+            sys.stdout.write('ok\n')
+            sys.stdout.flush()
+'''
+
+
+@pytest.fixture
+def owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(clipboard, 'OWNER_SCRIPT', FAKE_OWNER)
+    monkeypatch.setattr(clipboard, 'OWNER_ACK_TIMEOUT', 0.3)
+    monkeypatch.setenv('OWNER_OUT', str(tmp_path / 'clipboard.txt'))
+    owner = OwnerClipboard()
+    assert owner.start()
+    yield owner
+    owner._kill()
+
+
+def test_copy_is_acknowledged(owner, tmp_path):
+    assert owner.copy('привет')
+    assert owner.copy('второй')
+    assert (tmp_path / 'clipboard.txt').read_text(encoding='utf-8') == 'второй'
+
+
+def test_dead_owner_is_restarted(owner, tmp_path):
+    first = owner._proc
+    first.kill()
+    first.wait()
+
+    assert owner.copy('после сбоя')
+    assert owner._proc is not first
+    assert (tmp_path / 'clipboard.txt').read_text(encoding='utf-8') == 'после сбоя'
+
+
+def test_wedged_owner_reports_failure(owner, monkeypatch):
+    monkeypatch.setenv('OWNER_WEDGED', '1')
+    # Зависший владелец и его замена не подтверждают копирование
+    owner._proc.kill()
+    owner._proc.wait()
+
+    assert not owner.copy('текст')
+    assert owner._proc is None
+
+
+def test_close_keeps_owner_running(owner, monkeypatch):
+    monkeypatch.setenv('OWNER_LINGER', '5')
+    owner._kill()
+    assert owner.start()
+    proc = owner._proc
+
+    owner.close()
+
+    assert owner._proc is None
+    assert proc.poll() is None
+    proc.kill()
+    proc.wait()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """
+    Сессия без реальных инструментов: which находит wl-copy, xclip и xsel.
+
+    В failing — команды и owner, которые не проходят проверку при старте.
+    """
+    for name in ('WAYLAND_DISPLAY', 'DISPLAY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(clipboard, 'ensure_wayland_env', lambda: None)
+    monkeypatch.setattr(clipboard.platform, 'system', lambda: 'Linux')
+    tools = {'wl-copy', 'xclip', 'xsel'}
+    monkeypatch.setattr(
+        clipboard.shutil, 'which', lambda name: f'/usr/bin/{name}' if name in tools else None
+    )
+    state = SimpleNamespace(started=[], probed=[], failing=set())
+
+    def start(self):
+        state.started.append(self)
+        return 'owner' not in state.failing
+
+    def probe(self):
+        state.probed.append(self.name)
+        return self.name not in state.failing
+
+    monkeypatch.setattr(OwnerClipboard, 'start', start)
+    monkeypatch.setattr(CommandClipboard, 'probe', probe)
+    return state
+
+
+def test_wayland_prefers_wl_copy(session, monkeypatch):
+    monkeypatch.setenv('WAYLAND_DISPLAY', 'wayland-0')
+    monkeypatch.setenv('DISPLAY', ':0')
+
+    assert probe_clipboard().name == 'wl-copy'
+    assert session.started == []
+    assert session.probed == ['wl-copy']
+
+
+def test_wayland_falls_back_to_owner(session, monkeypatch):
+    monkeypatch.setenv('WAYLAND_DISPLAY', 'wayland-0')
+    monkeypatch.setenv('DISPLAY', ':0')
+    session.failing.add('wl-copy')
+
+    assert probe_clipboard().name == 'owner'
+
+
+def test_x11_uses_owner(session, monkeypatch):
+    monkeypatch.setenv('DISPLAY', ':0')
+
+    assert probe_clipboard().name == 'owner'
+    assert session.probed == []
+
+
+def test_command_needs_working_test_copy(session, monkeypatch):
+    monkeypatch.setenv('DISPLAY', ':0')
+    session.failing.update({'owner', 'xclip'})
+
+    # xclip в PATH, но не копирует — выбирается следующая команда
+    assert probe_clipboard().name == 'xsel'
+    assert session.probed == ['xclip', 'xsel']
+
+
+def test_test_copy_writes_back_current_text(tmp_path):
+    out = tmp_path / 'clipboard.txt'
+    command = CommandClipboard(
+        'fake', ['sh', '-c', f'cat > {out}'], ['printf', '%s', 'старый текст']
+    )
+
+    assert command.probe()
+    assert out.read_text(encoding='utf-8') == 'старый текст'
+
+
+def test_test_copy_without_text(tmp_path):
+    out = tmp_path / 'clipboard.txt'
+    empty = CommandClipboard('fake', ['sh', '-c', f'cat > {out}'], ['false'])
+    broken = CommandClipboard('fake', ['false'], ['printf', 'x'])
+
+    assert empty.probe()
+    assert out.read_text(encoding='utf-8') == ''
+    assert not broken.probe()
@@ -0,0 +1,122 @@
+"""Выбор сервера API по EWMA задержки и исключение сбойных серверов."""
+
+import pytest
+
+from client import endpoints
+from client.endpoints import EJECT_BASE_S, EndpointPool, parse_endpoints
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(endpoints.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def pool(clock):
+    return EndpointPool(['http://a/v1', 'http://b/v1', 'http://c/v1'])
+
+
+def test_parse_endpoints():
+    assert parse_endpoints(' http://a/v1/ , http://b/v1,http://a/v1 ') == [
+        'http://a/v1', 'http://b/v1'
+    ]
+    with pytest.raises(ValueError):
+        parse_endpoints(' , ')
+
+
+def test_ewma(pool):
+    a = pool.endpoints[0]
+
+    pool.record_success(a, 1.0, audio_seconds=2.0)
+    pool.record_success(a, 2.0, audio_seconds=2.0)
+
+    assert a.latency == pytest.approx(0.7 * 1.0 + 0.3 * 2.0)
+    assert a.rtf == pytest.approx(0.7 * 0.5 + 0.3 * 1.0)
+
+
+def test_unmeasured_first_then_fastest(pool):
+    a, b, c = pool.endpoints
+    pool.record_success(a, 2.0, audio_seconds=4.0)
+    pool.record_success(b, 0.5, audio_seconds=4.0)
+
+    # c ещё не измерен — его пробуют первым
+    assert pool.select(4.0) is c
+
+    pool.record_success(c, 1.0, audio_seconds=4.0)
+    assert pool.select(4.0) is b
+    assert pool.select(4.0, exclude=[b]) is c
+
+
+def test_rtf_scales_with_audio_length(pool):
+    a, b, c = pool.endpoints
+    # a быстро отвечал на короткие записи, b — медленнее, но на длинных
+    pool.record_success(a, 1.0, audio_seconds=1.0)
+    pool.record_success(b, 2.0, audio_seconds=10.0)
+    pool.record_success(c, 5.0, audio_seconds=5.0)
+
+    assert pool.select(10.0) is b
+
+
+def test_recent_failure_goes_last(pool, clock):
+    a, b, c = pool.endpoints
+    pool.record_success(a, 0.1)
+    pool.record_success(b, 1.0)
+    pool.record_success(c, 1.0)
+    pool.record_failure(a)
+
+    # a всё ещё самый быстрый, но повтор после ошибки уходит на другой сервер
+    assert pool.select() is not a
+    clock.now += EJECT_BASE_S + 1
+    assert pool.select() is a
+
+
+def test_ejection_backs_off_and_readmits(pool, clock):
+    a, b, c = pool.endpoints
+    for endpoint in (b, c):
+        pool.record_success(endpoint, 5.0)
+
+    pool.record_failure(a)
+    pool.record_failure(a)
+    assert a.is_ejected(clock.now)
+    assert a.ejected_until - clock.now == pytest.approx(EJECT_BASE_S)
+    assert pool.select() is not a
+
+    # Повторное исключение — вдвое дольше
+    clock.now = a.ejected_until + 1
+    pool.record_failure(a)
+    assert a.ejected_until - clock.now == pytest.approx(2 * EJECT_BASE_S)
+
+    pool.record_health(a, True)
+    assert not a.is_ejected(clock.now)
+    assert a.ejections == 0
+    assert pool.stats()[0]["ejected"] is False
+
+
+def test_all_ejected_picks_earliest_return(pool, clock):
+    for i, endpoint in enumerate(pool.endpoints):
+        pool.record_failure(endpoint)
+        pool.record_failure(endpoint)
+        endpoint.ejected_until = clock.now + 10 - i
+
+    assert pool.select() is pool.endpoints[-1]
+
+
+def test_single_endpoint_is_never_ejected(clock):
+    pool = EndpointPool(['http://a/v1'])
+    a = pool.endpoints[0]
+    for _ in range(5):
+        pool.record_failure(a)
+
+    assert not a.is_ejected(clock.now)
+    assert pool.select() is a
+    assert pool.stats()[0]["error_rate"] > 0.8
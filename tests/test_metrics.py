@@ -0,0 +1,94 @@
+"""Метрики: текстовый формат Prometheus и экспортёр."""
+
+import threading
+import time
+import urllib.request
+
+from client.metrics import MetricsRegistry, MetricsServer
+
+
+def test_render_counter_with_labels():
+    registry = MetricsRegistry()
+    skipped = registry.counter('micpy_skipped_total', 'Skipped', ('reason',))
+    skipped.inc(reason='too_short')
+    skipped.inc(2, reason='no_speech')
+    registry.counter('micpy_retries_total', 'Retries')
+
+    assert registry.render().splitlines() == [
+        '# HELP micpy_skipped_total Skipped',
+        '# TYPE micpy_skipped_total counter',
+        'micpy_skipped_total{reason="no_speech"} 2',
+        'micpy_skipped_total{reason="too_short"} 1',
+        '# HELP micpy_retries_total Retries',
+        '# TYPE micpy_retries_total counter',
+        'micpy_retries_total 0',
+    ]
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.counter('errors_total', 'Errors', ('type',)).inc(type='a"b\\c\nd')
+
+    assert 'errors_total{type="a\\"b\\\\c\\nd"} 1' in registry.render().splitlines()
+
+
+def test_render_histogram_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', (0.1, 1.0), ('backend',))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, backend='wtype')
+
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        # Корзины накопительные, граница включается в свою корзину
+        'latency_seconds_bucket{backend="wtype",le="0.1"} 2',
+        'latency_seconds_bucket{backend="wtype",le="1"} 3',
+        'latency_seconds_bucket{backend="wtype",le="+Inf"} 4',
+        'latency_seconds_sum{backend="wtype"} 3.65',
+        'latency_seconds_count{backend="wtype"} 4',
+    ]
+
+
+def test_render_gauge():
+    registry = MetricsRegistry()
+    registry.gauge('recording', 'Recording', lambda: True)
+    registry.gauge('broken', 'Broken', lambda: 1 / 0)
+
+    assert registry.render().splitlines() == [
+        '# HELP recording Recording',
+        '# TYPE recording gauge',
+        'recording 1',
+    ]
+
+
+def test_handle_request_does_not_block():
+    registry = MetricsRegistry()
+    registry.counter('micpy_recordings_total', 'Recordings').inc()
+    server = MetricsServer(registry, ('127.0.0.1', 0))
+    assert server.open()
+    try:
+        # Ложная готовность: соединения нет, цикл событий не должен зависнуть
+        thread = threading.Thread(target=server.handle_request, daemon=True)
+        thread.start()
+        thread.join(timeout=2)
+        assert not thread.is_alive()
+
+        host, port = server._server.server_address[:2]
+        replies = []
+        client = threading.Thread(
+            target=lambda: replies.append(
+                urllib.request.urlopen(f'http://{host}:{port}/metrics', timeout=5).read()
+            ),
+            daemon=True
+        )
+        client.start()
+        deadline = time.monotonic() + 5
+        while not replies and time.monotonic() < deadline:
+            server.handle_request()
+            time.sleep(0.01)
+        client.join(timeout=5)
+    finally:
+        server.stop()
+
+    assert b'micpy_recordings_total 1' in replies[0]
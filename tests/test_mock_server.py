@@ -0,0 +1,110 @@
+"""Сквозная проверка клиента против мок-сервера на свободном порту."""
+
+import io
+import time
+import wave
+
+import pytest
+import requests
+
+from client.mock_server import MockConfig, start_mock_server
+from client.parakeet_client import ParakeetClient
+
+
+def wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(b'\x10\x00\xf0\xff' * int(seconds * 8000))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**kwargs):
+        server = start_mock_server(MockConfig(**kwargs))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    for name in ('MICPY_CACHE', 'MICPY_HEDGE', 'MICPY_HEDGE_PERCENTILE', 'MICPY_CODEC'):
+        monkeypatch.delenv(name, raising=False)
+    clients = []
+
+    def make(api_url, **kwargs) -> ParakeetClient:
+        client = ParakeetClient(api_url=api_url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_transcribe_over_prewarmed_connection(mock_server, make_client):
+    server = mock_server(text='привет')
+    client = make_client(server.base_url)
+
+    client.prewarm()
+    deadline = time.monotonic() + 5
+    while client.get_stats()["prewarms"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client.cancel_prewarm()
+    result = client.transcribe_with_retry(wav(2.0))
+
+    assert result["success"] and result["text"] == 'привет'
+    assert result["duration"] == pytest.approx(2.0)
+    # Запрос ушёл по соединению, открытому прогревом
+    stats = client.get_stats()
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] >= 1
+    assert server.snapshot()["transcriptions"] == 1
+
+
+def test_compressed_upload(mock_server, make_client):
+    server = mock_server()
+    client = make_client(server.base_url, codec='mulaw')
+    audio = wav(2.0)
+
+    result = client.transcribe(audio)
+
+    assert result["success"]
+    # μ-law WAV: та же длительность при половине объёма
+    assert result["duration"] == pytest.approx(2.0)
+    assert server.snapshot()["bytes_received"] < len(audio) * 0.6
+
+
+def test_failover_to_healthy_endpoint(mock_server, make_client):
+    broken = mock_server(error_rate=1.0, error_status=503)
+    healthy = mock_server(text='ok')
+    client = make_client([broken.base_url, healthy.base_url])
+
+    result = client.transcribe_with_retry(wav(1.0), max_retries=1)
+
+    assert result["success"] and result["text"] == 'ok'
+    assert result["endpoint"] == healthy.base_url
+    assert broken.snapshot()["errors"] == 1
+    assert healthy.snapshot()["transcriptions"] == 1
+
+
+def test_injected_timeout(mock_server, make_client):
+    server = mock_server(timeout_rate=1.0, hang_s=3.0)
+    client = make_client(server.base_url, timeout=1)
+
+    result = client.transcribe(wav(1.0))
+
+    assert not result["success"]
+    assert result["error"] == "Request timeout (1s)"
+    stats = requests.get(server.base_url.replace('/v1', '/mock/stats'), timeout=5).json()
+    assert stats["timeouts"] == 1
@@ -0,0 +1,132 @@
+"""Цепочка бэкендов вывода: порядок, запасные бэкенды и статистика."""
+
+import json
+
+import pytest
+
+from client.metrics import DaemonMetrics
+from client.output_backends import (
+    FakeBackend,
+    FileBackend,
+    OutputBackend,
+    StdoutBackend,
+    TextOutput,
+    create_backends,
+)
+
+
+class Unavailable(FakeBackend):
+    name = 'missing'
+
+    def available(self) -> bool:
+        return False
+
+
+class Broken(FakeBackend):
+    name = 'broken'
+
+    def write(self, text: str) -> bool:
+        raise OSError("compositor went away")
+
+
+def named(name: str, **kwargs) -> FakeBackend:
+    backend = FakeBackend(**kwargs)
+    backend.name = name
+    return backend
+
+
+def test_first_backend_wins():
+    first, second = named('first'), named('second')
+    output = TextOutput([first, second])
+
+    assert output.write('привет') == 'first'
+    assert first.texts == ['привет']
+    assert second.texts == []
+
+
+def test_falls_back_on_failure():
+    failing, fallback = named('failing', fail=True), named('fallback')
+    output = TextOutput([failing, fallback])
+
+    assert output.write('привет') == 'fallback'
+    assert fallback.texts == ['привет']
+
+
+def test_exception_counts_as_failure():
+    fallback = named('fallback')
+    output = TextOutput([Broken(), fallback])
+
+    assert output.write('привет') == 'fallback'
+    assert output.stats()['broken']['failures'] == 1
+
+
+def test_unavailable_backends_are_dropped():
+    output = TextOutput([Unavailable(), named('fallback')])
+
+    assert output.names == ['fallback']
+
+
+def test_no_backend_succeeds():
+    output = TextOutput([named('failing', fail=True)])
+
+    assert output.write('привет') is None
+    assert TextOutput([]).write('привет') is None
+
+
+def test_stats_and_metrics():
+    metrics = DaemonMetrics()
+    output = TextOutput([named('failing', fail=True), named('fallback')], metrics)
+    output.write('раз')
+    output.write('два')
+
+    stats = output.stats()
+    assert stats['failing']['attempts'] == 2
+    assert stats['failing']['failures'] == 2
+    assert stats['fallback']['attempts'] == 2
+    assert stats['fallback']['failures'] == 0
+    assert stats['fallback']['mean_ms'] >= 0
+    assert metrics.output_failures.value(backend='failing') == 2
+    assert metrics.output_failures.value(backend='fallback') == 0
+    assert metrics.output_latency.count(backend='fallback') == 2
+
+
+def test_unused_backend_has_no_mean():
+    output = TextOutput([named('first'), named('second')])
+    output.write('привет')
+
+    assert output.stats()['second'] == {'attempts': 0, 'failures': 0, 'mean_ms': None}
+
+
+def test_close_closes_every_backend():
+    closed = []
+
+    class Closing(FakeBackend):
+        def close(self):
+            closed.append(self.name)
+
+    backends = [Closing(), Closing()]
+    backends[1].name = 'second'
+    TextOutput(backends).close()
+
+    assert closed == ['fake', 'second']
+
+
+def test_file_and_stdout_backends(tmp_path, capsys):
+    path = tmp_path / 'nested' / 'out.txt'
+    output = TextOutput([FileBackend(path)])
+    output.write('раз')
+    output.write('два')
+    output.close()
+    assert path.read_text(encoding='utf-8') == 'раз\nдва\n'
+
+    assert StdoutBackend().write('привет')
+    assert json.loads(capsys.readouterr().out)['text'] == 'привет'
+
+
+def test_create_backends():
+    assert [type(b) for b in create_backends('stdout')] == [StdoutBackend]
+    with pytest.raises(ValueError):
+        create_backends('file')
+    with pytest.raises(ValueError):
+        create_backends('telepathy')
+    assert all(isinstance(b, OutputBackend) for b in create_backends('file', 'out.txt'))
@@ -0,0 +1,186 @@
+"""ParakeetClient: порог хеджирования, трассировка, кодеки и оценка канала."""
+
+import io
+import struct
+import threading
+import time
+import wave
+
+import pytest
+
+from client import parakeet_client
+from client.mock_server import MockConfig, start_mock_server
+from client.parakeet_client import (
+    HEDGE_INITIAL_DELAY,
+    HEDGE_MIN_SAMPLES,
+    POOL_MAXSIZE,
+    ParakeetClient,
+)
+from client.tracing import Tracer
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ('MICPY_CACHE', 'MICPY_HEDGE', 'MICPY_HEDGE_PERCENTILE', 'MICPY_CODEC'):
+        monkeypatch.delenv(name, raising=False)
+    client = ParakeetClient(api_url='http://127.0.0.1:9/v1', hedge=True)
+    yield client
+    client.close()
+
+
+def test_hedge_delay_waits_for_samples(client):
+    for _ in range(HEDGE_MIN_SAMPLES - 1):
+        client._record_latency(1.0, 2.0)
+
+    assert client._hedge_delay(2.0) == HEDGE_INITIAL_DELAY
+
+
+def test_hedge_delay_scales_with_clip_length(client):
+    # Короткие фразы: 0.25 с ответа на секунду аудио
+    for _ in range(20):
+        client._record_latency(0.5, 2.0)
+
+    assert client._hedge_delay(2.0) == pytest.approx(0.5)
+    # Длинная запись не хеджируется только из-за своей длины
+    assert client._hedge_delay(60.0) == pytest.approx(15.0)
+    # Длина потоковой записи неизвестна
+    assert client._hedge_delay(None) == HEDGE_INITIAL_DELAY
+
+
+def test_streamed_requests_do_not_skew_history(client):
+    for _ in range(20):
+        client._record_latency(0.5, 2.0)
+    client._record_latency(30.0, None)
+
+    assert client._hedge_delay(2.0) == pytest.approx(0.5)
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.text = '' if status_code == 200 else 'unsupported format'
+
+    def json(self):
+        return {"text": "hi", "duration": 1.0}
+
+
+def wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(b'\x00\x00' * int(seconds * 16000))
+    return buffer.getvalue()
+
+
+def test_hedged_requests_mark_callers_trace(client, monkeypatch):
+    # Основной запрос отвечает медленно — уходит и дублирующий
+    monkeypatch.setattr(parakeet_client, 'HEDGE_INITIAL_DELAY', 0.05)
+    client.tracer = Tracer()
+    seen = []
+    lock = threading.Lock()
+
+    def post(url, **kwargs):
+        with lock:
+            seen.append(client.tracer.current)
+            first = len(seen) == 1
+        if first:
+            time.sleep(0.3)
+        return FakeResponse()
+
+    monkeypatch.setattr(client.session, 'post', post)
+    # Фраза распознаётся в фоне: трасса привязана к потоку, а не текущая
+    trace = client.tracer.begin()
+    client.tracer.detach()
+    with client.tracer.bind(trace):
+        result = client.transcribe_with_retry(wav(1.0), max_retries=1)
+
+    assert result["success"]
+    assert client.get_stats()["hedged"] == 1
+    assert seen == [trace, trace]
+    assert {'request_sent', 'response_received'} <= set(trace.marks)
+
+
+def test_busy_pool_is_not_hedged(client, monkeypatch):
+    monkeypatch.setattr(parakeet_client, 'HEDGE_INITIAL_DELAY', 0.05)
+    threads = []
+
+    def post(url, **kwargs):
+        threads.append(threading.current_thread())
+        time.sleep(0.2)
+        return FakeResponse()
+
+    monkeypatch.setattr(client.session, 'post', post)
+    # Все потоки, кроме одного, держат зависшие проигравшие запросы
+    client._hedge_busy = POOL_MAXSIZE - 1
+    assert client.transcribe_with_retry(wav(1.0), max_retries=0)["success"]
+    assert len(threads) == 1
+
+    # Свободных потоков нет — запрос идёт в вызывающем потоке
+    client._hedge_busy = POOL_MAXSIZE
+    assert client.transcribe_with_retry(wav(1.0), max_retries=0)["success"]
+    assert threads[-1] is threading.current_thread()
+
+    stats = client.get_stats()
+    assert stats["hedged"] == 0
+    assert stats["hedge_skipped"] == 2
+
+
+def test_hedge_legs_release_the_pool(client, monkeypatch):
+    monkeypatch.setattr(parakeet_client, 'HEDGE_INITIAL_DELAY', 0.05)
+    monkeypatch.setattr(client.session, 'post', lambda url, **kwargs: FakeResponse())
+
+    for _ in range(POOL_MAXSIZE + 2):
+        assert client.transcribe_with_retry(wav(1.0), max_retries=0)["success"]
+
+    deadline = time.monotonic() + 2
+    while client._hedge_busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client._hedge_busy == 0
+    assert client.get_stats()["hedge_skipped"] == 0
+
+
+def wav_format_tag(body: bytes) -> int:
+    """Код формата WAV в multipart-теле (1 — PCM, 7 — μ-law)."""
+    fmt = body.index(b'fmt ')
+    return struct.unpack('<H', body[fmt + 8:fmt + 10])[0]
+
+
+def test_rejected_codec_falls_back_to_wav(monkeypatch):
+    monkeypatch.delenv('MICPY_CACHE', raising=False)
+    client = ParakeetClient(api_url='http://127.0.0.1:9/v1', codec='mulaw')
+    formats = []
+
+    def post(url, data=None, **kwargs):
+        body = b''.join(iter(lambda: data.read(8192), b''))
+        formats.append(wav_format_tag(body))
+        return FakeResponse(415 if formats[-1] == 7 else 200)
+
+    monkeypatch.setattr(client.session, 'post', post)
+    try:
+        assert client.transcribe(wav(1.0))["success"]
+        # Отвергнутый кодек больше не пробуется
+        assert client.transcribe(wav(1.0))["success"]
+    finally:
+        client.close()
+
+    assert formats == [7, 1, 1]
+    assert 'mulaw' in client._rejected_codecs
+
+
+def test_throughput_excludes_inference(monkeypatch):
+    monkeypatch.delenv('MICPY_CACHE', raising=False)
+    # Сервер «распознаёт» полсекунды: в оценку канала это время не входит
+    server = start_mock_server(MockConfig(latency='fixed:0.5'))
+    client = ParakeetClient(api_url=server.base_url, codec='auto')
+    audio = wav(10.0)
+    try:
+        # Соединение уже открыто, как после прогрева в демоне
+        assert client.health_check()
+        assert client.transcribe(audio)["success"]
+        # Время запроса целиком дало бы меньше len(audio) / 0.5
+        assert client._throughput > 5 * len(audio) / 0.5
+    finally:
+        client.close()
+        server.shutdown()
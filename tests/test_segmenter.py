@@ -0,0 +1,109 @@
+"""Нарезка живой записи на сегменты по паузам."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import SAMPLE_RATE, silence, tone
+
+pytest.importorskip('pyaudio')
+
+from client.audio_buffer import AudioBuffer  # noqa: E402
+from client.segmenter import SegmentedTranscriber  # noqa: E402
+
+
+class FakeApi:
+    """Клиент API: текст сегмента — его длительность, первый ответ медленный."""
+
+    tracer = None
+
+    def __init__(self, first_delay: float = 0.0):
+        self.first_delay = first_delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def transcribe_with_retry(self, wav_bytes: bytes, max_retries: int = 3):
+        with self._lock:
+            self.calls.append(len(wav_bytes))
+            first = len(self.calls) == 1
+        if first and self.first_delay:
+            time.sleep(self.first_delay)
+        seconds = (len(wav_bytes) - 44) / (SAMPLE_RATE * 2)
+        return {"text": f"{seconds:.0f}s", "duration": seconds, "success": True, "error": None}
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        yield pool
+
+
+def record(stub_stream, api, executor, pcm: bytes):
+    buffer = AudioBuffer(sample_rate=SAMPLE_RATE)
+    assert buffer.start_recording()
+    segmenter = SegmentedTranscriber(buffer, api, executor)
+    segmenter.start()
+    stub_stream[-1].feed(pcm)
+    buffer.stop_recording()
+    return segmenter
+
+
+def test_cuts_at_pauses_and_keeps_order(stub_stream, executor):
+    api = FakeApi(first_delay=0.2)
+    pcm = tone(4.0) + silence(1.0) + tone(6.0) + silence(1.0) + tone(3.0)
+
+    result = record(stub_stream, api, executor, pcm).finish()
+
+    assert result["success"]
+    assert result["segments"] == 3
+    # Первый сегмент отвечает последним, но склейка — в порядке записи
+    assert result["text"] == "4s 7s 4s"
+    assert sum(api.calls) - 3 * 44 == len(pcm)
+
+
+def test_short_pause_does_not_cut(stub_stream, executor):
+    api = FakeApi()
+    pcm = tone(4.0) + silence(0.3) + tone(4.0)
+
+    result = record(stub_stream, api, executor, pcm).finish()
+
+    assert result["segments"] == 1
+    assert len(api.calls) == 1
+
+
+def test_silent_segment_is_skipped(stub_stream, executor):
+    api = FakeApi()
+    pcm = tone(4.0) + silence(5.0) + silence(1.0) + tone(4.0)
+
+    result = record(stub_stream, api, executor, pcm).finish()
+
+    # Кусок из одной тишины между фразами в API не уходит
+    assert result["success"]
+    assert result["segments"] == len(api.calls) == 2
+    assert sum(api.calls) - 2 * 44 < len(pcm)
+
+
+def test_silence_only_is_sent_whole(stub_stream, executor):
+    api = FakeApi()
+
+    result = record(stub_stream, api, executor, silence(5.0)).finish()
+
+    assert result["segments"] == 1
+    assert api.calls == [44 + len(silence(5.0))]
+
+
+def test_failed_segment_fails_result(stub_stream, executor):
+    class FailingApi(FakeApi):
+        def transcribe_with_retry(self, wav_bytes, max_retries=3):
+            result = super().transcribe_with_retry(wav_bytes, max_retries)
+            if len(self.calls) == 2:
+                return {"text": "", "success": False, "error": "boom"}
+            return result
+
+    pcm = tone(4.0) + silence(1.0) + tone(4.0)
+    result = record(stub_stream, FailingApi(), executor, pcm).finish()
+
+    assert not result["success"]
+    assert "boom" in result["error"]
@@ -0,0 +1,102 @@
+"""Трассы фраз: отметки этапов, привязка к потоку, история."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from client.tracing import Tracer, UtteranceTrace
+
+
+def test_durations_and_offsets():
+    trace = UtteranceTrace(1)
+    trace.mark('trigger', 10.0)
+    trace.mark('stop', 12.0)
+    trace.mark('request_sent', 11.5)
+    trace.mark('text_output', 12.25)
+
+    assert trace.offsets() == {
+        'trigger': 0.0, 'stop': 2000.0, 'request_sent': 1500.0, 'text_output': 2250.0
+    }
+    # Потоковая загрузка: запрос ушёл до остановки
+    assert trace.durations() == {'stop': 2000.0, 'request_sent': -500.0, 'text_output': 750.0}
+
+
+def test_first_mark_wins_except_last_wins_stages():
+    trace = UtteranceTrace(1)
+    trace.mark('request_sent', 1.0)
+    trace.mark('request_sent', 2.0)
+    trace.mark('response_received', 3.0)
+    trace.mark('response_received', 4.0)
+
+    assert trace.marks == {'request_sent': 1.0, 'response_received': 4.0}
+
+
+def test_marks_after_finish_are_ignored():
+    tracer = Tracer()
+    trace = tracer.begin(1.0)
+    tracer.finish(trace)
+
+    trace.mark('response_received', 5.0)
+
+    assert 'response_received' not in trace.marks
+    assert tracer.last()['id'] == trace.id
+
+
+def test_detached_trace_keeps_background_marks():
+    tracer = Tracer()
+    first = tracer.begin()
+    work = tracer.wrap(lambda: tracer.mark('response_received', 7.0))
+    tracer.detach()
+    second = tracer.begin()
+
+    # Фоновый поток первой фразы отмечает этап, пока идёт вторая
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(work).result()
+
+    assert first.marks['response_received'] == 7.0
+    assert 'response_received' not in second.marks
+
+
+def test_unbound_thread_falls_back_to_current():
+    tracer = Tracer()
+    trace = tracer.begin()
+    tracer.detach()
+
+    # Без привязки после detach отметке некуда попасть
+    thread = threading.Thread(target=tracer.mark, args=('response_received',))
+    thread.start()
+    thread.join()
+
+    assert 'response_received' not in trace.marks
+
+
+def test_bind_restores_previous_binding():
+    tracer = Tracer()
+    outer, inner = UtteranceTrace(1), UtteranceTrace(2)
+
+    with tracer.bind(outer):
+        with tracer.bind(inner):
+            assert tracer.current is inner
+        assert tracer.current is outer
+    assert tracer.current is None
+
+
+def test_history_is_bounded():
+    tracer = Tracer(history=2)
+    for _ in range(3):
+        tracer.finish(tracer.begin())
+
+    assert [trace['id'] for trace in tracer.history()] == [2, 3]
+    assert [trace['id'] for trace in tracer.history(limit=1)] == [3]
+
+
+def test_annotate_and_discard():
+    tracer = Tracer()
+    tracer.begin()
+    tracer.annotate(audio_seconds=1.5)
+    trace = tracer.finish()
+    tracer.begin()
+    tracer.discard()
+
+    assert trace.to_dict()['audio_seconds'] == 1.5
+    assert tracer.current is None
+    assert len(tracer.history()) == 1
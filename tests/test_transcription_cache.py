@@ -0,0 +1,109 @@
+"""Кэш транскрипций: ключ по PCM, LRU в памяти, вытеснение на диске."""
+
+import io
+import os
+import wave
+
+import pytest
+
+from client.parakeet_client import ParakeetClient
+from client.transcription_cache import TranscriptionCache, cache_from_env, cache_key
+
+
+def wav(pcm: bytes, sample_rate: int = 16000) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return out.getvalue()
+
+
+def ok(text: str) -> dict:
+    return {"text": text, "duration": 1.0, "success": True, "error": None}
+
+
+def test_key_depends_on_pcm_model_and_rate():
+    pcm = b'\x01\x00' * 1600
+
+    assert cache_key(wav(pcm), 'm') == cache_key(wav(pcm), 'm')
+    assert cache_key(wav(pcm), 'm') != cache_key(wav(pcm), 'other')
+    assert cache_key(wav(pcm), 'm') != cache_key(wav(pcm, 8000), 'm')
+    assert cache_key(wav(b'\x02\x00' * 1600), 'm') != cache_key(wav(pcm), 'm')
+    assert cache_key(b'not a wav', 'm') is None
+
+
+def test_memory_lru():
+    cache = TranscriptionCache(max_entries=2)
+    cache.put('a', ok('A'))
+    cache.put('b', ok('B'))
+    assert cache.get('a')["text"] == 'A'  # a — свежий, вытесняется b
+
+    cache.put('c', ok('C'))
+
+    assert cache.get('b') is None
+    assert cache.get('a')["cached"] == 'memory'
+    assert cache.get('c')["text"] == 'C'
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(3 / 4)
+
+
+def test_failures_are_not_cached():
+    cache = TranscriptionCache()
+    cache.put('a', {"text": "", "success": False, "error": "boom"})
+
+    assert cache.get('a') is None
+
+
+def test_disk_level_survives_restart(tmp_path):
+    TranscriptionCache(cache_dir=tmp_path).put('a', ok('A'))
+
+    cache = TranscriptionCache(cache_dir=tmp_path)
+    hit = cache.get('a')
+
+    assert hit["text"] == 'A'
+    assert hit["cached"] == 'disk'
+    # Поднят в память
+    assert cache.get('a')["cached"] == 'memory'
+
+
+def test_disk_eviction_drops_least_recently_used(tmp_path):
+    entry_size = len(b'{"text": "X", "duration": 1.0, "success": true, "error": null}')
+    cache = TranscriptionCache(max_entries=1, cache_dir=tmp_path, max_disk_bytes=entry_size * 3)
+    for i, key in enumerate('abc'):
+        cache.put(key, ok('X'))
+        os.utime(tmp_path / f'{key}.json', (1000 + i, 1000 + i))
+    # Попадание обновляет mtime: a становится самым свежим
+    cache._memory.clear()
+    assert cache.get('a') is not None
+
+    cache.put('d', ok('X'))
+
+    assert not (tmp_path / 'b.json').exists()
+    assert (tmp_path / 'a.json').exists()
+    assert cache.stats()["evictions"] >= 1
+    assert cache.stats()["disk_bytes"] <= entry_size * 3
+
+
+def test_cache_from_env(monkeypatch):
+    monkeypatch.setenv('MICPY_CACHE', 'memory')
+
+    assert isinstance(cache_from_env(), TranscriptionCache)
+    assert cache_from_env('off') is None
+    assert cache_from_env('bogus') is None
+
+
+def test_explicit_off_beats_environment(monkeypatch):
+    monkeypatch.setenv('MICPY_CACHE', 'memory')
+
+    from_env = ParakeetClient(api_url='http://127.0.0.1:9/v1')
+    disabled = ParakeetClient(api_url='http://127.0.0.1:9/v1', cache=None)
+    try:
+        assert from_env.cache is not None
+        assert disabled.cache is None
+    finally:
+        from_env.close()
+        disabled.close()
@@ -0,0 +1,73 @@
+"""Векторный детектор речи и обрезка тишины."""
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_RATE, silence, tone
+
+pytest.importorskip('pyaudio')
+
+from client.audio_buffer import VoiceActivityDetector  # noqa: E402
+
+
+@pytest.fixture
+def vad():
+    return VoiceActivityDetector(sample_rate=SAMPLE_RATE)
+
+
+def voiced(seconds: float) -> bytes:
+    """Громкий непрерывный голосоподобный сигнал: 200 + 400 Гц."""
+    low = np.frombuffer(tone(seconds, 200, 2500), dtype='<i2').astype(np.int32)
+    high = np.frombuffer(tone(seconds, 400, 2500), dtype='<i2').astype(np.int32)
+    return (low + high).astype('<i2').tobytes()
+
+
+def test_clip_without_silence_is_speech(vad):
+    pcm = voiced(1.0)
+
+    trimmed, stats = vad.trim(pcm)
+
+    assert stats["speech"]
+    assert vad.speech_mask(pcm).all()
+    assert not stats["silent"]
+    # Отбрасывается только неполный последний кадр
+    assert len(pcm) - len(trimmed) < vad.frame_len * 2
+
+
+def test_trims_leading_and_trailing_silence(vad):
+    pcm = silence(1.0, amplitude=50) + voiced(1.0) + silence(1.0, amplitude=50)
+
+    trimmed, stats = vad.trim(pcm)
+
+    assert stats["speech"]
+    # Речь 1 с плюс по pad_ms (200 мс) с каждой стороны, с точностью до кадра
+    kept = len(trimmed) / (SAMPLE_RATE * 2)
+    assert 1.3 <= kept <= 1.5
+    assert stats["trimmed_bytes"] == len(trimmed)
+    assert stats["ratio"] == pytest.approx(1 - len(trimmed) / len(pcm))
+
+
+def test_noise_only_is_not_speech(vad):
+    trimmed, stats = vad.trim(silence(2.0, amplitude=100))
+
+    assert not stats["speech"]
+    assert trimmed == b""
+    assert stats["silent"]
+
+
+def test_compresses_long_pauses(vad):
+    pcm = voiced(1.0) + silence(2.0, amplitude=50) + voiced(1.0)
+
+    kept, _ = vad.trim(pcm)
+    compressed, _ = vad.trim(pcm, max_pause_ms=300)
+
+    assert len(kept) / (SAMPLE_RATE * 2) > 3.9
+    # Пауза сжата до 300 мс плюс запас pad_ms по краям речи
+    assert len(compressed) / (SAMPLE_RATE * 2) < 2.8
+
+
+def test_empty_input(vad):
+    trimmed, stats = vad.trim(b"")
+
+    assert not stats["speech"]
+    assert stats["ratio"] == 0.0
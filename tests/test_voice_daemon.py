@@ -0,0 +1,196 @@
+"""Команды демона и протокол управления через Unix сокет."""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from conftest import silence, tone
+
+pytest.importorskip('pyaudio')
+
+from client import voice_daemon  # noqa: E402
+from client.control import COMMANDS, send_command, send_trigger  # noqa: E402
+from client.voice_daemon import VoiceInputDaemon  # noqa: E402
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch, stub_stream):
+    """Демон без микрофона, звука и сети, с сегментированной загрузкой."""
+    for name in list(os.environ):
+        if name.startswith('MICPY_'):
+            monkeypatch.delenv(name)
+    monkeypatch.setattr(voice_daemon, 'play_sound', lambda sound_type='start': None)
+    daemon = VoiceInputDaemon(
+        socket_path=tmp_path / 'voice.sock',
+        output_mode='file',
+        output_file=tmp_path / 'out.txt',
+        upload_mode='segmented',
+        cache='off'
+    )
+    monkeypatch.setattr(daemon.api_client, 'prewarm', lambda: None)
+    yield daemon
+    daemon.close()
+
+
+@pytest.fixture
+def running(daemon):
+    """Цикл событий демона в отдельном потоке."""
+    daemon._running = True
+    thread = threading.Thread(target=daemon._run_socket_mode, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while daemon._wakeup_w is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield daemon
+    daemon.shutdown()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def raw_request(path, data: bytes) -> dict:
+    """Отправить произвольные байты и прочитать строку ответа."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(str(path))
+        sock.sendall(data)
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
+
+
+def wait_for_state(daemon, state: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if daemon.status()["state"] == state:
+            return
+        time.sleep(0.01)
+    pytest.fail(f"daemon did not reach state {state!r}")
+
+
+def test_cancel_segmented_recording(daemon, stub_stream):
+    assert daemon.start()["ok"]
+    stub_stream[-1].feed(tone(2.0))
+
+    # Поток сегментатора ждёт конца записи — cancel не должен на нём зависнуть
+    replies = []
+    thread = threading.Thread(target=lambda: replies.append(daemon.cancel()), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive(), "cancel() deadlocked in segmented mode"
+    assert replies[0]["ok"] and replies[0]["action"] == "cancelled"
+    assert replies[0]["audio_seconds"] == pytest.approx(2.0, abs=0.1)
+    assert not daemon.is_recording
+    assert daemon._segmenter is None
+
+
+def test_silent_recording_skips_api(daemon, stub_stream, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        daemon.api_client, 'transcribe_with_retry', lambda *args, **kwargs: calls.append(args)
+    )
+    daemon.upload_mode = 'batch'
+    assert daemon.start()["ok"]
+    stub_stream[-1].feed(silence(1.0, amplitude=100))
+
+    reply = daemon.stop(wait=True)
+
+    assert reply["result"]["skipped"] == "no_speech"
+    assert calls == []
+    assert daemon.metrics.skipped.value(reason='no_speech') == 1
+
+
+def test_cancel_without_recording(daemon):
+    assert daemon.cancel() == {"ok": False, "error": "Not recording"}
+
+
+def test_status_echoes_id(running):
+    reply = send_command('status', running.socket_path, timeout=5, id=7)
+
+    assert reply["ok"]
+    assert reply["id"] == 7
+    assert reply["state"] == "idle"
+    assert reply["upload_mode"] == "segmented"
+
+
+def test_unknown_command(running):
+    reply = send_command('rewind', running.socket_path, timeout=5)
+
+    assert not reply["ok"]
+    assert "rewind" in reply["error"]
+    assert reply["commands"] == list(COMMANDS)
+
+
+@pytest.mark.parametrize('data', [b'{"command": \n', b'{broken}\n'])
+def test_invalid_json(running, data):
+    reply = raw_request(running.socket_path, data)
+
+    assert not reply["ok"]
+    assert reply["error"].startswith("Invalid request")
+    assert reply["state"] == "idle"
+
+
+def test_stop_without_recording(running):
+    reply = send_command('stop', running.socket_path, timeout=5)
+
+    assert reply["ok"] is False
+    assert reply["error"] == "Not recording"
+
+
+def test_start_then_cancel(running):
+    reply = send_command('start', running.socket_path, timeout=5)
+    assert reply["ok"] and reply["action"] == "started"
+    assert reply["state"] == "recording"
+
+    assert not send_command('start', running.socket_path, timeout=5)["ok"]
+
+    reply = send_command('cancel', running.socket_path, timeout=5)
+    assert reply["ok"] and reply["action"] == "cancelled"
+    assert reply["state"] == "idle"
+
+
+def test_legacy_trigger_toggles(running):
+    assert send_trigger(running.socket_path)
+    wait_for_state(running, "recording")
+
+    assert send_command('cancel', running.socket_path, timeout=5)["ok"]
+    wait_for_state(running, "idle")
+
+
+def test_status_answers_while_start_blocks(running, monkeypatch):
+    # Холодное открытие микрофона не должно задерживать других клиентов
+    opened = threading.Event()
+    release = threading.Event()
+    start_recording = running.audio_buffer.start_recording
+
+    def slow_start_recording():
+        opened.set()
+        release.wait(5)
+        return start_recording()
+
+    monkeypatch.setattr(running.audio_buffer, 'start_recording', slow_start_recording)
+    replies = []
+    thread = threading.Thread(
+        target=lambda: replies.append(send_command('start', running.socket_path, timeout=5)),
+        daemon=True
+    )
+    thread.start()
+    assert opened.wait(5)
+
+    started = time.monotonic()
+    reply = send_command('status', running.socket_path, timeout=5)
+    assert reply["ok"] and reply["state"] == "idle"
+    assert time.monotonic() - started < 1.0
+
+    release.set()
+    thread.join(timeout=5)
+    assert replies[0]["ok"] and replies[0]["state"] == "recording"
+    assert send_command('cancel', running.socket_path, timeout=5)["ok"]